@@ -20,6 +20,15 @@ from sgmCsvFileReader import get_csv_file_data
 
 
 # local file imports
+from FastVoucherFileParser import (AccountEntry, VoucherFileInfo, VoucherIngestOptions, get_files_to_process,
+                                   read_and_parse_xml_in_file, process_file_info_element, process_cur_extract_rpt,
+                                   stream_accounting_entries_from_xml_file, parse_voucher_files, merge_parsed_voucher_files,
+                                   uses_parsed_voucher_files)
+from FastVoucherEntryStore import AccountEntryStore
+from FastVoucherDataClasses import cents_to_decimal
+from FastVoucherPlanner import get_planned_ingest_options
+from FastVoucherAccountIndex import EFT_ACCOUNT, AccountEntryIndex
+from FastVoucherAchMatching import EftAchMatch, EftAchMatchResults, match_eft_transactions_to_ach_transactions
 
 
 # SGM Shared Module imports
@@ -32,18 +41,6 @@ from sgmCsvFileReader import get_csv_file_data
 # ******************************************************************************
 
 
-@dataclass
-class AccountEntry:
-    policy_num: str = ''
-    gl_entry_id: str = ''
-    gl_entry_hdr_id: str = ''
-    disbursement: str = ''
-    account: str = ''
-    amount: Decimal = Decimal('0.00')
-    reversal: str = ''
-    trans_type_desc: str = ''
-
-
 @dataclass
 class AchEntry:
     bank_trx_id: str = ''
@@ -54,32 +51,28 @@ class AchEntry:
     policy_num: str = ''
 
 
-@dataclass
-class VoucherFileInfo:
-    cycle_date: str = ''
-    file_count: int = 0
-    total_credit_amount: Decimal = Decimal('0.00')
-    total_debit_amount: Decimal = Decimal('0.00')
-    number_of_records: int = 0
-
-
 @dataclass
 class InputData:
     file_info: VoucherFileInfo()
     unmatched_accounting_entries: list = field(default_factory=list)
     eft_transactions: list = field(default_factory=list)
     ach_transactions: list = field(default_factory=list)
+    account_index: AccountEntryIndex | None = None
 
 
 @dataclass
 class OutputData:
     unmatched_eft_transactions: list = field(default_factory=list)
+    eft_ach_matches: list = field(default_factory=list)
+    unmatched_ach_transactions: list = field(default_factory=list)
 
 
 @dataclass
 class VoucherFileReviewSS:
     workbook = None
     eft_ws = None
+    matched_ws = None
+    unmatched_ach_ws = None
     left_fmt = None
     left_bold_fmt = None
     left_lv2_fmt = None
@@ -104,15 +97,20 @@ class VoucherFileReviewSS:
 # ==============================================================================
 # === Main
 # ==============================================================================
-def create_fast_ach_file_review_spreadsheet() -> None:
+def create_fast_ach_file_review_spreadsheet(ingest_options: VoucherIngestOptions | None = None) -> None:
     print('\n\nStart Create ACH-EFT Compare Spreadsheet')
 
+    if ingest_options is None:
+        ingest_options = VoucherIngestOptions()
+    ingest_options = get_planned_ingest_options(ingest_options)
+
     output_data = OutputData([])
 
-    input_data = get_input_data()
-    input_data.eft_transactions = create_list_of_eft_transactions(input_data.unmatched_accounting_entries)
-    output_data.unmatched_eft_transactions = compare_eft_transactions_to_ach_transactions(input_data)
-    print_totals_for_eft_and_ach_transactions_to_console(input_data)
+    input_data = get_input_data(ingest_options)
+    input_data.eft_transactions = input_data.account_index.get_entries(EFT_ACCOUNT)
+    add_match_results_to_output_data(
+        compare_eft_transactions_to_ach_transactions(input_data, ingest_options.ach_match_policy_first), output_data)
+    print_totals_for_eft_and_ach_transactions_to_console(input_data, ingest_options.fixed_point_amounts)
     create_ach_transaction_review_spreadsheet(output_data, input_data)
     print('\nEnd Create ACH-EFT Compare Spreadsheet')
 
@@ -120,9 +118,9 @@ def create_fast_ach_file_review_spreadsheet() -> None:
 
 
 # ==============================================================================
-def get_input_data() -> InputData:
+def get_input_data(ingest_options: VoucherIngestOptions) -> InputData:
 
-    input_data = get_data_from_xml_voucher_files()
+    input_data = get_data_from_xml_voucher_files(ingest_options)
     if input_data is not None:
         input_data.ach_transactions = get_data_from_ach_file()
 
@@ -130,45 +128,38 @@ def get_input_data() -> InputData:
 
 
 # ==============================================================================
-def get_data_from_xml_voucher_files() -> InputData:
+def get_data_from_xml_voucher_files(ingest_options: VoucherIngestOptions) -> InputData:
 
     file_info = VoucherFileInfo()
     input_data = InputData(file_info)
+    if ingest_options.use_entry_store or ingest_options.fixed_point_amounts:
+        input_data.unmatched_accounting_entries = AccountEntryStore()
+    input_data.account_index = AccountEntryIndex(input_data.unmatched_accounting_entries)
 
     input_data.files_to_process = get_files_to_process()
-    if input_data.files_to_process:
+    if input_data.files_to_process and uses_parsed_voucher_files(ingest_options):
+        parsed_files = parse_voucher_files(input_data.files_to_process, ingest_options)
+        merge_parsed_voucher_files(parsed_files, input_data.file_info, input_data.unmatched_accounting_entries)
+        input_data.account_index.index_new_entries()
+        print_transactions_info_to_console(input_data)
+    elif input_data.files_to_process:
         for cur_xml_file_path in input_data.files_to_process:
-            etree_root = read_and_parse_xml_in_file(cur_xml_file_path)
-            if etree_root is not None:
-                get_accounting_entries_from_parsed_xml_data(etree_root, input_data)
+            if ingest_options.mode == 'stream':
+                input_data.unmatched_accounting_entries.extend(
+                    stream_accounting_entries_from_xml_file(cur_xml_file_path, input_data.file_info))
+            else:
+                etree_root = read_and_parse_xml_in_file(cur_xml_file_path)
+                if etree_root is not None:
+                    get_accounting_entries_from_parsed_xml_data(etree_root, input_data)
+            input_data.account_index.index_new_entries()
         print_transactions_info_to_console(input_data)
 
 
-    return input_data
-
-
-# ==============================================================================
-def get_files_to_process() -> list[Path]:
+    if isinstance(input_data.unmatched_accounting_entries, AccountEntryStore):
+        store_megabytes = input_data.unmatched_accounting_entries.get_memory_size() / (1024 * 1024)
+        print(f'  Accounting entry store size => {store_megabytes:.1f} MB')
 
-    input_files: list[Path] = []
-    input_files_path = Path(Path.cwd() / 'Input files' / 'Voucher files')
-    for cur_file in Path(input_files_path).iterdir():
-        input_files.append(cur_file)
-
-    return input_files
-
-
-# ==============================================================================
-def read_and_parse_xml_in_file(xml_file_path: Path) -> etree.Element:
-
-    print(f'\n  Parsing XML File data ==> {xml_file_path.name}')
-    etree_root = None
-    if xml_file_path.exists():
-        with open(xml_file_path) as f:
-            tree = etree.parse(f)
-        etree_root = tree.getroot()
-
-    return etree_root
+    return input_data
 
 
 # ==============================================================================
@@ -184,19 +175,7 @@ def get_accounting_entries_from_parsed_xml_data(etree_root: etree.Element,
                 input_data.unmatched_accounting_entries.append(new_acct_entry)
                 num_acct_entries += 1
             else:
-                match cur_xtract_rpt.tag:
-                    case 'CycleDate':
-                        input_data.file_info.cycle_date = cur_xtract_rpt.text[0:10]
-                    case 'FileCount':
-                        input_data.file_info.file_count = int(cur_xtract_rpt.text)
-                    case 'TotalCreditAmount':
-                        input_data.file_info.total_credit_amount = Decimal(cur_xtract_rpt.text).quantize(Decimal('.01'))
-                    case 'TotalDebitAmount':
-                        input_data.file_info.total_debit_amount = Decimal(cur_xtract_rpt.text).quantize(Decimal('.01'))
-                    case 'NumberOfRecords':
-                        input_data.file_info.number_of_records = int(cur_xtract_rpt.text)
-                    case _:
-                        pass
+                process_file_info_element(cur_xtract_rpt, input_data.file_info)
 
     return None
 
@@ -226,78 +205,24 @@ def get_data_from_ach_file() -> list[AchEntry]:
 
 
 # ==============================================================================
-def process_cur_extract_rpt(cur_xtract_rpt: etree.Element) -> AccountEntry:
-    acct_entry = AccountEntry()
-    num_fields_found = 0
-    for cur_elem in cur_xtract_rpt:
-        match cur_elem.tag:
-            case 'AccountNumber':
-                acct_entry.account = cur_elem.text
-                num_fields_found += 1
-            case 'ConvertedAmount':
-                acct_entry.amount = Decimal(cur_elem.text).quantize(Decimal('.01'))
-                num_fields_found += 1
-            case 'GLEntryID':
-                acct_entry.gl_entry_id = cur_elem.text
-                num_fields_found += 1
-            case 'IsReversal':
-                acct_entry.reversal = cur_elem.text
-                num_fields_found += 1
-            case 'GLEntryHdrID':
-                acct_entry.gl_entry_hdr_id = cur_elem.text
-                num_fields_found += 1
-            case 'IsDisbursmentTxnRelated':
-                acct_entry.disbursement = cur_elem.text
-                num_fields_found += 1
-            case 'PolicyNumber':
-                acct_entry.policy_num = cur_elem.text
-                num_fields_found += 1
-            case 'TransactionTypeDescription':
-                acct_entry.trans_type_desc = cur_elem.text
-                num_fields_found += 1
-            case _:
-                pass
-        if num_fields_found == 8:
-            break
-
-    return acct_entry
+def compare_eft_transactions_to_ach_transactions(input_data: InputData,
+                                                 match_policy_first: bool = False) -> EftAchMatchResults:
 
+    match_results = match_eft_transactions_to_ach_transactions(input_data.eft_transactions,
+                                                               input_data.ach_transactions, match_policy_first)
+    print_eft_ach_match_results_to_console(match_results)
 
-# ==============================================================================
-def compare_eft_transactions_to_ach_transactions(input_data: InputData) -> list[AccountEntry]:
-    unmatched_eft_transactions = []
-    ach_search_list = input_data.ach_transactions.copy()
-
-    for cur_eft_rec in input_data.eft_transactions:
-        found = search_for_cur_eft_amount_in_ach_search_list(cur_eft_rec, ach_search_list)
-        if not found:
-            unmatched_eft_transactions.append(cur_eft_rec)
-
-    return unmatched_eft_transactions
-
-
-# ==============================================================================
-def search_for_cur_eft_amount_in_ach_search_list(cur_eft_rec: AccountEntry, ach_search_list: list[AchEntry]) -> bool:
-    found = False
-    if len(ach_search_list) > 0:
-        for cur_ach_transaction in ach_search_list:
-            if cur_ach_transaction.amount == cur_eft_rec.amount:
-                ach_search_list.remove(cur_ach_transaction)
-                found = True
-                break
-
-    return found
+    return match_results
 
 
 # ==============================================================================
-def create_list_of_eft_transactions(unmatched_accounting_entries: list[AccountEntry]) -> list[AccountEntry]:
-    eft_transactions_list = []
+def add_match_results_to_output_data(match_results: EftAchMatchResults, output_data: OutputData) -> None:
 
-    for cur_entry in unmatched_accounting_entries:
-        if cur_entry.account == '10020 - KCL_UnitMissEFT_9982':
-            eft_transactions_list.append(cur_entry)
+    output_data.unmatched_eft_transactions = match_results.unmatched_eft_transactions
+    output_data.eft_ach_matches = match_results.matches
+    output_data.unmatched_ach_transactions = match_results.unmatched_ach_transactions
 
-    return eft_transactions_list
+    return None
 
 
 # ===============================================================================
@@ -305,6 +230,8 @@ def create_ach_transaction_review_spreadsheet(output_data: OutputData, input_dat
     if output_data is not None:
         voucher_ss = create_spreadsheet(input_data.file_info.cycle_date)
         write_unmatched_eft_transactions_to_spreadsheet(voucher_ss, output_data.unmatched_eft_transactions)
+        write_eft_ach_matches_to_spreadsheet(voucher_ss, output_data.eft_ach_matches)
+        write_unmatched_ach_transactions_to_spreadsheet(voucher_ss, output_data.unmatched_ach_transactions)
         voucher_ss.workbook.close()
 
     return None
@@ -329,15 +256,37 @@ def print_transactions_info_to_console(input_data: InputData) -> None:
 
 
 # ==============================================================================
-def print_totals_for_eft_and_ach_transactions_to_console(input_data: InputData) -> None:
+def print_eft_ach_match_results_to_console(match_results: EftAchMatchResults) -> None:
+
+    num_by_match_type: dict[str, int] = {}
+    for cur_match in match_results.matches:
+        num_by_match_type[cur_match.match_type] = num_by_match_type.get(cur_match.match_type, 0) + 1
 
-    eft_totals = Decimal('0.00')
-    for cur_eft_rec in input_data.eft_transactions:
-        eft_totals += cur_eft_rec.amount
+    print(f'  Matched EFT transactions ==> {len(match_results.matches)}')
+    for match_type, num_matches in num_by_match_type.items():
+        print(f'    {match_type} ==> {num_matches}')
+    print(f'  Unmatched EFT transactions ==> {len(match_results.unmatched_eft_transactions)}')
+    print(f'  Unmatched ACH transactions ==> {len(match_results.unmatched_ach_transactions)}')
+
+    return None
 
-    ach_totals = Decimal('0.00')
-    for cur_ach_rec in input_data.ach_transactions:
-        ach_totals += cur_ach_rec.amount
+
+# ==============================================================================
+def print_totals_for_eft_and_ach_transactions_to_console(input_data: InputData, fixed_point_amounts: bool = False) -> None:
+
+    if fixed_point_amounts:
+        # sum in integer cents and only convert the totals for printing
+        eft_totals = cents_to_decimal(sum(cur_eft_rec.amount_cents for cur_eft_rec in input_data.eft_transactions))
+        ach_totals = cents_to_decimal(sum(int(cur_ach_rec.amount.scaleb(2))
+                                          for cur_ach_rec in input_data.ach_transactions))
+    else:
+        eft_totals = Decimal('0.00')
+        for cur_eft_rec in input_data.eft_transactions:
+            eft_totals += cur_eft_rec.amount
+
+        ach_totals = Decimal('0.00')
+        for cur_ach_rec in input_data.ach_transactions:
+            ach_totals += cur_ach_rec.amount
 
     print(f'  EFT transactions total ==> {round(eft_totals, 2)}')
     print(f'  ACH transactions total ==> {round(ach_totals, 2)}')
@@ -360,6 +309,23 @@ def create_spreadsheet(cycle_date: str) -> VoucherFileReviewSS:
     voucher_ss.eft_ws.set_column('G:G', 28)  # Transaction Type
     voucher_ss.eft_ws.set_column('H:I', 55)  # GLEntryID, GLEntryHdrID
 
+    # Set up the matched transactions worksheet tab to hold each EFT entry with the ACH transaction it matched
+    voucher_ss.matched_ws = voucher_ss.workbook.add_worksheet('Matched EFT-ACH')
+    voucher_ss.matched_ws.set_column('A:A', 20)  # Policy Number
+    voucher_ss.matched_ws.set_column('B:B', 18)  # Amount
+    voucher_ss.matched_ws.set_column('C:D', 55)  # GLEntryID, GLEntryHdrID
+    voucher_ss.matched_ws.set_column('E:E', 20)  # Match Type
+    voucher_ss.matched_ws.set_column('F:F', 24)  # BankTrxID
+    voucher_ss.matched_ws.set_column('G:H', 30)  # Bank Name, Account Name
+    voucher_ss.matched_ws.set_column('I:J', 20)  # ACH Policy Number, Trx Date
+
+    # Set up the unmatched ACH worksheet tab to hold the ACH transactions no EFT entry matched
+    voucher_ss.unmatched_ach_ws = voucher_ss.workbook.add_worksheet('Unmatched ACH')
+    voucher_ss.unmatched_ach_ws.set_column('A:A', 24)  # BankTrxID
+    voucher_ss.unmatched_ach_ws.set_column('B:C', 30)  # Bank Name, Account Name
+    voucher_ss.unmatched_ach_ws.set_column('D:D', 18)  # Amount
+    voucher_ss.unmatched_ach_ws.set_column('E:F', 20)  # Trx Date, Policy Number
+
     return voucher_ss
 
 
@@ -488,5 +454,65 @@ def write_unmatched_eft_transactions_to_spreadsheet(voucher_ss: VoucherFileRevie
     return None
 
 
+
+# ==============================================================================
+def write_eft_ach_matches_to_spreadsheet(voucher_ss: VoucherFileReviewSS, eft_ach_matches: list[EftAchMatch]) -> None:
+    header_row = 1
+
+    voucher_ss.matched_ws.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'B{header_row}', 'Amount', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'C{header_row}', 'GLEntryID', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'D{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'E{header_row}', 'Match Type', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'F{header_row}', 'BankTrxID', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'G{header_row}', 'Bank Name', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'H{header_row}', 'Account Name', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'I{header_row}', 'ACH Policy Number', voucher_ss.header_fmt)
+    voucher_ss.matched_ws.write(f'J{header_row}', 'Trx Date', voucher_ss.header_fmt)
+
+    ws_row = 1
+    for cur_match in eft_ach_matches:
+        cur_eft_rec = cur_match.eft_transaction
+        cur_ach_rec = cur_match.ach_transaction
+        voucher_ss.matched_ws.write(ws_row, 0, cur_eft_rec.policy_num, voucher_ss.left_fmt)
+        voucher_ss.matched_ws.write(ws_row, 1, cur_eft_rec.amount, voucher_ss.right_fmt)
+        voucher_ss.matched_ws.write(ws_row, 2, cur_eft_rec.gl_entry_id, voucher_ss.left_fmt)
+        voucher_ss.matched_ws.write(ws_row, 3, cur_eft_rec.gl_entry_hdr_id, voucher_ss.left_fmt)
+        voucher_ss.matched_ws.write(ws_row, 4, cur_match.match_type, voucher_ss.center_fmt)
+        voucher_ss.matched_ws.write(ws_row, 5, cur_ach_rec.bank_trx_id, voucher_ss.left_fmt)
+        voucher_ss.matched_ws.write(ws_row, 6, cur_ach_rec.bank_name, voucher_ss.left_fmt)
+        voucher_ss.matched_ws.write(ws_row, 7, cur_ach_rec.account_name, voucher_ss.left_fmt)
+        voucher_ss.matched_ws.write(ws_row, 8, cur_ach_rec.policy_num, voucher_ss.left_fmt)
+        voucher_ss.matched_ws.write(ws_row, 9, cur_ach_rec.trx_date, voucher_ss.center_fmt)
+        ws_row += 1
+
+    return None
+
+
+# ==============================================================================
+def write_unmatched_ach_transactions_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
+                                                    ach_transactions: list[AchEntry]) -> None:
+    header_row = 1
+
+    voucher_ss.unmatched_ach_ws.write(f'A{header_row}', 'BankTrxID', voucher_ss.header_fmt)
+    voucher_ss.unmatched_ach_ws.write(f'B{header_row}', 'Bank Name', voucher_ss.header_fmt)
+    voucher_ss.unmatched_ach_ws.write(f'C{header_row}', 'Account Name', voucher_ss.header_fmt)
+    voucher_ss.unmatched_ach_ws.write(f'D{header_row}', 'Amount', voucher_ss.header_fmt)
+    voucher_ss.unmatched_ach_ws.write(f'E{header_row}', 'Trx Date', voucher_ss.header_fmt)
+    voucher_ss.unmatched_ach_ws.write(f'F{header_row}', 'Policy Number', voucher_ss.header_fmt)
+
+    ws_row = 1
+    for cur_ach_rec in ach_transactions:
+        voucher_ss.unmatched_ach_ws.write(ws_row, 0, cur_ach_rec.bank_trx_id, voucher_ss.left_fmt)
+        voucher_ss.unmatched_ach_ws.write(ws_row, 1, cur_ach_rec.bank_name, voucher_ss.left_fmt)
+        voucher_ss.unmatched_ach_ws.write(ws_row, 2, cur_ach_rec.account_name, voucher_ss.left_fmt)
+        voucher_ss.unmatched_ach_ws.write(ws_row, 3, cur_ach_rec.amount, voucher_ss.right_fmt)
+        voucher_ss.unmatched_ach_ws.write(ws_row, 4, cur_ach_rec.trx_date, voucher_ss.center_fmt)
+        voucher_ss.unmatched_ach_ws.write(ws_row, 5, cur_ach_rec.policy_num, voucher_ss.left_fmt)
+        ws_row += 1
+
+    return None
+
+
 if __name__ == "__main__":
     create_fast_ach_file_review_spreadsheet()
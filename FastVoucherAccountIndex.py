@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+from array import array
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherEntryStore import AccountEntryStore
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# GL account of the EFT transactions that are listed on their own sheet and matched against the ACH file
+EFT_ACCOUNT = '10020 - KCL_UnitMissEFT_9982'
+
+
+class AccountEntryIndex:
+    # Entry indexes of the accounting entries by GL account, kept up to date as the entries are read.  Call
+    # index_new_entries() after entries have been appended and only those new entries are looked at, so building
+    # the index never takes a pass of its own over the entries.  Pulling an account's entries is then a dict
+    # lookup plus one step per entry of that account, for the EFT account or any other account.  For an
+    # AccountEntryStore the dictionary codes of the account column are indexed, so no account strings are
+    # compared at all.
+
+    def __init__(self, accounting_entries):
+        self.accounting_entries = accounting_entries
+        self.rows_by_account: dict[str, array] = {}
+        self.num_indexed = 0
+
+    # ==========================================================================
+    def index_new_entries(self) -> None:
+
+        accounting_entries = self.accounting_entries
+        num_entries = len(accounting_entries)
+        if self.num_indexed >= num_entries:
+            return None
+
+        if isinstance(accounting_entries, AccountEntryStore):
+            account_column = accounting_entries.account
+            rows_by_code: dict[int, array] = {}
+            for row in range(self.num_indexed, num_entries):
+                cur_code = account_column.codes[row]
+                cur_rows = rows_by_code.get(cur_code)
+                if cur_rows is None:
+                    cur_rows = rows_by_code[cur_code] = array('q')
+                cur_rows.append(row)
+            for cur_code, cur_rows in rows_by_code.items():
+                self.get_account_rows(account_column.values[cur_code]).extend(cur_rows)
+        else:
+            rows_by_account = self.rows_by_account
+            for row in range(self.num_indexed, num_entries):
+                cur_account = accounting_entries[row].account
+                cur_rows = rows_by_account.get(cur_account)
+                if cur_rows is None:
+                    cur_rows = rows_by_account[cur_account] = array('q')
+                cur_rows.append(row)
+        self.num_indexed = num_entries
+
+        return None
+
+    # ==========================================================================
+    def get_account_rows(self, account: str) -> array:
+
+        cur_rows = self.rows_by_account.get(account)
+        if cur_rows is None:
+            cur_rows = self.rows_by_account[account] = array('q')
+
+        return cur_rows
+
+    # ==========================================================================
+    def get_entries(self, account: str, excluded_rows: set[int] | None = None) -> list:
+        # the entries of one account in the order they were read, leaving out excluded_rows
+
+        self.index_new_entries()
+        account_rows = self.rows_by_account.get(account, ())
+        accounting_entries = self.accounting_entries
+        if excluded_rows:
+            return [accounting_entries[row] for row in account_rows if row not in excluded_rows]
+
+        return [accounting_entries[row] for row in account_rows]
+
+    # ==========================================================================
+    def get_num_entries(self, account: str) -> int:
+
+        self.index_new_entries()
+
+        return len(self.rows_by_account.get(account, ()))
+
+    # ==========================================================================
+    def get_accounts(self) -> list[str]:
+
+        self.index_new_entries()
+
+        return [cur_account for cur_account, cur_rows in self.rows_by_account.items() if cur_rows]
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def get_account_sheet_name(account: str, used_sheet_names: set[str]) -> str:
+    # Excel sheet names are at most 31 characters, can not contain []:*?/\ and can not start or end with an
+    # apostrophe, so the account name is cleaned up and cut down, and numbered if two accounts come out the same
+
+    sheet_name = ''.join('_' if cur_char in '[]:*?/\\' else cur_char for cur_char in account)[:31].strip(" '")
+    sheet_name = sheet_name or 'Account'
+    base_sheet_name = sheet_name
+    duplicate_num = 1
+    while sheet_name.lower() in used_sheet_names:
+        duplicate_num += 1
+        suffix = f' ({duplicate_num})'
+        sheet_name = base_sheet_name[:31 - len(suffix)] + suffix
+    used_sheet_names.add(sheet_name.lower())
+
+    return sheet_name
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+from collections import deque
+from dataclasses import dataclass, field
+
+
+# Third party imports
+
+
+# local file imports
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+ACH_MATCH_POLICY_AMOUNT = 'Policy, amount'
+ACH_MATCH_AMOUNT_ONLY = 'Amount only'
+
+
+@dataclass
+class EftAchMatch:
+    # an EFT accounting entry and the ACH transaction it was matched to, and which tier matched them
+    eft_transaction: object
+    ach_transaction: object
+    match_type: str
+
+
+@dataclass
+class EftAchMatchResults:
+    matches: list[EftAchMatch] = field(default_factory=list)
+    unmatched_eft_transactions: list = field(default_factory=list)
+    unmatched_ach_transactions: list = field(default_factory=list)
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def match_eft_transactions_to_ach_transactions(eft_transactions: list, ach_transactions: list,
+                                               match_policy_first: bool = False) -> EftAchMatchResults:
+    # Multiset matching of the EFT entries to the ACH transactions, each ACH transaction is matched at most once.
+    # The ACH transactions are put in buckets keyed by amount, each bucket a queue in ACH file order, and every
+    # EFT entry takes the first ACH transaction left in the bucket of its amount, so the matching is one pass over
+    # each side instead of a scan of the ACH list per EFT entry.  With match_policy_first the EFT entries first
+    # take an ACH transaction with the same policy number and amount, from buckets keyed by both, and only the
+    # ones left unmatched fall back to amount alone.  An ACH transaction taken through one kind of bucket is
+    # skipped when it comes up in the other.  Without match_policy_first the matches are the same as taking the
+    # first ACH transaction of the same amount in file order for each EFT entry in turn.
+
+    match_results = EftAchMatchResults()
+    ach_matched = [False] * len(ach_transactions)
+    ach_by_amount: dict = {}
+    ach_by_policy_amount: dict = {}
+    for ach_index, cur_ach_rec in enumerate(ach_transactions):
+        ach_by_amount.setdefault(cur_ach_rec.amount, deque()).append(ach_index)
+        if match_policy_first and get_match_policy_num(cur_ach_rec):
+            ach_by_policy_amount.setdefault((get_match_policy_num(cur_ach_rec), cur_ach_rec.amount),
+                                            deque()).append(ach_index)
+
+    eft_to_match = list(eft_transactions)
+    if match_policy_first:
+        eft_to_match = match_eft_transactions_from_buckets(
+            eft_to_match, lambda cur_eft_rec: (get_match_policy_num(cur_eft_rec), cur_eft_rec.amount),
+            ach_by_policy_amount, ach_transactions, ach_matched, ACH_MATCH_POLICY_AMOUNT, match_results)
+    match_results.unmatched_eft_transactions = match_eft_transactions_from_buckets(
+        eft_to_match, lambda cur_eft_rec: cur_eft_rec.amount, ach_by_amount, ach_transactions, ach_matched,
+        ACH_MATCH_AMOUNT_ONLY, match_results)
+    match_results.unmatched_ach_transactions = [cur_ach_rec for ach_index, cur_ach_rec in enumerate(ach_transactions)
+                                                if not ach_matched[ach_index]]
+
+    return match_results
+
+
+# ==============================================================================
+def match_eft_transactions_from_buckets(eft_transactions: list, get_key, ach_buckets: dict, ach_transactions: list,
+                                        ach_matched: list[bool], match_type: str,
+                                        match_results: EftAchMatchResults) -> list:
+    # matches each EFT entry to the first ACH transaction not yet matched in the bucket of its key, returns the
+    # EFT entries left unmatched in their original order
+
+    unmatched_eft_transactions = []
+    for cur_eft_rec in eft_transactions:
+        ach_bucket = ach_buckets.get(get_key(cur_eft_rec))
+        # ACH transactions already matched through the other kind of bucket are dropped as they come up
+        while ach_bucket and ach_matched[ach_bucket[0]]:
+            ach_bucket.popleft()
+        if ach_bucket:
+            ach_index = ach_bucket.popleft()
+            ach_matched[ach_index] = True
+            match_results.matches.append(EftAchMatch(cur_eft_rec, ach_transactions[ach_index], match_type))
+        else:
+            unmatched_eft_transactions.append(cur_eft_rec)
+
+    return unmatched_eft_transactions
+
+
+# ==============================================================================
+def get_match_policy_num(transaction) -> str:
+
+    return (transaction.policy_num or '').strip()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+from dataclasses import dataclass
+from decimal import Decimal
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherDataClasses import VoucherFileInfo, cents_to_decimal
+from FastVoucherEntryStore import AccountEntryStore
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+
+@dataclass
+class EntryTotals:
+    # count and totals of a set of accounting entries, debits are the positive amounts and credits the negative
+    # ones, kept negative the same way TotalCreditAmount is in the file header.  The totals are integer cents for
+    # an AccountEntryStore and Decimal for AccountEntry objects, see VoucherAggregates.get_amount().
+    num_entries: int = 0
+    debit_total: int | Decimal = 0
+    credit_total: int | Decimal = 0
+
+    def add_totals(self, num_entries: int, debit_total, credit_total) -> None:
+        self.num_entries += num_entries
+        self.debit_total += debit_total
+        self.credit_total += credit_total
+
+    @property
+    def net_total(self):
+        return self.debit_total + self.credit_total
+
+
+@dataclass
+class ControlTotalCheck:
+    # the entries read from one voucher file, or from all the files of one cycle, against the control totals in
+    # the file headers
+    name: str
+    cycle_date: str
+    totals: EntryTotals
+    number_of_records: int = 0
+    total_debit_amount: Decimal = Decimal('0.00')
+    total_credit_amount: Decimal = Decimal('0.00')
+    num_files: int = 1
+
+
+class VoucherAggregates:
+    # Counts and totals of the accounting entries per voucher file and per cycle, plus the account x transaction
+    # type and reversal x disbursement pivots, kept up to date as the entries are read.  Call add_new_entries()
+    # after entries have been appended and only those new entries are looked at, then end_file() once the last
+    # entry of a file is in, so the totals are done when ingestion is done without a pass of their own over the
+    # entries.  Each entry costs one dict update keyed by its (account, transaction type, reversal,
+    # disbursement); for an AccountEntryStore the key is the dictionary codes of those columns.  The cells are
+    # rolled up into the file totals and pivots once per batch, which only takes a step per distinct key.  An
+    # empty element is keyed as '' in the pivots so the keys always sort.
+
+    def __init__(self, accounting_entries):
+        self.accounting_entries = accounting_entries
+        self.amounts_in_cents = isinstance(accounting_entries, AccountEntryStore)
+        self.num_aggregated = 0
+        self.cur_file_totals = EntryTotals()
+        self.file_checks: list[ControlTotalCheck] = []
+        self.cycle_checks: dict[str, ControlTotalCheck] = {}
+        self.account_trans_type_totals: dict[tuple[str, str], EntryTotals] = {}
+        self.reversal_disbursement_totals: dict[tuple[str, str], EntryTotals] = {}
+
+    # ==========================================================================
+    def add_new_entries(self) -> None:
+        # aggregates the entries appended since the last call
+
+        accounting_entries = self.accounting_entries
+        num_entries = len(accounting_entries)
+        if self.num_aggregated >= num_entries:
+            return None
+
+        # cell => [entries, debit total, credit total]
+        cells: dict[tuple, list] = {}
+        if self.amounts_in_cents:
+            new_rows = slice(self.num_aggregated, num_entries)
+            for cur_key, cur_amount in zip(zip(accounting_entries.account.codes[new_rows],
+                                               accounting_entries.trans_type_desc.codes[new_rows],
+                                               accounting_entries.reversal.codes[new_rows],
+                                               accounting_entries.disbursement.codes[new_rows]),
+                                           accounting_entries.amount_cents[new_rows]):
+                cur_cell = cells.get(cur_key)
+                if cur_cell is None:
+                    cur_cell = cells[cur_key] = [0, 0, 0]
+                cur_cell[0] += 1
+                if cur_amount > 0:
+                    cur_cell[1] += cur_amount
+                else:
+                    cur_cell[2] += cur_amount
+            account_values = accounting_entries.account.values
+            trans_type_values = accounting_entries.trans_type_desc.values
+            reversal_values = accounting_entries.reversal.values
+            disbursement_values = accounting_entries.disbursement.values
+            cells = {(account_values[cur_account] or '', trans_type_values[cur_trans_type] or '',
+                      reversal_values[cur_reversal] or '', disbursement_values[cur_disbursement] or ''): cur_cell
+                     for (cur_account, cur_trans_type, cur_reversal, cur_disbursement), cur_cell in cells.items()}
+        else:
+            for row in range(self.num_aggregated, num_entries):
+                cur_entry = accounting_entries[row]
+                cur_key = (cur_entry.account or '', cur_entry.trans_type_desc or '', cur_entry.reversal or '',
+                           cur_entry.disbursement or '')
+                cur_cell = cells.get(cur_key)
+                if cur_cell is None:
+                    cur_cell = cells[cur_key] = [0, Decimal('0.00'), Decimal('0.00')]
+                cur_cell[0] += 1
+                if cur_entry.amount > 0:
+                    cur_cell[1] += cur_entry.amount
+                else:
+                    cur_cell[2] += cur_entry.amount
+
+        for (cur_account, cur_trans_type, cur_reversal, cur_disbursement), cur_cell in cells.items():
+            self.cur_file_totals.add_totals(*cur_cell)
+            get_entry_totals(self.account_trans_type_totals, (cur_account, cur_trans_type)).add_totals(*cur_cell)
+            get_entry_totals(self.reversal_disbursement_totals, (cur_reversal, cur_disbursement)).add_totals(*cur_cell)
+        self.num_aggregated = num_entries
+
+        return None
+
+    # ==========================================================================
+    def end_file(self, file_name: str, file_info: VoucherFileInfo) -> None:
+        # closes the totals of the file whose entries were just added, file_info is the header of that file only
+
+        file_check = ControlTotalCheck(file_name, file_info.cycle_date, self.cur_file_totals,
+                                       file_info.number_of_records, file_info.total_debit_amount,
+                                       file_info.total_credit_amount)
+        self.file_checks.append(file_check)
+        self.cur_file_totals = EntryTotals()
+
+        cycle_check = self.cycle_checks.get(file_info.cycle_date)
+        if cycle_check is None:
+            cycle_check = self.cycle_checks[file_info.cycle_date] = ControlTotalCheck(
+                file_info.cycle_date, file_info.cycle_date, EntryTotals(), num_files=0)
+        cycle_check.totals.add_totals(file_check.totals.num_entries, file_check.totals.debit_total,
+                                      file_check.totals.credit_total)
+        cycle_check.number_of_records += file_check.number_of_records
+        cycle_check.total_debit_amount += file_check.total_debit_amount
+        cycle_check.total_credit_amount += file_check.total_credit_amount
+        cycle_check.num_files += 1
+
+        return None
+
+    # ==========================================================================
+    def get_amount(self, total) -> Decimal:
+
+        return cents_to_decimal(total) if self.amounts_in_cents else total
+
+    # ==========================================================================
+    def get_control_total_differences(self, control_check: ControlTotalCheck) -> list[str]:
+        # the control totals of the header that do not agree with the entries read, empty when they all agree
+
+        differences = []
+        if control_check.number_of_records != control_check.totals.num_entries:
+            differences.append('records')
+        if control_check.total_debit_amount != self.get_amount(control_check.totals.debit_total):
+            differences.append('debits')
+        if control_check.total_credit_amount != self.get_amount(control_check.totals.credit_total):
+            differences.append('credits')
+
+        return differences
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def get_entry_totals(totals_by_key: dict, key) -> EntryTotals:
+
+    cur_totals = totals_by_key.get(key)
+    if cur_totals is None:
+        cur_totals = totals_by_key[key] = EntryTotals()
+
+    return cur_totals
+
+
+# ==============================================================================
+def print_control_total_checks_to_console(aggregates: VoucherAggregates) -> None:
+
+    print('\n  Control totals')
+    for cur_check in aggregates.file_checks + list(aggregates.cycle_checks.values()):
+        differences = aggregates.get_control_total_differences(cur_check)
+        check_result = 'OK' if not differences else f'MISMATCH ({", ".join(differences)})'
+        print(f'    {cur_check.name} => {cur_check.totals.num_entries} entries, '
+              f'debits {aggregates.get_amount(cur_check.totals.debit_total)}, '
+              f'credits {aggregates.get_amount(cur_check.totals.credit_total)} => {check_result}')
+
+    return None
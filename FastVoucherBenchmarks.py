@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import gzip
+import random
+import tempfile
+import time
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+from lxml import etree
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherFileParser import AccountEntry, GL_EXTRACT_FIELDS, open_voucher_xml_sources, process_cur_extract_rpt
+from FastVoucherEntryStore import AccountEntryStore
+from FastVoucherFileReview import GLEntryHdrIDGroup, process_unmatched_accounting_entries
+
+
+# SGM Shared Module imports
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+# === Main
+# ==============================================================================
+def run_voucher_benchmarks() -> None:
+    print('\n\nStart Voucher Benchmarks')
+
+    benchmark_gl_extract_field_extraction(200_000)
+    benchmark_voucher_input_sources(200_000)
+    benchmark_hdr_id_grouping([10_000, 100_000, 1_000_000, 10_000_000])
+
+    print('\nEnd Voucher Benchmarks')
+
+    return None
+
+
+# ==============================================================================
+def create_synthetic_voucher_xml(num_records: int, num_hdr_ids: int, seed: int = 1) -> bytes:
+    # Builds a GL extract shaped like the real voucher files, with random amounts spread over num_hdr_ids headers
+
+    rand = random.Random(seed)
+    accounts = ['10020 - KCL_UnitMissEFT_9982', '20010 - Premium Suspense', '30040 - Claims Payable']
+    trans_types = ['Premium Payment', 'Claim Disbursement', 'Commission', 'Refund']
+    xml_parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<GLExtract>\n',
+                 '<CycleDate>2024-01-31T00:00:00</CycleDate><FileCount>1</FileCount>',
+                 '<TotalCreditAmount>0.00</TotalCreditAmount><TotalDebitAmount>0.00</TotalDebitAmount>',
+                 f'<NumberOfRecords>{num_records}</NumberOfRecords>\n']
+    for record_num in range(num_records):
+        amount_cents = rand.randrange(-100000, 100000)
+        xml_parts.append(
+            f'<GLExtractReport><AccountNumber>{rand.choice(accounts)}</AccountNumber>'
+            f'<ConvertedAmount>{amount_cents / 100:.2f}</ConvertedAmount>'
+            f'<GLEntryID>{record_num:012d}-GLE</GLEntryID><IsReversal>false</IsReversal>'
+            f'<GLEntryHdrID>{rand.randrange(num_hdr_ids):012d}-HDR</GLEntryHdrID>'
+            f'<IsDisbursmentTxnRelated>false</IsDisbursmentTxnRelated>'
+            f'<PolicyNumber>P{rand.randrange(num_records // 4 + 1):07d}</PolicyNumber>'
+            f'<TransactionTypeDescription>{rand.choice(trans_types)}</TransactionTypeDescription>'
+            f'</GLExtractReport>\n')
+    xml_parts.append('</GLExtract>\n')
+
+    return ''.join(xml_parts).encode('utf-8')
+
+
+# ==============================================================================
+def create_synthetic_account_entry_store(num_entries: int, num_hdr_ids: int, seed: int = 1) -> AccountEntryStore:
+    # the same kind of entries as create_synthetic_voucher_xml, straight into a fixed point store so 10 million
+    # entries fit in memory without building the XML
+
+    rand = random.Random(seed)
+    accounts = ['10020 - KCL_UnitMissEFT_9982', '20010 - Premium Suspense', '30040 - Claims Payable']
+    trans_types = ['Premium Payment', 'Claim Disbursement', 'Commission', 'Refund']
+    entry_store = AccountEntryStore()
+    for record_num in range(num_entries):
+        entry_store.append_fields(f'P{rand.randrange(num_entries // 4 + 1):07d}', f'{record_num:012d}-GLE',
+                                  f'{rand.randrange(num_hdr_ids):012d}-HDR', 'false', rand.choice(accounts),
+                                  rand.randrange(-100000, 100000), 'false', rand.choice(trans_types))
+
+    return entry_store
+
+
+# ==============================================================================
+def legacy_process_unmatched_accounting_entries(unmatched_accounting_entries) -> list[GLEntryHdrIDGroup]:
+    # the original grouping, a linear scan of the groups for every entry with new groups inserted at the front,
+    # kept as the baseline for the grouping benchmark
+
+    hdr_ids: list[GLEntryHdrIDGroup] = []
+    for gl_entry in unmatched_accounting_entries:
+        found = False
+        for cur_hdr_group in hdr_ids:
+            if gl_entry.gl_entry_hdr_id == cur_hdr_group.hdr_id:
+                found = True
+                cur_hdr_group.hdr_amount_cents += gl_entry.amount_cents
+                cur_hdr_group.entries.append(gl_entry)
+                break
+        if not found:
+            hdr_ids.insert(0, GLEntryHdrIDGroup(gl_entry.gl_entry_hdr_id, entries=[gl_entry],
+                                                hdr_amount_cents=gl_entry.amount_cents))
+
+    return hdr_ids
+
+
+# ==============================================================================
+def legacy_process_cur_extract_rpt(cur_xtract_rpt: etree.Element) -> AccountEntry:
+    # the original match based extraction, kept as the baseline for the field extraction benchmark
+    acct_entry = AccountEntry()
+    num_fields_found = 0
+    for cur_elem in cur_xtract_rpt:
+        match cur_elem.tag:
+            case 'AccountNumber':
+                acct_entry.account = cur_elem.text
+                num_fields_found += 1
+            case 'ConvertedAmount':
+                acct_entry.amount = Decimal(cur_elem.text).quantize(Decimal('.01'))
+                num_fields_found += 1
+            case 'GLEntryID':
+                acct_entry.gl_entry_id = cur_elem.text
+                num_fields_found += 1
+            case 'IsReversal':
+                acct_entry.reversal = cur_elem.text
+                num_fields_found += 1
+            case 'GLEntryHdrID':
+                acct_entry.gl_entry_hdr_id = cur_elem.text
+                num_fields_found += 1
+            case 'IsDisbursmentTxnRelated':
+                acct_entry.disbursement = cur_elem.text
+                num_fields_found += 1
+            case 'PolicyNumber':
+                acct_entry.policy_num = cur_elem.text
+                num_fields_found += 1
+            case 'TransactionTypeDescription':
+                acct_entry.trans_type_desc = cur_elem.text
+                num_fields_found += 1
+            case _:
+                pass
+        if num_fields_found == 8:
+            break
+
+    return acct_entry
+
+
+# ==============================================================================
+def xpath_process_cur_extract_rpt(cur_xtract_rpt: etree.Element, field_xpaths: list) -> AccountEntry:
+    # precompiled string(Tag) XPath per field, measured as an alternative to the tag => slot lookup
+    values = [cur_xpath(cur_xtract_rpt) for cur_xpath in field_xpaths]
+    for slot, cur_field in enumerate(GL_EXTRACT_FIELDS):
+        if cur_field.converter is not None:
+            values[slot] = cur_field.converter(values[slot]) if values[slot] else cur_field.default
+
+    return AccountEntry(*values)
+
+
+# ==============================================================================
+def findtext_process_cur_extract_rpt(cur_xtract_rpt: etree.Element) -> AccountEntry:
+    # lxml findtext per field, the tag paths are compiled once and cached by lxml
+    values = [cur_xtract_rpt.findtext(cur_field.tag) for cur_field in GL_EXTRACT_FIELDS]
+    for slot, cur_field in enumerate(GL_EXTRACT_FIELDS):
+        if values[slot] is None:
+            values[slot] = cur_field.default
+        elif cur_field.converter is not None:
+            values[slot] = cur_field.converter(values[slot])
+
+    return AccountEntry(*values)
+
+
+# ==============================================================================
+def record_xpath_process_cur_extract_rpt(cur_xtract_rpt: etree.Element, record_xpath: etree.XPath,
+                                         slot_by_tag: dict[str, int]) -> AccountEntry:
+    # one precompiled XPath per record that returns every wanted child in a single call, the texts are then
+    # dropped into their slots the same way as the field map
+    values = [cur_field.default if cur_field.converter is None else None for cur_field in GL_EXTRACT_FIELDS]
+    for cur_elem in record_xpath(cur_xtract_rpt):
+        values[slot_by_tag[cur_elem.tag]] = cur_elem.text
+    for slot, cur_field in enumerate(GL_EXTRACT_FIELDS):
+        if cur_field.converter is not None:
+            values[slot] = cur_field.default if values[slot] is None else cur_field.converter(values[slot])
+
+    return AccountEntry(*values)
+
+
+# ==============================================================================
+def benchmark_gl_extract_field_extraction(num_records: int) -> None:
+
+    print(f'\n  GLExtractReport field extraction, {num_records} records')
+    etree_root = etree.fromstring(create_synthetic_voucher_xml(num_records, num_records // 4))
+    xtract_rpts = etree_root.findall('GLExtractReport')
+    field_xpaths = [etree.XPath(f'string({cur_field.tag})') for cur_field in GL_EXTRACT_FIELDS]
+    record_xpath = etree.XPath(' | '.join(cur_field.tag for cur_field in GL_EXTRACT_FIELDS))
+    slot_by_tag = {cur_field.tag: slot for slot, cur_field in enumerate(GL_EXTRACT_FIELDS)}
+
+    extraction_methods = [('match loop (before)', legacy_process_cur_extract_rpt),
+                          ('field map (after)', process_cur_extract_rpt),
+                          ('XPath per field', lambda cur_rpt: xpath_process_cur_extract_rpt(cur_rpt, field_xpaths)),
+                          ('findtext per field', findtext_process_cur_extract_rpt),
+                          ('XPath per record', lambda cur_rpt: record_xpath_process_cur_extract_rpt(
+                              cur_rpt, record_xpath, slot_by_tag))]
+    baseline_entries = None
+    for method_name, extract_method in extraction_methods:
+        # best of three runs to keep other load on the box out of the numbers
+        elapsed_seconds = None
+        for _ in range(3):
+            start_time = time.perf_counter()
+            entries = [extract_method(cur_rpt) for cur_rpt in xtract_rpts]
+            run_seconds = time.perf_counter() - start_time
+            if elapsed_seconds is None or run_seconds < elapsed_seconds:
+                elapsed_seconds = run_seconds
+        if baseline_entries is None:
+            baseline_entries = entries
+        same_entries = 'same entries' if entries == baseline_entries else '*** entries differ ***'
+        print(f'    {method_name:<20} => {len(entries) / elapsed_seconds:12,.0f} records/sec  ({same_entries})')
+
+    return None
+
+
+# ==============================================================================
+def benchmark_voucher_input_sources(num_records: int) -> None:
+    # text mode open (before) against the binary sources from open_voucher_xml_sources (after), plain, .gz and .zip
+
+    print(f'\n  Voucher file input, {num_records} records')
+    xml_data = create_synthetic_voucher_xml(num_records, num_records // 4)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        xml_file_path = Path(temp_dir) / 'voucher.xml'
+        xml_file_path.write_bytes(xml_data)
+        with gzip.open(Path(temp_dir) / 'voucher.xml.gz', 'wb') as f:
+            f.write(xml_data)
+        with zipfile.ZipFile(Path(temp_dir) / 'voucher.zip', 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('voucher.xml', xml_data)
+
+        def parse_text_mode(cur_file_path: Path) -> int:
+            with open(cur_file_path) as f:
+                return len(etree.parse(f).getroot())
+
+        def parse_binary_sources(cur_file_path: Path) -> int:
+            return sum(len(etree.parse(cur_source).getroot()) for cur_source in open_voucher_xml_sources(cur_file_path))
+
+        input_methods = [('text mode (before)', parse_text_mode, xml_file_path),
+                         ('mmap (after)', parse_binary_sources, xml_file_path),
+                         ('.gz stream', parse_binary_sources, Path(temp_dir) / 'voucher.xml.gz'),
+                         ('.zip member stream', parse_binary_sources, Path(temp_dir) / 'voucher.zip')]
+        for method_name, parse_method, cur_file_path in input_methods:
+            elapsed_seconds = None
+            for _ in range(3):
+                start_time = time.perf_counter()
+                num_elements = parse_method(cur_file_path)
+                run_seconds = time.perf_counter() - start_time
+                if elapsed_seconds is None or run_seconds < elapsed_seconds:
+                    elapsed_seconds = run_seconds
+            print(f'    {method_name:<20} => {len(xml_data) / elapsed_seconds / 1_000_000:8.1f} MB/sec of XML  '
+                  f'({num_elements} root elements)')
+
+    return None
+
+
+# ==============================================================================
+def benchmark_hdr_id_grouping(entry_counts: list[int], legacy_max_entries: int = 20_000) -> None:
+    # Linear scan grouping (before) against the hash indexed GLEntryHdrIDGroupIndex (after), four entries per
+    # header id.  The linear scan is O(entries x groups), so it is only timed up to legacy_max_entries.  Where
+    # both run, the groups are checked to come out in the same order with the same totals.
+
+    print('\n  GLEntryHdrID grouping, 4 entries per header id')
+    for num_entries in entry_counts:
+        entry_store = create_synthetic_account_entry_store(num_entries, max(1, num_entries // 4))
+        start_time = time.perf_counter()
+        hdr_groups = process_unmatched_accounting_entries(entry_store, fixed_point_amounts=True)
+        hash_seconds = time.perf_counter() - start_time
+        print(f'    {num_entries:>12,} entries, {len(hdr_groups):>10,} groups => hash index '
+              f'{hash_seconds:8.2f} sec  ({num_entries / hash_seconds:12,.0f} entries/sec)')
+        if num_entries <= legacy_max_entries:
+            start_time = time.perf_counter()
+            legacy_hdr_groups = legacy_process_unmatched_accounting_entries(entry_store)
+            legacy_seconds = time.perf_counter() - start_time
+            same_groups = ([(cur_group.hdr_id, cur_group.hdr_amount_cents, len(cur_group.entries))
+                            for cur_group in hdr_groups]
+                           == [(cur_group.hdr_id, cur_group.hdr_amount_cents, len(cur_group.entries))
+                               for cur_group in legacy_hdr_groups])
+            print(f'    {"":>12}  {"":>18}  => linear scan {legacy_seconds:8.2f} sec  '
+                  f'({"same groups" if same_groups else "*** groups differ ***"}, '
+                  f'{legacy_seconds / hash_seconds:,.0f}x slower)')
+        del entry_store, hdr_groups
+
+    return None
+
+
+if __name__ == "__main__":
+    run_voucher_benchmarks()
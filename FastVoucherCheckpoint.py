@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import json
+import os
+import pickle
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# bump when the layout of the checkpoint files changes so a checkpoint from an older version is not resumed,
+# options that change the results go in the run options of the key instead, see get_voucher_run_checkpoint()
+VOUCHER_CHECKPOINT_FORMAT_VERSION = 6
+VOUCHER_CHECKPOINT_MANIFEST_FILENAME = 'voucher_checkpoint.json'
+VOUCHER_CHECKPOINT_GROUPING_FILENAME = 'grouping_state.pkl'
+
+
+class VoucherRunCheckpoint:
+    # Progress of one voucher review run, saved as the run goes so a restarted run can pick up where the last one
+    # stopped.  Every voucher file is pickled as soon as it has been parsed and recorded in a manifest, and the
+    # entries plus their header grouping can be saved once grouping is done.  The manifest is tied to the list
+    # of voucher files (path, size and mtime) and to the options that change the shape of the parse results, so
+    # a checkpoint is only resumed for the same input, anything else starts the checkpoint over.  clear() is
+    # called when a run finishes.
+
+    def __init__(self, checkpoint_dir: Path, files_to_process: list[Path], run_options: dict):
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.checkpoint_dir / VOUCHER_CHECKPOINT_MANIFEST_FILENAME
+        self.run_key = {'version': VOUCHER_CHECKPOINT_FORMAT_VERSION,
+                        'options': run_options,
+                        'files': [get_file_signature(cur_file) for cur_file in files_to_process]}
+        self.completed_files: dict[str, str] = {}
+        self.grouping_saved = False
+
+        manifest = None
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                manifest = None
+        if manifest is not None and manifest.get('run_key') == self.run_key:
+            self.completed_files = manifest.get('completed_files', {})
+            self.grouping_saved = manifest.get('grouping_saved', False)
+            if self.completed_files:
+                print(f'\n  Resuming voucher run from checkpoint, {len(self.completed_files)} of '
+                      f'{len(files_to_process)} voucher files already parsed')
+        else:
+            self.clear()
+
+    # ==========================================================================
+    def get_completed_file(self, file_index: int):
+
+        checkpoint_file_name = self.completed_files.get(str(file_index))
+        if checkpoint_file_name is None:
+            return None
+
+        return load_checkpoint_pickle(self.checkpoint_dir / checkpoint_file_name)
+
+    # ==========================================================================
+    def save_completed_file(self, file_index: int, parsed_file) -> None:
+
+        checkpoint_file_name = f'file_{file_index:04d}.pkl'
+        save_checkpoint_pickle(self.checkpoint_dir / checkpoint_file_name, parsed_file)
+        self.completed_files[str(file_index)] = checkpoint_file_name
+        self.save_manifest()
+
+        return None
+
+    # ==========================================================================
+    def get_grouping_state(self):
+
+        if not self.grouping_saved:
+            return None
+
+        return load_checkpoint_pickle(self.checkpoint_dir / VOUCHER_CHECKPOINT_GROUPING_FILENAME)
+
+    # ==========================================================================
+    def save_grouping_state(self, grouping_state) -> None:
+
+        save_checkpoint_pickle(self.checkpoint_dir / VOUCHER_CHECKPOINT_GROUPING_FILENAME, grouping_state)
+        self.grouping_saved = True
+        self.save_manifest()
+
+        return None
+
+    # ==========================================================================
+    def save_manifest(self) -> None:
+
+        temp_manifest_path = self.manifest_path.with_suffix('.tmp')
+        with open(temp_manifest_path, 'w') as f:
+            json.dump({'run_key': self.run_key,
+                       'completed_files': self.completed_files,
+                       'grouping_saved': self.grouping_saved}, f, indent=2)
+        os.replace(temp_manifest_path, self.manifest_path)
+
+        return None
+
+    # ==========================================================================
+    def clear(self) -> None:
+
+        # only the files this class writes are removed, the directory itself is left in place
+        for cur_pattern in (VOUCHER_CHECKPOINT_MANIFEST_FILENAME, 'file_*.pkl', VOUCHER_CHECKPOINT_GROUPING_FILENAME,
+                            '*.tmp'):
+            for cur_file in self.checkpoint_dir.glob(cur_pattern):
+                cur_file.unlink()
+        self.completed_files = {}
+        self.grouping_saved = False
+
+        return None
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def get_file_signature(file_path: Path) -> list:
+
+    file_stat = file_path.stat()
+
+    return [str(file_path.resolve()), file_stat.st_size, file_stat.st_mtime_ns]
+
+
+# ==============================================================================
+def save_checkpoint_pickle(checkpoint_file_path: Path, data_to_save) -> None:
+    # written to a temp file first so a crash part way through never leaves a half written checkpoint behind
+
+    temp_file_path = checkpoint_file_path.with_suffix('.tmp')
+    with open(temp_file_path, 'wb') as f:
+        pickle.dump(data_to_save, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file_path, checkpoint_file_path)
+
+    return None
+
+
+# ==============================================================================
+def load_checkpoint_pickle(checkpoint_file_path: Path):
+
+    try:
+        with open(checkpoint_file_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import dataclasses
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherFileParser import VoucherIngestOptions, get_files_to_process
+from FastVoucherFileReview import (GLEntryHdrIDGroup, InputData, OutputData, VoucherFileReviewSS,
+                                   create_ss_workbook_and_formats, get_input_data, process_accounting_entries)
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+DIFF_NEW = 'New'
+DIFF_CHANGED_AMOUNT = 'Changed Amount'
+DIFF_PERSISTING = 'Persisting'
+DIFF_RESOLVED = 'Resolved'
+
+
+@dataclass
+class HdrGroupDiff:
+    # one unbalanced header group of either cycle and how it changed, the group of a cycle it is not unbalanced in
+    # is None
+    status: str
+    hdr_id: str
+    previous_hdr_group: GLEntryHdrIDGroup | None = None
+    current_hdr_group: GLEntryHdrIDGroup | None = None
+    note: str = ''
+
+
+@dataclass
+class VoucherCycle:
+    input_data: InputData
+    output_data: OutputData
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+# === Main
+# ==============================================================================
+def create_voucher_cycle_diff_spreadsheet(ingest_options: VoucherIngestOptions | None = None) -> None:
+    # Compares the unbalanced header groups of the current cycle (Input files/Voucher files) with those of the
+    # previous cycle (previous_cycle_dir), so the review can start from what is new today instead of the whole
+    # list.  Both cycles are read through the parse cache.
+    print('\n\nStart Create FAST Voucher Cycle Diff Spreadsheet')
+
+    if ingest_options is None:
+        ingest_options = VoucherIngestOptions()
+    ingest_options = dataclasses.replace(ingest_options, use_cache=True)
+
+    if not ingest_options.previous_cycle_dir.is_dir():
+        print(f'\n  Previous cycle folder {ingest_options.previous_cycle_dir} was not found')
+        print('\nEnd Create FAST Voucher Cycle Diff Spreadsheet')
+        return None
+
+    previous_cycle = get_voucher_cycle('previous', get_files_to_process(ingest_options.previous_cycle_dir),
+                                       ingest_options)
+    current_cycle = get_voucher_cycle('current', get_files_to_process(), ingest_options)
+
+    start_time = time.perf_counter()
+    hdr_group_diffs = diff_voucher_cycles(previous_cycle.output_data, current_cycle.output_data)
+    print_cycle_diff_to_console(hdr_group_diffs, time.perf_counter() - start_time)
+    write_cycle_diff_spreadsheet(previous_cycle, current_cycle, hdr_group_diffs)
+    print('\nEnd Create FAST Voucher Cycle Diff Spreadsheet')
+
+    return None
+
+
+# ==============================================================================
+def get_voucher_cycle(cycle_name: str, files_to_process: list[Path],
+                      ingest_options: VoucherIngestOptions) -> VoucherCycle:
+
+    print(f'\n  Reading the {cycle_name} cycle, {len(files_to_process)} voucher files')
+    input_data = get_input_data(ingest_options, files_to_process=files_to_process)
+    output_data = OutputData()
+    if input_data.unmatched_accounting_entries:
+        output_data = process_accounting_entries(input_data, ingest_options)
+
+    return VoucherCycle(input_data, output_data)
+
+
+# ==============================================================================
+def diff_voucher_cycles(previous_output: OutputData, current_output: OutputData) -> list[HdrGroupDiff]:
+    # Hash join of the unbalanced header groups of the two cycles on GLEntryHdrID: the previous cycle's groups go
+    # in a dict and each current group looks its header up, so the diff is linear in the size of the two cycles.
+    #   New            - unbalanced now, not unbalanced in the previous cycle
+    #   Changed Amount - unbalanced in both, the header amount is different
+    #   Persisting     - unbalanced in both with the same header amount
+    #   Resolved       - unbalanced in the previous cycle only, balanced now or not in the current cycle at all
+    # Returned grouped by status in that order, each status in the order the groups were listed.
+
+    previous_unbalanced = {cur_hdr_group.hdr_id: cur_hdr_group
+                           for cur_hdr_group in previous_output.unbalanced_hdr_groups}
+
+    diffs_by_status: dict[str, list[HdrGroupDiff]] = {DIFF_NEW: [], DIFF_CHANGED_AMOUNT: [], DIFF_PERSISTING: [],
+                                                      DIFF_RESOLVED: []}
+    for cur_hdr_group in current_output.unbalanced_hdr_groups:
+        previous_hdr_group = previous_unbalanced.pop(cur_hdr_group.hdr_id, None)
+        if previous_hdr_group is None:
+            status = DIFF_NEW
+        elif previous_hdr_group.hdr_amount != cur_hdr_group.hdr_amount:
+            status = DIFF_CHANGED_AMOUNT
+        else:
+            status = DIFF_PERSISTING
+        diffs_by_status[status].append(HdrGroupDiff(status, cur_hdr_group.hdr_id, previous_hdr_group, cur_hdr_group))
+
+    if previous_unbalanced:
+        current_balanced_hdr_ids = {cur_hdr_group.hdr_id for cur_hdr_group in current_output.balanced_hdr_groups}
+        for hdr_id, previous_hdr_group in previous_unbalanced.items():
+            note = 'Balanced in current cycle' if hdr_id in current_balanced_hdr_ids else 'Not in current cycle'
+            diffs_by_status[DIFF_RESOLVED].append(HdrGroupDiff(DIFF_RESOLVED, hdr_id, previous_hdr_group, None, note))
+
+    return [cur_diff for cur_diffs in diffs_by_status.values() for cur_diff in cur_diffs]
+
+
+# ==============================================================================
+def print_cycle_diff_to_console(hdr_group_diffs: list[HdrGroupDiff], diff_seconds: float) -> None:
+
+    num_by_status = {DIFF_NEW: 0, DIFF_CHANGED_AMOUNT: 0, DIFF_PERSISTING: 0, DIFF_RESOLVED: 0}
+    for cur_diff in hdr_group_diffs:
+        num_by_status[cur_diff.status] += 1
+
+    print('\n  Unbalanced header groups, current cycle against previous cycle')
+    for status, num_groups in num_by_status.items():
+        print(f'    {status} => {num_groups}')
+    print(f'  Diff time => {diff_seconds:.3f} sec')
+
+    return None
+
+
+# ==============================================================================
+def write_cycle_diff_spreadsheet(previous_cycle: VoucherCycle, current_cycle: VoucherCycle,
+                                 hdr_group_diffs: list[HdrGroupDiff]) -> None:
+    header_row = 1
+
+    previous_cycle_date = previous_cycle.input_data.file_info.cycle_date
+    voucher_ss: VoucherFileReviewSS = create_ss_workbook_and_formats(
+        current_cycle.input_data.file_info.cycle_date, f'Voucher Cycle Diff from {previous_cycle_date}')
+    status_fmts = {DIFF_NEW: voucher_ss.center_red_fmt,
+                   DIFF_CHANGED_AMOUNT: voucher_ss.center_orange_fmt,
+                   DIFF_PERSISTING: voucher_ss.center_fmt,
+                   DIFF_RESOLVED: voucher_ss.center_green_fmt}
+
+    # Set up the Cycle Diff worksheet tab to hold the unbalanced header groups of both cycles
+    diff_ws = voucher_ss.workbook.add_worksheet('Cycle Diff')
+    diff_ws.set_column('A:A', 20)  # Status
+    diff_ws.set_column('B:B', 55)  # GLEntryHdrID
+    diff_ws.set_column('C:E', 18)  # Previous Amount, Current Amount, Change
+    diff_ws.set_column('F:F', 20)  # Policy Number
+    diff_ws.set_column('G:H', 16)  # Previous Entries, Current Entries
+    diff_ws.set_column('I:I', 30)  # Note
+
+    diff_ws.write(f'A{header_row}', 'Status', voucher_ss.header_fmt)
+    diff_ws.write(f'B{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    diff_ws.write(f'C{header_row}', 'Previous Amount', voucher_ss.header_fmt)
+    diff_ws.write(f'D{header_row}', 'Current Amount', voucher_ss.header_fmt)
+    diff_ws.write(f'E{header_row}', 'Change', voucher_ss.header_fmt)
+    diff_ws.write(f'F{header_row}', 'Policy Number', voucher_ss.header_fmt)
+    diff_ws.write(f'G{header_row}', 'Previous Entries', voucher_ss.header_fmt)
+    diff_ws.write(f'H{header_row}', 'Current Entries', voucher_ss.header_fmt)
+    diff_ws.write(f'I{header_row}', 'Note', voucher_ss.header_fmt)
+    diff_ws.freeze_panes(1, 0)
+
+    ws_row = 1
+    for cur_diff in hdr_group_diffs:
+        previous_amount = cur_diff.previous_hdr_group.hdr_amount if cur_diff.previous_hdr_group else Decimal('0.00')
+        current_amount = cur_diff.current_hdr_group.hdr_amount if cur_diff.current_hdr_group else Decimal('0.00')
+        shown_hdr_group = cur_diff.current_hdr_group or cur_diff.previous_hdr_group
+        policy_num = shown_hdr_group.entries[0].policy_num if shown_hdr_group.entries else ''
+        diff_ws.write(ws_row, 0, cur_diff.status, status_fmts[cur_diff.status])
+        diff_ws.write(ws_row, 1, cur_diff.hdr_id, voucher_ss.left_fmt)
+        if cur_diff.previous_hdr_group:
+            diff_ws.write(ws_row, 2, previous_amount, voucher_ss.right_fmt)
+            diff_ws.write(ws_row, 6, len(cur_diff.previous_hdr_group.entries), voucher_ss.center_fmt)
+        if cur_diff.current_hdr_group:
+            diff_ws.write(ws_row, 3, current_amount, voucher_ss.right_fmt)
+            diff_ws.write(ws_row, 7, len(cur_diff.current_hdr_group.entries), voucher_ss.center_fmt)
+        diff_ws.write(ws_row, 4, current_amount - previous_amount, voucher_ss.right_fmt)
+        diff_ws.write(ws_row, 5, policy_num, voucher_ss.left_fmt)
+        diff_ws.write(ws_row, 8, cur_diff.note, voucher_ss.left_fmt)
+        ws_row += 1
+
+    voucher_ss.workbook.close()
+
+    return None
+
+
+if __name__ == "__main__":
+    create_voucher_cycle_diff_spreadsheet()
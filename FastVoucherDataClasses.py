@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+from dataclasses import dataclass
+from decimal import Decimal
+
+
+# Third party imports
+
+
+# local file imports
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+
+@dataclass
+class AccountEntry:
+    policy_num: str = ''
+    gl_entry_id: str = ''
+    gl_entry_hdr_id: str = ''
+    disbursement: str = ''
+    account: str = ''
+    amount: Decimal = Decimal('0.00')
+    reversal: str = ''
+    trans_type_desc: str = ''
+
+
+@dataclass
+class VoucherFileInfo:
+    cycle_date: str = ''
+    file_count: int = 0
+    total_credit_amount: Decimal = Decimal('0.00')
+    total_debit_amount: Decimal = Decimal('0.00')
+    number_of_records: int = 0
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def amount_text_to_decimal(amount_text: str) -> Decimal:
+
+    return Decimal(amount_text).quantize(Decimal('.01'))
+
+
+# ==============================================================================
+def amount_text_to_cents(amount_text: str) -> int:
+    # Converts an amount from the XML to integer cents.  Plain amounts with at most two decimal places are
+    # converted with integer math, anything else (exponents, more decimal places, surrounding blanks) goes
+    # through Decimal so the result always equals Decimal(amount_text).quantize(Decimal('.01')) in cents.
+
+    whole_text, _, fraction_text = amount_text.partition('.')
+    negative = whole_text.startswith('-')
+    if negative:
+        whole_text = whole_text[1:]
+    if (len(fraction_text) <= 2 and whole_text.isdecimal()
+            and (fraction_text == '' or fraction_text.isdecimal())):
+        cents = int(whole_text) * 100
+        if fraction_text:
+            cents += int(fraction_text.ljust(2, '0'))
+        return -cents if negative else cents
+
+    return int(Decimal(amount_text).quantize(Decimal('.01')).scaleb(2))
+
+
+# ==============================================================================
+def cents_to_decimal(cents: int) -> Decimal:
+    # the exact two decimal place Decimal for an integer cents value, e.g. -1234 => Decimal('-12.34')
+
+    return Decimal(cents).scaleb(-2)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import hashlib
+import math
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherDataClasses import AccountEntry
+from FastVoucherEntryStore import AccountEntryStore
+from FastVoucherReversals import REVERSAL_TRUE
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# one blake2b digest per GLEntryID feeds every filter, 64 bytes is 16 32-bit bit positions
+BLOOM_DIGEST_BYTES = 64
+# keys held by the first filter of a ScalableGLEntryIDBloomFilter, each later filter holds twice as many
+BLOOM_INITIAL_CAPACITY = 1 << 16
+# appended to the key of a reversing entry, a reversal carries the GLEntryID of the entry it reverses and is not a
+# repeat of it (GLEntryIDs come from XML text, which cannot hold a NUL)
+REVERSAL_KEY_SUFFIX = b'\x00reversal'
+
+
+@dataclass
+class DuplicateGLEntryIDs:
+    # (duplicate entry index, index of the first entry with the same GLEntryID) in entry order
+    duplicate_rows: list[tuple[int, int]] = field(default_factory=list)
+    num_candidates: int = 0
+    bloom_filter_bytes: int = 0
+
+
+class GLEntryIDBloomFilter:
+    # Bloom filter over GLEntryID digests.  num_bits and num_hashes are sized for capacity keys at
+    # false_positive_rate, which works out to about 1.8 bytes per key at 0.1%.  The num_hashes bit positions are
+    # unpacked from the front of the key digest from get_gl_entry_id_digest, so there is no hash call per filter.
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        capacity = max(1, capacity)
+        # the bit positions are 32-bit values, which caps the filter at 512 MB (around 2 billion keys at 0.1%)
+        self.num_bits = min(2 ** 32, max(64, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.num_hashes = min(BLOOM_DIGEST_BYTES // 4, max(1, round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.unpack_bit_positions = struct.Struct(f'<{self.num_hashes}I').unpack_from
+
+    def __getstate__(self) -> dict:
+        # a Struct does not pickle, it is made again from num_hashes when a checkpoint is loaded
+        state = self.__dict__.copy()
+        del state['unpack_bit_positions']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.unpack_bit_positions = struct.Struct(f'<{self.num_hashes}I').unpack_from
+
+    def add_and_check(self, key_digest: bytes) -> bool:
+        # sets the bits for the key and returns True if they were all set already, i.e. it may have been added before
+
+        bits = self.bits
+        num_bits = self.num_bits
+        maybe_seen = True
+        for bit in self.unpack_bit_positions(key_digest):
+            bit %= num_bits
+            mask = 1 << (bit & 7)
+            if not bits[bit >> 3] & mask:
+                maybe_seen = False
+                bits[bit >> 3] |= mask
+
+        return maybe_seen
+
+    def check(self, key_digest: bytes) -> bool:
+        # True if every bit for the key is set, without setting any
+
+        bits = self.bits
+        num_bits = self.num_bits
+        for bit in self.unpack_bit_positions(key_digest):
+            bit %= num_bits
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+
+        return True
+
+    def get_memory_size(self) -> int:
+        return len(self.bits)
+
+
+class ScalableGLEntryIDBloomFilter:
+    # Bloom filter that grows with the keys added, for when the number of GLEntryIDs is not known up front, e.g.
+    # while voucher files are still arriving.  Keys go into the newest GLEntryIDBloomFilter until it holds its
+    # capacity, then a new one with twice the capacity and half the false positive rate is started, so the false
+    # positive rate over all of them stays under false_positive_rate (half, plus a quarter, plus an eighth ...).
+    # A key counts as seen when any of the filters has all of its bits set.
+
+    def __init__(self, false_positive_rate: float = 0.001, initial_capacity: int = BLOOM_INITIAL_CAPACITY):
+        self.false_positive_rate = false_positive_rate
+        self.older_filters: list[GLEntryIDBloomFilter] = []
+        self.newest_filter = GLEntryIDBloomFilter(initial_capacity, false_positive_rate / 2)
+        self.newest_capacity = initial_capacity
+        self.num_newest_keys = 0
+
+    def add_and_check(self, key: bytes) -> bool:
+        # adds key and returns True if it may have been added before
+
+        key_digest = get_gl_entry_id_digest(key)
+        for cur_filter in self.older_filters:
+            if cur_filter.check(key_digest):
+                return True
+        if self.num_newest_keys >= self.newest_capacity:
+            if self.newest_filter.check(key_digest):
+                return True
+            self.older_filters.append(self.newest_filter)
+            self.newest_capacity *= 2
+            self.newest_filter = GLEntryIDBloomFilter(self.newest_capacity,
+                                                      self.false_positive_rate / 2 ** (len(self.older_filters) + 1))
+            self.num_newest_keys = 0
+        self.num_newest_keys += 1
+
+        return self.newest_filter.add_and_check(key_digest)
+
+    def get_memory_size(self) -> int:
+        return (self.newest_filter.get_memory_size()
+                + sum(cur_filter.get_memory_size() for cur_filter in self.older_filters))
+
+
+class GLEntryIDDuplicateIndex:
+    # Duplicate GLEntryID check kept up to date as the entries are read, the same way as AccountEntryIndex.  Call
+    # index_new_entries() after entries have been appended and only those new entries go through the Bloom
+    # filter, so the filter pass is done batch by batch during ingestion rather than as a pass of its own.  The
+    # filter only remembers bits, and the ids it claims to have seen before are the real duplicates plus a few
+    # false positives.  get_duplicates() confirms those candidates exactly with a dict that only ever holds
+    # candidate ids, reading the entries up to the last candidate.  Memory is the filter plus the candidates, not
+    # a set of every GLEntryID.  The key is the GLEntryID and the IsReversal flag, so a reversing entry that
+    # carries the GLEntryID of its original is left for the reversal netting rather than taken as a duplicate,
+    # while a second copy of either entry still is one.
+
+    def __init__(self, accounting_entries, false_positive_rate: float = 0.001):
+        self.accounting_entries = accounting_entries
+        self.bloom_filter = ScalableGLEntryIDBloomFilter(false_positive_rate)
+        self.candidate_ids: set[bytes] = set()
+        self.last_candidate_row = -1
+        self.num_indexed = 0
+
+    # ==========================================================================
+    def index_new_entries(self) -> None:
+
+        accounting_entries = self.accounting_entries
+        num_entries = len(accounting_entries)
+        if self.num_indexed >= num_entries:
+            return None
+
+        bloom_filter = self.bloom_filter
+        candidate_ids = self.candidate_ids
+        for row, cur_gl_entry_id in enumerate(get_duplicate_keys(accounting_entries, self.num_indexed, num_entries),
+                                              self.num_indexed):
+            if cur_gl_entry_id is not None and bloom_filter.add_and_check(cur_gl_entry_id):
+                candidate_ids.add(cur_gl_entry_id)
+                self.last_candidate_row = row
+        self.num_indexed = num_entries
+
+        return None
+
+    # ==========================================================================
+    def get_duplicates(self) -> DuplicateGLEntryIDs:
+        # the confirmed duplicates among the entries indexed so far
+
+        duplicates = DuplicateGLEntryIDs(num_candidates=len(self.candidate_ids),
+                                         bloom_filter_bytes=self.bloom_filter.get_memory_size())
+        if self.candidate_ids:
+            candidate_ids = self.candidate_ids
+            first_index_by_id: dict[bytes, int] = {}
+            for entry_index, cur_gl_entry_id in enumerate(get_duplicate_keys(self.accounting_entries, 0,
+                                                                             self.last_candidate_row + 1)):
+                if cur_gl_entry_id in candidate_ids:
+                    first_index = first_index_by_id.setdefault(cur_gl_entry_id, entry_index)
+                    if first_index != entry_index:
+                        duplicates.duplicate_rows.append((entry_index, first_index))
+
+        return duplicates
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def get_gl_entry_id_digest(key: bytes) -> bytes:
+
+    return hashlib.blake2b(key, digest_size=BLOOM_DIGEST_BYTES).digest()
+
+
+# ==============================================================================
+def get_duplicate_keys(accounting_entries: list[AccountEntry] | AccountEntryStore, start_row: int = 0,
+                       end_row: int | None = None) -> Iterator[bytes | None]:
+    # the UTF-8 bytes of the GLEntryID of each entry (or entries start_row up to end_row), with
+    # REVERSAL_KEY_SUFFIX on the reversing entries.  For an AccountEntryStore the GLEntryIDs are read straight from
+    # the packed column and the reversals by their dictionary codes.
+
+    if isinstance(accounting_entries, AccountEntryStore):
+        reversal_true_codes = {cur_code for cur_value, cur_code in accounting_entries.reversal.codes_by_value.items()
+                               if (cur_value or '').lower() == REVERSAL_TRUE}
+        reversal_codes = accounting_entries.reversal.codes[start_row:end_row]
+        for cur_gl_entry_id, cur_reversal in zip(accounting_entries.gl_entry_id.iter_encoded(start_row, end_row),
+                                                 reversal_codes):
+            if cur_gl_entry_id is not None and cur_reversal in reversal_true_codes:
+                cur_gl_entry_id += REVERSAL_KEY_SUFFIX
+            yield cur_gl_entry_id
+    else:
+        for row in range(start_row, len(accounting_entries) if end_row is None else end_row):
+            cur_entry = accounting_entries[row]
+            if cur_entry.gl_entry_id is None:
+                yield None
+            elif (cur_entry.reversal or '').lower() == REVERSAL_TRUE:
+                yield cur_entry.gl_entry_id.encode('utf-8') + REVERSAL_KEY_SUFFIX
+            else:
+                yield cur_entry.gl_entry_id.encode('utf-8')
+
+    return None
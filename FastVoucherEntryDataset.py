@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import json
+import os
+import pickle
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherEntryStore import AccountEntryStore
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# bump when the layout of the partition files changes so old partitions are no longer read
+ENTRY_DATASET_FORMAT_VERSION = 1
+ENTRY_DATASET_MANIFEST_FILENAME = 'partition.json'
+ENTRY_DATASET_PARTITION_PREFIX = 'cycle_date='
+# entries per row group, the unit a query reads or skips within a partition
+ENTRY_DATASET_ROW_GROUP_ENTRIES = 50_000
+ENTRY_DATASET_COLUMNS = ('policy_num', 'gl_entry_id', 'gl_entry_hdr_id', 'disbursement', 'account', 'amount_cents',
+                         'reversal', 'trans_type_desc')
+
+
+@dataclass
+class EntryQuery:
+    # Filters of an entry dataset query, a filter left empty matches every entry.  An entry matches when it
+    # matches every filter that is given, and one of the values of each.  Cycle dates are 'YYYY-MM-DD' and the
+    # range includes both ends.
+    accounts: list[str] = field(default_factory=list)
+    policy_nums: list[str] = field(default_factory=list)
+    hdr_ids: list[str] = field(default_factory=list)
+    start_cycle_date: str = ''
+    end_cycle_date: str = ''
+
+
+@dataclass
+class EntryQueryResults:
+    entries_by_cycle_date: dict[str, AccountEntryStore] = field(default_factory=dict)
+    num_partitions: int = 0
+    num_partitions_read: int = 0
+    num_row_groups: int = 0
+    num_row_groups_read: int = 0
+    num_entries_scanned: int = 0
+
+    @property
+    def num_entries(self) -> int:
+        return sum(len(cur_entries) for cur_entries in self.entries_by_cycle_date.values())
+
+
+class VoucherEntryDataset:
+    # The accounting entries of every reviewed cycle, kept on disk as a columnar dataset partitioned by cycle
+    # date so historical questions do not mean re-parsing archived voucher files.  Each cycle is a directory
+    # cycle_date=YYYY-MM-DD holding one file per AccountEntryStore column and a partition.json manifest.  The
+    # entries are sorted by policy number and GLEntryHdrID and cut into row groups of row_group_entries; a column
+    # file is the pickled column of each row group back to back, so any one column of any one row group can be
+    # read on its own with a seek.  The manifest keeps, per row group, the accounts in it and the lowest and
+    # highest policy number and GLEntryHdrID.  A query pushes its filters down in turn:
+    #   cycle date range - partitions outside it are never opened
+    #   manifest         - row groups whose accounts or policy / header ranges cannot match are never read
+    #   filter columns   - only the columns that are filtered on are read to find the matching rows, accounts
+    #                      are compared by dictionary code and ids as UTF-8 bytes, without decoding every row
+    #   other columns    - read only for row groups that have a matching row
+
+    def __init__(self, dataset_dir: Path, row_group_entries: int = ENTRY_DATASET_ROW_GROUP_ENTRIES):
+        self.dataset_dir = dataset_dir
+        self.row_group_entries = row_group_entries
+
+    # ==========================================================================
+    def write_partition(self, cycle_date: str, accounting_entries, source_files: list[str]) -> Path:
+        # Writes the entries of one cycle, replacing the partition of that cycle if it was written before.  The
+        # partition is written to a temporary directory first, so a query never sees half a partition.
+
+        if not isinstance(accounting_entries, AccountEntryStore):
+            accounting_entries = AccountEntryStore(accounting_entries)
+        sort_keys = [(cur_policy_num or '', cur_hdr_id or '')
+                     for cur_policy_num, cur_hdr_id in zip(accounting_entries.policy_num.iter_values(),
+                                                           accounting_entries.gl_entry_hdr_id.iter_values())]
+        sorted_rows = sorted(range(len(accounting_entries)), key=sort_keys.__getitem__)
+
+        partition_path = self.get_partition_path(cycle_date)
+        temp_partition_path = partition_path.with_name(partition_path.name + '.tmp')
+        if temp_partition_path.exists():
+            shutil.rmtree(temp_partition_path)
+        temp_partition_path.mkdir(parents=True)
+
+        row_groups = []
+        column_files = {cur_column_name: open(temp_partition_path / f'{cur_column_name}.pkl', 'wb')
+                        for cur_column_name in ENTRY_DATASET_COLUMNS}
+        try:
+            for start_row in range(0, len(sorted_rows), self.row_group_entries):
+                row_group_store = accounting_entries.select_rows(
+                    sorted_rows[start_row:start_row + self.row_group_entries])
+                row_group = get_row_group_stats(row_group_store)
+                for cur_column_name, cur_file in column_files.items():
+                    row_group['offsets'][cur_column_name] = cur_file.tell()
+                    pickle.dump(getattr(row_group_store, cur_column_name), cur_file, protocol=pickle.HIGHEST_PROTOCOL)
+                row_groups.append(row_group)
+        finally:
+            for cur_file in column_files.values():
+                cur_file.close()
+
+        manifest = {'format_version': ENTRY_DATASET_FORMAT_VERSION,
+                    'cycle_date': cycle_date,
+                    'num_entries': len(accounting_entries),
+                    'source_files': source_files,
+                    'row_groups': row_groups}
+        with open(temp_partition_path / ENTRY_DATASET_MANIFEST_FILENAME, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if partition_path.exists():
+            shutil.rmtree(partition_path)
+        os.replace(temp_partition_path, partition_path)
+
+        return partition_path
+
+    # ==========================================================================
+    def get_partition_path(self, cycle_date: str) -> Path:
+
+        return self.dataset_dir / f'{ENTRY_DATASET_PARTITION_PREFIX}{cycle_date}'
+
+    # ==========================================================================
+    def get_cycle_dates(self) -> list[str]:
+        # the cycle dates that have a partition, oldest first, taken from the directory names alone
+
+        if not self.dataset_dir.is_dir():
+            return []
+
+        return sorted(cur_path.name[len(ENTRY_DATASET_PARTITION_PREFIX):] for cur_path in self.dataset_dir.iterdir()
+                      if cur_path.is_dir() and cur_path.name.startswith(ENTRY_DATASET_PARTITION_PREFIX)
+                      and not cur_path.name.endswith('.tmp'))
+
+    # ==========================================================================
+    def query(self, entry_query: EntryQuery) -> EntryQueryResults:
+
+        query_results = EntryQueryResults()
+        cycle_dates = self.get_cycle_dates()
+        query_results.num_partitions = len(cycle_dates)
+        for cur_cycle_date in cycle_dates:
+            if entry_query.start_cycle_date and cur_cycle_date < entry_query.start_cycle_date:
+                continue
+            if entry_query.end_cycle_date and cur_cycle_date > entry_query.end_cycle_date:
+                continue
+            partition_entries = self.query_partition(cur_cycle_date, entry_query, query_results)
+            if partition_entries:
+                query_results.entries_by_cycle_date[cur_cycle_date] = partition_entries
+
+        return query_results
+
+    # ==========================================================================
+    def query_partition(self, cycle_date: str, entry_query: EntryQuery,
+                        query_results: EntryQueryResults) -> AccountEntryStore | None:
+
+        partition_path = self.get_partition_path(cycle_date)
+        try:
+            with open(partition_path / ENTRY_DATASET_MANIFEST_FILENAME) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            print(f'  Entry dataset partition {partition_path.name} could not be read, it was skipped')
+            return None
+        if manifest.get('format_version') != ENTRY_DATASET_FORMAT_VERSION:
+            print(f'  Entry dataset partition {partition_path.name} has an old format, it was skipped')
+            return None
+
+        query_results.num_partitions_read += 1
+        query_results.num_row_groups += len(manifest['row_groups'])
+        matching_row_groups = [cur_row_group for cur_row_group in manifest['row_groups']
+                               if row_group_may_match(cur_row_group, entry_query)]
+        if not matching_row_groups:
+            return None
+
+        filter_columns = get_query_filter_columns(entry_query)
+        partition_entries = AccountEntryStore()
+        column_files = {cur_column_name: open(partition_path / f'{cur_column_name}.pkl', 'rb')
+                        for cur_column_name in ENTRY_DATASET_COLUMNS}
+        try:
+            for cur_row_group in matching_row_groups:
+                query_results.num_row_groups_read += 1
+                query_results.num_entries_scanned += cur_row_group['num_entries']
+                row_group_store = AccountEntryStore()
+                read_row_group_columns(row_group_store, column_files, cur_row_group, filter_columns)
+                matching_rows = get_matching_rows(row_group_store, entry_query, cur_row_group['num_entries'])
+                if not matching_rows:
+                    continue
+                read_row_group_columns(row_group_store, column_files, cur_row_group,
+                                       [cur_column_name for cur_column_name in ENTRY_DATASET_COLUMNS
+                                        if cur_column_name not in filter_columns])
+                if len(matching_rows) == cur_row_group['num_entries']:
+                    partition_entries.extend(row_group_store)
+                else:
+                    partition_entries.extend(row_group_store.select_rows(matching_rows))
+        finally:
+            for cur_file in column_files.values():
+                cur_file.close()
+
+        return partition_entries
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def get_row_group_stats(row_group_store: AccountEntryStore) -> dict:
+    # the manifest record of a row group, the column offsets are filled in as the columns are written
+
+    policy_nums = [cur_policy_num or '' for cur_policy_num in row_group_store.policy_num.iter_values()]
+    hdr_ids = [cur_hdr_id or '' for cur_hdr_id in row_group_store.gl_entry_hdr_id.iter_values()]
+
+    return {'num_entries': len(row_group_store),
+            'accounts': row_group_store.account.values,
+            'min_policy_num': min(policy_nums),
+            'max_policy_num': max(policy_nums),
+            'min_hdr_id': min(hdr_ids),
+            'max_hdr_id': max(hdr_ids),
+            'offsets': {}}
+
+
+# ==============================================================================
+def row_group_may_match(row_group: dict, entry_query: EntryQuery) -> bool:
+    # False when the manifest record alone shows no entry of the row group can match the query
+
+    if entry_query.accounts and not set(entry_query.accounts).intersection(row_group['accounts']):
+        return False
+    if entry_query.policy_nums and not any(
+            row_group['min_policy_num'] <= cur_policy_num <= row_group['max_policy_num']
+            for cur_policy_num in entry_query.policy_nums):
+        return False
+    if entry_query.hdr_ids and not any(row_group['min_hdr_id'] <= cur_hdr_id <= row_group['max_hdr_id']
+                                       for cur_hdr_id in entry_query.hdr_ids):
+        return False
+
+    return True
+
+
+# ==============================================================================
+def get_query_filter_columns(entry_query: EntryQuery) -> list[str]:
+
+    filter_columns = []
+    if entry_query.accounts:
+        filter_columns.append('account')
+    if entry_query.policy_nums:
+        filter_columns.append('policy_num')
+    if entry_query.hdr_ids:
+        filter_columns.append('gl_entry_hdr_id')
+
+    return filter_columns
+
+
+# ==============================================================================
+def read_row_group_columns(row_group_store: AccountEntryStore, column_files: dict, row_group: dict,
+                           column_names: list[str]) -> None:
+
+    for cur_column_name in column_names:
+        cur_file = column_files[cur_column_name]
+        cur_file.seek(row_group['offsets'][cur_column_name])
+        setattr(row_group_store, cur_column_name, pickle.load(cur_file))
+
+    return None
+
+
+# ==============================================================================
+def get_matching_rows(row_group_store: AccountEntryStore, entry_query: EntryQuery, num_entries: int) -> list[int]:
+    # the rows of a row group that match every filter, only the filter columns need to have been read
+
+    matching_rows = range(num_entries)
+    if entry_query.accounts:
+        account_codes = {row_group_store.account.codes_by_value[cur_account] for cur_account in entry_query.accounts
+                         if cur_account in row_group_store.account.codes_by_value}
+        account_column_codes = row_group_store.account.codes
+        matching_rows = [row for row in matching_rows if account_column_codes[row] in account_codes]
+    for cur_column_name, cur_values in (('policy_num', entry_query.policy_nums),
+                                        ('gl_entry_hdr_id', entry_query.hdr_ids)):
+        if cur_values and matching_rows:
+            encoded_values = {cur_value.encode('utf-8') for cur_value in cur_values}
+            column_matches = [cur_encoded in encoded_values
+                              for cur_encoded in getattr(row_group_store, cur_column_name).iter_encoded()]
+            matching_rows = [row for row in matching_rows if column_matches[row]]
+
+    return list(matching_rows)
+
+
+# ==============================================================================
+def save_voucher_entry_dataset_partition(dataset_dir: Path, cycle_date: str, accounting_entries,
+                                         source_files: list[str]) -> None:
+
+    if not cycle_date:
+        print('\n  The voucher files have no cycle date, the entries were not added to the entry dataset')
+        return None
+
+    start_time = time.perf_counter()
+    partition_path = VoucherEntryDataset(dataset_dir).write_partition(cycle_date, accounting_entries, source_files)
+    print(f'\n  Entry dataset partition => {partition_path}, {len(accounting_entries)} entries '
+          f'in {time.perf_counter() - start_time:.2f} sec')
+
+    return None
+
+
+# ==============================================================================
+def print_entry_query_results_to_console(query_results: EntryQueryResults, query_seconds: float) -> None:
+
+    print(f'\n  Cycles in the entry dataset => {query_results.num_partitions}')
+    print(f'  Cycles read => {query_results.num_partitions_read}')
+    print(f'  Row groups read => {query_results.num_row_groups_read} of {query_results.num_row_groups}')
+    print(f'  Entries scanned => {query_results.num_entries_scanned}')
+    for cur_cycle_date, cur_entries in query_results.entries_by_cycle_date.items():
+        print(f'    {cur_cycle_date} => {len(cur_entries)} entries')
+    print(f'  Matching entries => {query_results.num_entries}')
+    print(f'  Query time => {query_seconds:.3f} sec')
+
+    return None
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import time
+from datetime import date
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherFileParser import VoucherIngestOptions
+from FastVoucherEntryDataset import (EntryQuery, EntryQueryResults, VoucherEntryDataset,
+                                     print_entry_query_results_to_console)
+from FastVoucherFileReview import (VoucherFileReviewSS, create_ss_workbook_and_formats,
+                                   write_account_entry_header_to_worksheet, write_account_entry_to_worksheet)
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+# === Main
+# ==============================================================================
+def query_voucher_entry_dataset(ingest_options: VoucherIngestOptions | None = None,
+                                entry_query: EntryQuery | None = None) -> None:
+    # Looks up accounting entries of earlier cycles in the entry dataset saved by the voucher reviews run with
+    # save_entry_dataset and writes them to a Voucher Entry Query workbook.  The filters are asked for on the
+    # console when no entry_query is given.
+    print('\n\nStart Query FAST Voucher Entry Dataset')
+
+    if ingest_options is None:
+        ingest_options = VoucherIngestOptions()
+    entry_dataset = VoucherEntryDataset(ingest_options.entry_dataset_dir)
+    cycle_dates = entry_dataset.get_cycle_dates()
+    if not cycle_dates:
+        print(f'\n  No cycles have been saved to the entry dataset in {ingest_options.entry_dataset_dir}')
+        print('\nEnd Query FAST Voucher Entry Dataset')
+        return None
+
+    print(f'\n  Entry dataset cycles => {cycle_dates[0]} to {cycle_dates[-1]}, {len(cycle_dates)} cycles')
+    if entry_query is None:
+        entry_query = get_entry_query_from_console()
+
+    start_time = time.perf_counter()
+    query_results = entry_dataset.query(entry_query)
+    print_entry_query_results_to_console(query_results, time.perf_counter() - start_time)
+    if query_results.num_entries:
+        write_entry_query_results_spreadsheet(query_results)
+    print('\nEnd Query FAST Voucher Entry Dataset')
+
+    return None
+
+
+# ==============================================================================
+def get_entry_query_from_console() -> EntryQuery:
+    # each filter can list several values separated by commas, an empty answer leaves the filter off
+
+    print('\n  Enter the values to look for, separated by commas, or press Enter to match every entry')
+    entry_query = EntryQuery()
+    entry_query.policy_nums = get_console_values('Policy Numbers')
+    entry_query.accounts = get_console_values('Accounts')
+    entry_query.hdr_ids = get_console_values('GLEntryHdrIDs')
+    entry_query.start_cycle_date = input('   First Cycle Date (YYYY-MM-DD) ==> ').strip()
+    entry_query.end_cycle_date = input('   Last Cycle Date (YYYY-MM-DD)  ==> ').strip()
+
+    return entry_query
+
+
+# ==============================================================================
+def get_console_values(prompt: str) -> list[str]:
+
+    user_input = input(f'   {prompt} ==> ')
+
+    return [cur_value.strip() for cur_value in user_input.split(',') if cur_value.strip()]
+
+
+# ==============================================================================
+def write_entry_query_results_spreadsheet(query_results: EntryQueryResults) -> None:
+
+    voucher_ss: VoucherFileReviewSS = create_ss_workbook_and_formats(date.today().isoformat(), 'Voucher Entry Query')
+
+    # Set up the Query Entries worksheet tab to hold the entries found, with the cycle date of each in the last column
+    query_ws = voucher_ss.workbook.add_worksheet('Query Entries')
+    query_ws.set_column('A:B', 20)  # Policy Number, Entry Type
+    query_ws.set_column('C:C', 40)  # Account
+    query_ws.set_column('D:F', 18)  # Amount, Reversal, Disbursement
+    query_ws.set_column('G:G', 28)  # Transaction Type
+    query_ws.set_column('H:I', 55)  # GLEntryID, GLEntryHdrID
+    query_ws.set_column('J:J', 18)  # Cycle Date
+
+    write_account_entry_header_to_worksheet(voucher_ss, query_ws)
+    query_ws.write('J1', 'Cycle Date', voucher_ss.header_fmt)
+    query_ws.freeze_panes(1, 0)
+
+    ws_row = 1
+    for cur_cycle_date, cur_entries in query_results.entries_by_cycle_date.items():
+        for cur_entry in cur_entries:
+            write_account_entry_to_worksheet(voucher_ss, query_ws, ws_row, cur_entry)
+            query_ws.write(ws_row, 9, cur_cycle_date, voucher_ss.center_fmt)
+            ws_row += 1
+
+    voucher_ss.workbook.close()
+
+    return None
+
+
+if __name__ == "__main__":
+    query_voucher_entry_dataset()
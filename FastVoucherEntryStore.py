@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from decimal import Decimal
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherDataClasses import AccountEntry, cents_to_decimal
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+
+class CategoricalColumn:
+    # Dictionary encoded column for values that repeat a lot (account names, transaction types, flags).  Each
+    # distinct value is stored once and every row only holds a 4 byte code into the list of values.
+
+    def __init__(self):
+        self.values: list = []
+        self.codes_by_value: dict = {}
+        self.codes = array('I')
+
+    def append(self, value) -> None:
+        code = self.codes_by_value.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes_by_value[value] = code
+        self.codes.append(code)
+
+    def __getitem__(self, row: int):
+        return self.values[self.codes[row]]
+
+    def extend_from_column(self, other: 'CategoricalColumn') -> None:
+        # re-map the other column's codes onto this column's values
+        code_map = array('I')
+        for cur_value in other.values:
+            code = self.codes_by_value.get(cur_value)
+            if code is None:
+                code = len(self.values)
+                self.values.append(cur_value)
+                self.codes_by_value[cur_value] = code
+            code_map.append(code)
+        self.codes.extend(array('I', (code_map[cur_code] for cur_code in other.codes)))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get_memory_size(self) -> int:
+        return (self.codes.buffer_info()[1] * self.codes.itemsize + sys.getsizeof(self.codes_by_value)
+                + sum(sys.getsizeof(cur_value) for cur_value in self.values))
+
+
+class StringColumn:
+    # Column for mostly unique strings (GLEntryID, GLEntryHdrID, policy number).  The UTF-8 bytes of every row
+    # are packed back to back in one bytearray with an offsets array marking where each row starts, which avoids
+    # a separate str object per row.  Rows that were None are remembered in null_rows.
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+        self.null_rows: set[int] = set()
+
+    def append(self, value: str | None) -> None:
+        if value is None:
+            self.null_rows.add(len(self.offsets) - 1)
+        else:
+            self.data += value.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, row: int) -> str | None:
+        if self.null_rows and row in self.null_rows:
+            return None
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def iter_encoded(self, start_row: int = 0, end_row: int | None = None) -> Iterator[bytes | None]:
+        # the UTF-8 bytes of each row (or rows start_row up to end_row) without decoding them, None for null rows
+        data = self.data
+        offsets = self.offsets
+        null_rows = self.null_rows
+        for row in range(start_row, len(offsets) - 1 if end_row is None else end_row):
+            if null_rows and row in null_rows:
+                yield None
+            else:
+                yield bytes(data[offsets[row]:offsets[row + 1]])
+
+    def iter_values(self, start_row: int = 0, end_row: int | None = None) -> Iterator[str | None]:
+        # every row in order (or rows start_row up to end_row), decoded straight from the buffer without going
+        # through __getitem__
+        data = self.data
+        offsets = self.offsets
+        null_rows = self.null_rows
+        for row in range(start_row, len(offsets) - 1 if end_row is None else end_row):
+            if null_rows and row in null_rows:
+                yield None
+            else:
+                yield data[offsets[row]:offsets[row + 1]].decode('utf-8')
+
+    def extend_from_column(self, other: 'StringColumn') -> None:
+        row_base = len(self)
+        data_base = len(self.data)
+        self.data += other.data
+        self.offsets.extend(array('Q', (data_base + cur_offset for cur_offset in other.offsets[1:])))
+        self.null_rows.update(row_base + cur_row for cur_row in other.null_rows)
+
+    def get_memory_size(self) -> int:
+        return len(self.data) + self.offsets.buffer_info()[1] * self.offsets.itemsize
+
+
+class AccountEntryRow:
+    # Lightweight read-only view of one row in an AccountEntryStore.  It has the same attribute names as
+    # AccountEntry, so the grouping and spreadsheet code can use either one.
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store: 'AccountEntryStore', row: int):
+        self.store = store
+        self.row = row
+
+    @property
+    def policy_num(self) -> str:
+        return self.store.policy_num[self.row]
+
+    @property
+    def gl_entry_id(self) -> str:
+        return self.store.gl_entry_id[self.row]
+
+    @property
+    def gl_entry_hdr_id(self) -> str:
+        return self.store.gl_entry_hdr_id[self.row]
+
+    @property
+    def disbursement(self) -> str:
+        return self.store.disbursement[self.row]
+
+    @property
+    def account(self) -> str:
+        return self.store.account[self.row]
+
+    @property
+    def amount(self) -> Decimal:
+        return cents_to_decimal(self.store.amount_cents[self.row])
+
+    @property
+    def amount_cents(self) -> int:
+        return self.store.amount_cents[self.row]
+
+    @property
+    def reversal(self) -> str:
+        return self.store.reversal[self.row]
+
+    @property
+    def trans_type_desc(self) -> str:
+        return self.store.trans_type_desc[self.row]
+
+    def to_account_entry(self) -> AccountEntry:
+        return AccountEntry(self.policy_num, self.gl_entry_id, self.gl_entry_hdr_id, self.disbursement,
+                            self.account, self.amount, self.reversal, self.trans_type_desc)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (AccountEntryRow, AccountEntry)):
+            return (self.gl_entry_id == other.gl_entry_id and self.gl_entry_hdr_id == other.gl_entry_hdr_id
+                    and self.amount == other.amount and self.account == other.account
+                    and self.policy_num == other.policy_num and self.disbursement == other.disbursement
+                    and self.reversal == other.reversal and self.trans_type_desc == other.trans_type_desc)
+        return NotImplemented
+
+    # compares by value like AccountEntry, which is not hashable either
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'AccountEntryRow({self.row}, {self.to_account_entry()!r})'
+
+
+class AccountEntryStore:
+    # Columnar replacement for a list[AccountEntry].  Repeating fields are dictionary encoded, the mostly unique
+    # ids are packed into byte buffers and the amounts are kept as integer cents in a 64-bit array.  It supports
+    # the list operations the voucher tools use (append, extend, len, iteration and indexing), handing out
+    # AccountEntryRow views instead of AccountEntry objects.
+
+    def __init__(self, entries: Iterable[AccountEntry] = ()):
+        self.policy_num = StringColumn()
+        self.gl_entry_id = StringColumn()
+        self.gl_entry_hdr_id = StringColumn()
+        self.disbursement = CategoricalColumn()
+        self.account = CategoricalColumn()
+        self.amount_cents = array('q')
+        self.reversal = CategoricalColumn()
+        self.trans_type_desc = CategoricalColumn()
+        self.extend(entries)
+
+    def append(self, entry: AccountEntry) -> None:
+        self.policy_num.append(entry.policy_num)
+        self.gl_entry_id.append(entry.gl_entry_id)
+        self.gl_entry_hdr_id.append(entry.gl_entry_hdr_id)
+        self.disbursement.append(entry.disbursement)
+        self.account.append(entry.account)
+        self.amount_cents.append(int(entry.amount.scaleb(2)))
+        self.reversal.append(entry.reversal)
+        self.trans_type_desc.append(entry.trans_type_desc)
+
+    def append_fields(self, policy_num: str, gl_entry_id: str, gl_entry_hdr_id: str, disbursement: str,
+                      account: str, amount_cents: int, reversal: str, trans_type_desc: str) -> None:
+        self.policy_num.append(policy_num)
+        self.gl_entry_id.append(gl_entry_id)
+        self.gl_entry_hdr_id.append(gl_entry_hdr_id)
+        self.disbursement.append(disbursement)
+        self.account.append(account)
+        self.amount_cents.append(amount_cents)
+        self.reversal.append(reversal)
+        self.trans_type_desc.append(trans_type_desc)
+
+    def extend(self, entries: Iterable[AccountEntry]) -> None:
+        if isinstance(entries, AccountEntryStore):
+            # column by column copy, the other store's rows are never materialized
+            for cur_column_name in ('policy_num', 'gl_entry_id', 'gl_entry_hdr_id', 'disbursement', 'account',
+                                    'reversal', 'trans_type_desc'):
+                getattr(self, cur_column_name).extend_from_column(getattr(entries, cur_column_name))
+            self.amount_cents.extend(entries.amount_cents)
+        else:
+            for cur_entry in entries:
+                self.append(cur_entry)
+
+    def select_rows(self, rows: Iterable[int]) -> 'AccountEntryStore':
+        # a new store holding just the given rows, in the order given
+        selected_store = AccountEntryStore()
+        for row in rows:
+            selected_store.append_fields(self.policy_num[row], self.gl_entry_id[row], self.gl_entry_hdr_id[row],
+                                         self.disbursement[row], self.account[row], self.amount_cents[row],
+                                         self.reversal[row], self.trans_type_desc[row])
+        return selected_store
+
+    def get_total_cents(self) -> int:
+        return sum(self.amount_cents)
+
+    def __len__(self) -> int:
+        return len(self.amount_cents)
+
+    def __getitem__(self, row: int) -> AccountEntryRow:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('AccountEntryStore row out of range')
+        return AccountEntryRow(self, row)
+
+    def __iter__(self) -> Iterator[AccountEntryRow]:
+        for row in range(len(self)):
+            yield AccountEntryRow(self, row)
+
+    def get_memory_size(self) -> int:
+        return (self.policy_num.get_memory_size() + self.gl_entry_id.get_memory_size()
+                + self.gl_entry_hdr_id.get_memory_size() + self.disbursement.get_memory_size()
+                + self.account.get_memory_size() + self.reversal.get_memory_size()
+                + self.trans_type_desc.get_memory_size()
+                + self.amount_cents.buffer_info()[1] * self.amount_cents.itemsize)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# bump when the layout of the cached parse results changes so old cache files are no longer picked up
+VOUCHER_CACHE_FORMAT_VERSION = 1
+VOUCHER_CACHE_INDEX_FILENAME = 'voucher_cache_index.json'
+
+
+class VoucherFileCache:
+    # On-disk cache of parsed voucher files.  Each parse result is pickled to a file named after the SHA-256 of
+    # the voucher file contents and its size, so a renamed or copied extract still hits.  The index remembers the
+    # size, mtime and hash last seen for each voucher path, which lets an unchanged file skip re-hashing.  When
+    # the cache files add up to more than max_bytes the least recently used ones are deleted.
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / VOUCHER_CACHE_INDEX_FILENAME
+        self.index: dict[str, dict] = {}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path) as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+
+    # ==========================================================================
+    def get_cache_key(self, file_path: Path, variant: str = '') -> str:
+        # variant keeps differently shaped parse results of the same file apart, e.g. Decimal vs integer cents
+
+        file_stat = file_path.stat()
+        index_key = str(file_path.resolve())
+        index_rec = self.index.get(index_key)
+        if (index_rec is not None and index_rec.get('size') == file_stat.st_size
+                and index_rec.get('mtime_ns') == file_stat.st_mtime_ns):
+            content_hash = index_rec['sha256']
+        else:
+            content_hash = hash_file_contents(file_path)
+            self.index[index_key] = {'size': file_stat.st_size,
+                                     'mtime_ns': file_stat.st_mtime_ns,
+                                     'sha256': content_hash}
+
+        cache_key = f'{content_hash}-{file_stat.st_size}-v{VOUCHER_CACHE_FORMAT_VERSION}'
+        if variant:
+            cache_key += '-' + variant
+
+        return cache_key
+
+    # ==========================================================================
+    def get(self, cache_key: str):
+
+        cached_data = None
+        cache_file_path = self.cache_dir / (cache_key + '.pkl')
+        if cache_file_path.exists():
+            try:
+                with open(cache_file_path, 'rb') as f:
+                    cached_data = pickle.load(f)
+                # touch the cache file so eviction sees it as recently used
+                os.utime(cache_file_path)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                cached_data = None
+
+        return cached_data
+
+    # ==========================================================================
+    def put(self, cache_key: str, data_to_cache) -> None:
+
+        cache_file_path = self.cache_dir / (cache_key + '.pkl')
+        temp_file_path = cache_file_path.with_suffix('.tmp')
+        with open(temp_file_path, 'wb') as f:
+            pickle.dump(data_to_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_path, cache_file_path)
+
+        return None
+
+    # ==========================================================================
+    def evict_and_save_index(self) -> None:
+
+        cache_files = sorted(self.cache_dir.glob('*.pkl'), key=lambda cur_file: cur_file.stat().st_mtime)
+        total_bytes = sum(cur_file.stat().st_size for cur_file in cache_files)
+        for cur_file in cache_files:
+            if total_bytes <= self.max_bytes:
+                break
+            total_bytes -= cur_file.stat().st_size
+            cur_file.unlink()
+            print(f'  Evicted voucher cache file ==> {cur_file.name}')
+
+        # forget index entries for voucher files that no longer exist
+        self.index = {cur_path: cur_rec for cur_path, cur_rec in self.index.items() if Path(cur_path).exists()}
+        temp_index_path = self.index_path.with_suffix('.tmp')
+        with open(temp_index_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(temp_index_path, self.index_path)
+
+        return None
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def hash_file_contents(file_path: Path) -> str:
+
+    file_hash = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for cur_block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+            file_hash.update(cur_block)
+
+    return file_hash.hexdigest()
@@ -0,0 +1,748 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import codecs
+import gzip
+import mmap
+import os
+import re
+import time
+import zipfile
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+from lxml import etree
+from decimal import Decimal
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherDataClasses import AccountEntry, VoucherFileInfo, amount_text_to_cents, amount_text_to_decimal
+from FastVoucherCheckpoint import VoucherRunCheckpoint
+from FastVoucherEntryStore import AccountEntryStore
+from FastVoucherFileCache import VoucherFileCache
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+
+@dataclass
+class VoucherIngestOptions:
+    # 'dom'    - parse the whole extract into an element tree, then walk it
+    # 'stream' - iterparse the extract, yielding entries as each GLExtractReport closes
+    mode: str = 'dom'
+    # parse each voucher file in its own worker process, max_workers of 0 uses every CPU core
+    parallel_files: bool = False
+    max_workers: int = 0
+    # split files of at least split_file_min_bytes at GLExtractReport boundaries and parse the pieces concurrently
+    split_large_files: bool = False
+    split_file_min_bytes: int = 64 * 1024 * 1024
+    # reuse parse results saved by earlier runs for voucher files whose contents have not changed
+    use_cache: bool = False
+    cache_dir: Path = Path('Cache files') / 'Voucher files'
+    cache_max_bytes: int = 4 * 1024 * 1024 * 1024
+    # hold the accounting entries in a columnar AccountEntryStore instead of a list of AccountEntry objects
+    use_entry_store: bool = False
+    # parse ConvertedAmount straight to integer cents and keep all sums in cents until the spreadsheet is written,
+    # the entries are held in an AccountEntryStore
+    fixed_point_amounts: bool = False
+    # group the entries by GLEntryHdrID through hash partitioned spill files when the in-memory grouping is
+    # estimated to need more than grouping_memory_budget_bytes, 0 always groups in memory.  spill_dir of None
+    # puts the spill files in the system temp directory.
+    grouping_memory_budget_bytes: int = 0
+    spill_dir: Path | None = None
+    # look for GLEntryIDs that occur more than once across the voucher files (overlapping extracts), list them on
+    # their own sheet and, with exclude_duplicate_entries, leave every occurrence after the first out of the
+    # header group balancing and the EFT list.  A reversing entry with the GLEntryID of the entry it reverses is not
+    # a repeat of it, see net_reversals
+    detect_duplicate_entries: bool = False
+    exclude_duplicate_entries: bool = False
+    # pipelined voucher review: entries per batch handed between stages and batches each stage queue can hold
+    # before the stage feeding it has to wait
+    pipeline_batch_entries: int = 5_000
+    pipeline_queue_batches: int = 8
+    # save every voucher file as soon as it is parsed so a run that is stopped part way through resumes from the
+    # last parsed file, checkpoint_grouping also saves the entries once they are grouped by GLEntryHdrID
+    use_checkpoint: bool = False
+    checkpoint_dir: Path = Path('Cache files') / 'Checkpoints'
+    checkpoint_grouping: bool = False
+    # watch folder mode: seconds between looks at the voucher folder, a file is read once its size and modified
+    # time are the same on two looks in a row.  Once watch_expected_files files have been read the workbook is
+    # written and the watch ends, 0 keeps watching until it is told to stop.
+    watch_poll_seconds: float = 2.0
+    watch_expected_files: int = 0
+    # choose mode, entry store, parallel / split parsing and the grouping budget from the size of the voucher
+    # files, keeping the estimated memory within memory_budget_bytes (0 uses half the physical memory)
+    auto_plan: bool = False
+    memory_budget_bytes: int = 0
+    # GL accounts whose entries are listed on a sheet of their own, next to the EFT Transactions sheet
+    watch_accounts: list[str] = field(default_factory=list)
+    # look for unbalanced header groups that offset each other (pairs, or sets of up to offsetting_max_set_size
+    # groups of one policy) and list them on their own sheet.  A policy with more than offsetting_max_bucket_groups
+    # unbalanced groups left after the same policy pairs is left out of the set search, which grows exponentially
+    # with it.
+    detect_offsetting_groups: bool = False
+    offsetting_max_set_size: int = 4
+    offsetting_max_bucket_groups: int = 20
+    # net reversing entries (IsReversal true) against the entries they reverse before the header groups are
+    # balanced, both are left out of the balancing and the account lists and listed on a Netted Reversals sheet
+    net_reversals: bool = False
+    # with net_reversals, also net a reversal that has no GLEntryID match against a posting with the same policy,
+    # account, transaction type and disbursement and the opposite amount
+    net_reversals_by_fields: bool = False
+    # cycle diff mode: folder holding the voucher files of the cycle the current cycle is compared against.  Both
+    # cycles are parsed through the parse cache, so a cycle that was already reviewed with use_cache is not parsed
+    # again.
+    previous_cycle_dir: Path = Path('Input files') / 'Previous voucher files'
+    # once the review is written, save the accounting entries to the entry dataset in entry_dataset_dir as the
+    # partition of their cycle date, replacing it if the cycle was saved before, so they can be queried later
+    # without parsing the voucher files again
+    save_entry_dataset: bool = False
+    entry_dataset_dir: Path = Path('Voucher entry dataset')
+    # ACH-EFT compare: match each EFT entry to an ACH transaction with the same policy number and amount first,
+    # and only fall back to an ACH transaction of the same amount for the EFT entries left unmatched
+    ach_match_policy_first: bool = False
+
+
+@dataclass
+class GLExtractField:
+    # one child element of GLExtractReport: its tag, an optional converter for the element text and the value
+    # used when the element is missing
+    tag: str
+    converter: Callable[[str], object] | None = None
+    default: object = ''
+
+
+class GLExtractFieldExtractor:
+    # Compiles a list of GLExtractField into a tag => slot lookup.  extract() makes one pass over the children of
+    # a GLExtractReport, drops each wanted text into its slot and then runs the converters, returning the values
+    # in field list order.  New GL fields only need a new GLExtractField, the loop itself never changes.  The one
+    # pass measured faster than lxml findtext or compiled XPath, per field or per record, in
+    # FastVoucherBenchmarks.benchmark_gl_extract_field_extraction.
+
+    NOT_FOUND = object()
+
+    def __init__(self, extract_fields: list[GLExtractField]):
+        self.num_fields = len(extract_fields)
+        self.slot_by_tag = {cur_field.tag: slot for slot, cur_field in enumerate(extract_fields)}
+        self.initial_values = [self.NOT_FOUND if cur_field.converter is not None else cur_field.default
+                               for cur_field in extract_fields]
+        self.converters = [(slot, cur_field.converter, cur_field.default)
+                           for slot, cur_field in enumerate(extract_fields) if cur_field.converter is not None]
+
+    def extract(self, cur_xtract_rpt: etree.Element) -> list:
+        values = self.initial_values.copy()
+        slot_by_tag = self.slot_by_tag
+        num_fields = self.num_fields
+        num_fields_found = 0
+        for cur_elem in cur_xtract_rpt:
+            slot = slot_by_tag.get(cur_elem.tag)
+            if slot is not None:
+                values[slot] = cur_elem.text
+                num_fields_found += 1
+                if num_fields_found == num_fields:
+                    break
+        not_found = self.NOT_FOUND
+        for slot, converter, default in self.converters:
+            raw_value = values[slot]
+            values[slot] = default if raw_value is not_found else converter(raw_value)
+
+        return values
+
+
+@dataclass
+class ParsedVoucherFile:
+    file_path: Path
+    file_info: VoucherFileInfo = field(default_factory=VoucherFileInfo)
+    entries: list[AccountEntry] | AccountEntryStore = field(default_factory=list)
+    parse_seconds: float = 0.0
+    from_cache: bool = False
+    from_checkpoint: bool = False
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+VOUCHER_FILE_INFO_TAGS = ('CycleDate', 'FileCount', 'TotalCreditAmount', 'TotalDebitAmount', 'NumberOfRecords')
+
+EXTRACT_RPT_START_TAG = b'<GLExtractReport'
+EXTRACT_RPT_END_TAG = b'</GLExtractReport'
+XML_DECLARATION_ENCODING = re.compile(rb'^\s*<\?xml[^>]*encoding=["\']([A-Za-z0-9._-]+)["\']')
+MIN_SPLIT_CHUNK_BYTES = 8 * 1024 * 1024
+# archived cycles, read through open_voucher_xml_sources without unpacking them first
+COMPRESSED_VOUCHER_FILE_SUFFIXES = ('.gz', '.zip')
+# read size used when scanning a compressed extract for its control fields
+QUICK_SCAN_BLOCK_BYTES = 1024 * 1024
+
+# GLExtractReport fields in AccountEntry field order, amounts as Decimal
+GL_EXTRACT_FIELDS = [
+    GLExtractField('PolicyNumber'),
+    GLExtractField('GLEntryID'),
+    GLExtractField('GLEntryHdrID'),
+    GLExtractField('IsDisbursmentTxnRelated'),
+    GLExtractField('AccountNumber'),
+    GLExtractField('ConvertedAmount', amount_text_to_decimal, Decimal('0.00')),
+    GLExtractField('IsReversal'),
+    GLExtractField('TransactionTypeDescription'),
+]
+# the same fields with the amount as integer cents, in AccountEntryStore.append_fields order
+GL_EXTRACT_CENTS_FIELDS = [GLExtractField('ConvertedAmount', amount_text_to_cents, 0)
+                           if cur_field.tag == 'ConvertedAmount' else cur_field for cur_field in GL_EXTRACT_FIELDS]
+
+ACCOUNT_ENTRY_EXTRACTOR = GLExtractFieldExtractor(GL_EXTRACT_FIELDS)
+ACCOUNT_ENTRY_CENTS_EXTRACTOR = GLExtractFieldExtractor(GL_EXTRACT_CENTS_FIELDS)
+
+
+# ==============================================================================
+def uses_parsed_voucher_files(ingest_options: VoucherIngestOptions) -> bool:
+    # True when the ingest options need parse_voucher_files rather than the plain file by file dom/stream loop
+
+    return (ingest_options.parallel_files or ingest_options.split_large_files or ingest_options.use_cache
+            or ingest_options.fixed_point_amounts or ingest_options.use_checkpoint)
+
+
+# ==============================================================================
+def get_files_to_process(input_files_path: Path | None = None) -> list[Path]:
+    # the voucher files of the current cycle, or of the cycle in input_files_path
+
+    input_files: list[Path] = []
+    if input_files_path is None:
+        input_files_path = Path(Path.cwd() / 'Input files' / 'Voucher files')
+    for cur_file in Path(input_files_path).iterdir():
+        input_files.append(cur_file)
+
+    return input_files
+
+
+# ==============================================================================
+def read_and_parse_xml_in_file(xml_file_path: Path) -> etree.Element:
+
+    print(f'\n  Parsing XML File data ==> {xml_file_path.name}')
+    etree_root = None
+    if xml_file_path.exists():
+        for cur_xml_source in open_voucher_xml_sources(xml_file_path):
+            cur_root = etree.parse(cur_xml_source).getroot()
+            if etree_root is None:
+                etree_root = cur_root
+            else:
+                # further extracts in a zip archive are read as if they followed on in the same file
+                etree_root.extend(list(cur_root))
+
+    return etree_root
+
+
+# ==============================================================================
+def is_compressed_voucher_file(xml_file_path: Path) -> bool:
+
+    return xml_file_path.suffix.lower() in COMPRESSED_VOUCHER_FILE_SUFFIXES
+
+
+# ==============================================================================
+def open_voucher_xml_sources(xml_file_path: Path) -> Iterator[BinaryIO | mmap.mmap]:
+    # Yields a binary source for each XML extract in a voucher file so lxml gets the raw bytes and does its own
+    # decoding.  A plain extract is memory-mapped, a .gz is decompressed as it is read and each file in a .zip is
+    # read straight out of the archive in archive order, nothing is unpacked to disk.  A source is closed as soon
+    # as the generator moves past it.
+
+    suffix = xml_file_path.suffix.lower()
+    if suffix == '.gz':
+        with gzip.open(xml_file_path, 'rb') as f:
+            yield f
+    elif suffix == '.zip':
+        with zipfile.ZipFile(xml_file_path) as zip_file:
+            for cur_member in zip_file.infolist():
+                if not cur_member.is_dir():
+                    with zip_file.open(cur_member) as f:
+                        yield f
+    else:
+        with open(xml_file_path, 'rb') as f:
+            # an empty file cannot be mapped, hand the file itself to lxml so it reports the usual parse error
+            if os.fstat(f.fileno()).st_size == 0:
+                yield f
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as xml_data:
+                    yield xml_data
+
+    return None
+
+
+# ==============================================================================
+def process_file_info_element(cur_elem: etree.Element, file_info: VoucherFileInfo) -> None:
+    match cur_elem.tag:
+        case 'CycleDate':
+            file_info.cycle_date = cur_elem.text[0:10]
+        case 'FileCount':
+            file_info.file_count = int(cur_elem.text)
+        case 'TotalCreditAmount':
+            file_info.total_credit_amount = Decimal(cur_elem.text).quantize(Decimal('.01'))
+        case 'TotalDebitAmount':
+            file_info.total_debit_amount = Decimal(cur_elem.text).quantize(Decimal('.01'))
+        case 'NumberOfRecords':
+            file_info.number_of_records = int(cur_elem.text)
+        case _:
+            pass
+
+    return None
+
+
+# ==============================================================================
+def process_cur_extract_rpt(cur_xtract_rpt: etree.Element) -> AccountEntry:
+
+    return AccountEntry(*ACCOUNT_ENTRY_EXTRACTOR.extract(cur_xtract_rpt))
+
+
+# ==============================================================================
+def process_cur_extract_rpt_fields(cur_xtract_rpt: etree.Element) -> list:
+    # Fixed point version of process_cur_extract_rpt, returns the fields in AccountEntry order with the amount in
+    # integer cents, ready for AccountEntryStore.append_fields
+
+    return ACCOUNT_ENTRY_CENTS_EXTRACTOR.extract(cur_xtract_rpt)
+
+
+# ==============================================================================
+def stream_accounting_entries_from_xml_file(xml_file_path: Path, file_info: VoucherFileInfo,
+                                            extract_rpt_processor=process_cur_extract_rpt) -> Iterator[AccountEntry]:
+    # Yields an AccountEntry (or whatever extract_rpt_processor builds from the element) for each GLExtractReport
+    # directly under the root element as soon as its end tag is parsed.  Each report is cleared and unlinked from
+    # the root once it has been converted, so only the element currently being parsed is held in memory no matter
+    # how large the extract is.  The header fields are copied into file_info as they are passed; fields that
+    # trail the reports are only set once the generator has been exhausted.
+
+    print(f'\n  Streaming XML File data ==> {xml_file_path.name}')
+    if xml_file_path.exists():
+        for cur_xml_source in open_voucher_xml_sources(xml_file_path):
+            context = etree.iterparse(cur_xml_source, events=('end',),
+                                      tag=('GLExtractReport',) + VOUCHER_FILE_INFO_TAGS)
+            for _, cur_elem in context:
+                parent = cur_elem.getparent()
+                # only elements that are direct children of the root are reports or header fields
+                if parent is None or parent.getparent() is not None:
+                    continue
+                if cur_elem.tag == 'GLExtractReport':
+                    yield extract_rpt_processor(cur_elem)
+                    cur_elem.clear(keep_tail=True)
+                    # drop the already processed siblings so the root does not keep growing
+                    while cur_elem.getprevious() is not None:
+                        del parent[0]
+                else:
+                    process_file_info_element(cur_elem, file_info)
+            del context
+
+    return None
+
+
+# ==============================================================================
+def parse_accounting_entries_from_xml_file(xml_file_path: Path, file_info: VoucherFileInfo,
+                                           extract_rpt_processor=process_cur_extract_rpt) -> Iterator[AccountEntry]:
+    # dom counterpart of stream_accounting_entries_from_xml_file, the whole extract is parsed into an element tree
+    # and then an AccountEntry (or whatever extract_rpt_processor builds) is yielded for each GLExtractReport
+
+    etree_root = read_and_parse_xml_in_file(xml_file_path)
+    if etree_root is not None:
+        for cur_xtract_rpt in etree_root:
+            if cur_xtract_rpt.tag == 'GLExtractReport':
+                yield extract_rpt_processor(cur_xtract_rpt)
+            else:
+                process_file_info_element(cur_xtract_rpt, file_info)
+
+    return None
+
+
+# ==============================================================================
+def parse_voucher_file(xml_file_path: Path, mode: str, fixed_point_amounts: bool = False) -> ParsedVoucherFile:
+    # Parses one voucher file into its own VoucherFileInfo and entry list, suitable for running in a worker process.
+    # With fixed_point_amounts the entries go into an AccountEntryStore with the amounts parsed straight to cents.
+
+    start_time = time.perf_counter()
+    parsed_file = ParsedVoucherFile(xml_file_path)
+    if fixed_point_amounts:
+        parsed_file.entries = AccountEntryStore()
+    if mode == 'stream' and fixed_point_amounts:
+        for cur_entry_fields in stream_accounting_entries_from_xml_file(xml_file_path, parsed_file.file_info,
+                                                                        process_cur_extract_rpt_fields):
+            parsed_file.entries.append_fields(*cur_entry_fields)
+    elif mode == 'stream':
+        parsed_file.entries.extend(stream_accounting_entries_from_xml_file(xml_file_path, parsed_file.file_info))
+    else:
+        etree_root = read_and_parse_xml_in_file(xml_file_path)
+        add_etree_root_children_to_parsed_file(etree_root, parsed_file)
+    parsed_file.parse_seconds = time.perf_counter() - start_time
+
+    return parsed_file
+
+
+# ==============================================================================
+def add_etree_root_children_to_parsed_file(etree_root: etree.Element, parsed_file: ParsedVoucherFile) -> None:
+
+    if etree_root is not None:
+        fixed_point_amounts = isinstance(parsed_file.entries, AccountEntryStore)
+        for cur_xtract_rpt in etree_root:
+            if cur_xtract_rpt.tag == 'GLExtractReport' and fixed_point_amounts:
+                parsed_file.entries.append_fields(*process_cur_extract_rpt_fields(cur_xtract_rpt))
+            elif cur_xtract_rpt.tag == 'GLExtractReport':
+                parsed_file.entries.append(process_cur_extract_rpt(cur_xtract_rpt))
+            else:
+                process_file_info_element(cur_xtract_rpt, parsed_file.file_info)
+
+    return None
+
+
+# ==============================================================================
+def find_extract_rpt_start(xml_data: mmap.mmap | bytearray, search_pos: int, search_end: int) -> int:
+    # returns the offset of the next <GLExtractReport> start tag at or after search_pos, or -1 if there is none
+
+    found_pos = xml_data.find(EXTRACT_RPT_START_TAG, search_pos, search_end)
+    while found_pos != -1:
+        next_char = xml_data[found_pos + len(EXTRACT_RPT_START_TAG):found_pos + len(EXTRACT_RPT_START_TAG) + 1]
+        if next_char in (b'>', b' ', b'\t', b'\r', b'\n', b'/'):
+            break
+        found_pos = xml_data.find(EXTRACT_RPT_START_TAG, found_pos + 1, search_end)
+
+    return found_pos
+
+
+# ==============================================================================
+def get_xml_declared_encoding(xml_head: bytes) -> str:
+    # the encoding named in the XML declaration at the start of xml_head, utf-8 when there is none
+
+    declaration = XML_DECLARATION_ENCODING.match(xml_head)
+    if declaration is not None:
+        return declaration.group(1).decode('ascii')
+
+    return 'utf-8'
+
+
+# ==============================================================================
+def is_ascii_compatible_encoding(encoding: str) -> bool:
+    # True when the tag names can be searched for as plain ASCII bytes
+
+    return not codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+
+
+# ==============================================================================
+def get_xml_file_split_ranges(xml_file_path: Path, num_chunks: int) -> tuple[str, list[tuple[int, int]]]:
+    # Scans the raw bytes of the extract for GLExtractReport start tags and cuts the span from the first report
+    # to the end of the last report into num_chunks byte ranges that each begin on a report boundary.  The bytes
+    # outside that span (XML declaration, root tags and any header fields) are left for the caller.  An empty
+    # range list means the file can not be split, e.g. it has no reports or is not in an ASCII compatible encoding.
+
+    split_ranges: list[tuple[int, int]] = []
+    with open(xml_file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as xml_data:
+            encoding = get_xml_declared_encoding(xml_data[:256])
+            if not is_ascii_compatible_encoding(encoding):
+                return encoding, split_ranges
+
+            first_rpt_start = find_extract_rpt_start(xml_data, 0, len(xml_data))
+            last_rpt_end_tag = xml_data.rfind(EXTRACT_RPT_END_TAG)
+            if first_rpt_start == -1 or last_rpt_end_tag < first_rpt_start:
+                return encoding, split_ranges
+            last_rpt_end = xml_data.find(b'>', last_rpt_end_tag) + 1
+
+            chunk_size = max(1, (last_rpt_end - first_rpt_start) // num_chunks)
+            chunk_start = first_rpt_start
+            while chunk_start < last_rpt_end:
+                chunk_end = find_extract_rpt_start(xml_data, chunk_start + chunk_size, last_rpt_end)
+                if chunk_end == -1:
+                    chunk_end = last_rpt_end
+                split_ranges.append((chunk_start, chunk_end))
+                chunk_start = chunk_end
+
+    return encoding, split_ranges
+
+
+# ==============================================================================
+def quick_scan_voucher_file(xml_file_path: Path) -> VoucherFileInfo:
+    # Reads only the control fields (CycleDate, FileCount, TotalCreditAmount, TotalDebitAmount, NumberOfRecords)
+    # of a voucher file without building any GLExtractReport elements.  The bytes before the first report and
+    # after the last one are cut out of the raw file and parsed on their own, which is the same well-formed
+    # remainder parse_voucher_file_in_chunks uses for the header.  A plain extract is memory-mapped, so only the
+    # pages around the first and last report are read.  A compressed extract has to be decompressed to reach its
+    # end, but only as a byte search, nothing is parsed.
+
+    print(f'\n  Quick scanning XML File ==> {xml_file_path.name}')
+    file_info = VoucherFileInfo()
+    if xml_file_path.exists():
+        for cur_xml_source in open_voucher_xml_sources(xml_file_path):
+            if isinstance(cur_xml_source, mmap.mmap):
+                control_data = get_control_data_from_mapped_xml(cur_xml_source)
+            else:
+                control_data = get_control_data_from_xml_stream(cur_xml_source)
+            if control_data is None:
+                # no byte level shortcut for this encoding, walk the extract and throw the reports away
+                for _ in stream_accounting_entries_from_xml_file(xml_file_path, file_info, lambda cur_rpt: None):
+                    pass
+                break
+            for cur_elem in etree.fromstring(control_data, etree.XMLParser(huge_tree=True)):
+                process_file_info_element(cur_elem, file_info)
+
+    return file_info
+
+
+# ==============================================================================
+def get_control_data_from_mapped_xml(xml_data: mmap.mmap) -> bytes | None:
+    # the extract with every GLExtractReport cut out, or None if its encoding can not be searched as bytes
+
+    if not is_ascii_compatible_encoding(get_xml_declared_encoding(xml_data[:256])):
+        return None
+    first_rpt_start = find_extract_rpt_start(xml_data, 0, len(xml_data))
+    if first_rpt_start == -1:
+        return xml_data[:]
+    last_rpt_end_tag = xml_data.rfind(EXTRACT_RPT_END_TAG, first_rpt_start)
+    last_rpt_end = xml_data.find(b'>', last_rpt_end_tag) + 1 if last_rpt_end_tag != -1 else len(xml_data)
+
+    return xml_data[:first_rpt_start] + xml_data[last_rpt_end:]
+
+
+# ==============================================================================
+def get_control_data_from_xml_stream(xml_stream: BinaryIO) -> bytes | None:
+    # Same as get_control_data_from_mapped_xml for a source that can only be read front to back.  The header is
+    # collected until the first report starts, after that only the bytes from the latest </GLExtractReport on are
+    # kept, so what is left at the end of the stream is the closing report tag followed by the trailer.
+
+    head_data = bytearray(xml_stream.read(QUICK_SCAN_BLOCK_BYTES))
+    if not is_ascii_compatible_encoding(get_xml_declared_encoding(bytes(head_data[:256]))):
+        return None
+    first_rpt_start = find_extract_rpt_start(head_data, 0, len(head_data))
+    while first_rpt_start == -1:
+        cur_block = xml_stream.read(QUICK_SCAN_BLOCK_BYTES)
+        if not cur_block:
+            return bytes(head_data)
+        # back up far enough to catch a start tag split across two blocks
+        search_pos = max(0, len(head_data) - len(EXTRACT_RPT_START_TAG))
+        head_data += cur_block
+        first_rpt_start = find_extract_rpt_start(head_data, search_pos, len(head_data))
+
+    tail_data = head_data[first_rpt_start:]
+    del head_data[first_rpt_start:]
+    while True:
+        last_rpt_end_tag = tail_data.rfind(EXTRACT_RPT_END_TAG)
+        if last_rpt_end_tag > 0:
+            del tail_data[:last_rpt_end_tag]
+        cur_block = xml_stream.read(QUICK_SCAN_BLOCK_BYTES)
+        if not cur_block:
+            break
+        tail_data += cur_block
+    if tail_data.startswith(EXTRACT_RPT_END_TAG):
+        del tail_data[:tail_data.find(b'>') + 1]
+
+    return bytes(head_data + tail_data)
+
+
+# ==============================================================================
+def parse_voucher_file_chunk(xml_file_path: Path, chunk_start: int, chunk_end: int, encoding: str,
+                             fixed_point_amounts: bool) -> ParsedVoucherFile:
+    # Parses the reports in one byte range of an extract by wrapping them in a stand-in root element
+
+    parsed_chunk = ParsedVoucherFile(xml_file_path)
+    if fixed_point_amounts:
+        parsed_chunk.entries = AccountEntryStore()
+    with open(xml_file_path, 'rb') as f:
+        f.seek(chunk_start)
+        chunk_data = f.read(chunk_end - chunk_start)
+    xml_declaration = f'<?xml version="1.0" encoding="{encoding}"?>'.encode('ascii')
+    etree_root = etree.fromstring(xml_declaration + b'<VoucherChunk>' + chunk_data + b'</VoucherChunk>',
+                                  etree.XMLParser(huge_tree=True))
+    add_etree_root_children_to_parsed_file(etree_root, parsed_chunk)
+
+    return parsed_chunk
+
+
+# ==============================================================================
+def parse_voucher_file_in_chunks(xml_file_path: Path, ingest_options: VoucherIngestOptions) -> ParsedVoucherFile:
+    # Splits one extract into byte ranges on GLExtractReport boundaries and parses the ranges in worker processes.
+    # The chunk results are stitched back together in file order, so the entries are the same list that
+    # parsing the whole file would have produced.
+
+    start_time = time.perf_counter()
+    max_workers = ingest_options.max_workers or os.cpu_count() or 1
+    num_chunks = max(1, min(max_workers * 4, xml_file_path.stat().st_size // MIN_SPLIT_CHUNK_BYTES))
+    encoding, split_ranges = get_xml_file_split_ranges(xml_file_path, num_chunks)
+    if len(split_ranges) < 2:
+        return parse_voucher_file(xml_file_path, ingest_options.mode, ingest_options.fixed_point_amounts)
+
+    print(f'\n  Parsing XML File data ==> {xml_file_path.name} in {len(split_ranges)} chunks '
+          f'using {max_workers} worker processes')
+
+    # the header fields live outside the split ranges, what is left once the reports are cut out is well-formed
+    with open(xml_file_path, 'rb') as f:
+        header_data = f.read(split_ranges[0][0])
+        f.seek(split_ranges[-1][1])
+        header_data += f.read()
+    parsed_file = ParsedVoucherFile(xml_file_path)
+    if ingest_options.fixed_point_amounts:
+        parsed_file.entries = AccountEntryStore()
+    add_etree_root_children_to_parsed_file(etree.fromstring(header_data), parsed_file)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        parsed_chunks = list(executor.map(parse_voucher_file_chunk,
+                                          [xml_file_path] * len(split_ranges),
+                                          [cur_range[0] for cur_range in split_ranges],
+                                          [cur_range[1] for cur_range in split_ranges],
+                                          [encoding] * len(split_ranges),
+                                          [ingest_options.fixed_point_amounts] * len(split_ranges)))
+    merge_parsed_voucher_files(parsed_chunks, parsed_file.file_info, parsed_file.entries)
+    parsed_file.parse_seconds = time.perf_counter() - start_time
+
+    return parsed_file
+
+
+# ==============================================================================
+def parse_voucher_files(files_to_process: list[Path], ingest_options: VoucherIngestOptions,
+                        checkpoint: VoucherRunCheckpoint | None = None) -> list[ParsedVoucherFile]:
+    # Files found in the parse cache or already saved in the run checkpoint are loaded without touching the XML.
+    # Of the rest, files at or above split_file_min_bytes are split and parsed one at a time using every worker,
+    # and the others are parsed one file per worker.  executor.map hands the results back in files_to_process
+    # order no matter which worker finishes first, and each one is saved to the checkpoint as it comes back.
+
+    start_time = time.perf_counter()
+    parsed_files: list[ParsedVoucherFile | None] = [None] * len(files_to_process)
+    cache_keys: list[str] = [''] * len(files_to_process)
+    voucher_cache = None
+    if ingest_options.use_cache:
+        voucher_cache = VoucherFileCache(ingest_options.cache_dir, ingest_options.cache_max_bytes)
+        for file_index, cur_xml_file_path in enumerate(files_to_process):
+            load_start_time = time.perf_counter()
+            cache_keys[file_index] = voucher_cache.get_cache_key(cur_xml_file_path,
+                                                                 'cents' if ingest_options.fixed_point_amounts else '')
+            cached_file = voucher_cache.get(cache_keys[file_index])
+            if cached_file is not None:
+                cached_file.file_path = cur_xml_file_path
+                cached_file.parse_seconds = time.perf_counter() - load_start_time
+                cached_file.from_cache = True
+                parsed_files[file_index] = cached_file
+
+    if checkpoint is not None:
+        for file_index, cur_xml_file_path in enumerate(files_to_process):
+            if parsed_files[file_index] is not None:
+                continue
+            load_start_time = time.perf_counter()
+            checkpoint_file = checkpoint.get_completed_file(file_index)
+            if checkpoint_file is not None:
+                checkpoint_file.file_path = cur_xml_file_path
+                checkpoint_file.parse_seconds = time.perf_counter() - load_start_time
+                checkpoint_file.from_checkpoint = True
+                parsed_files[file_index] = checkpoint_file
+
+    whole_file_indexes: list[int] = []
+    for file_index, cur_xml_file_path in enumerate(files_to_process):
+        if parsed_files[file_index] is not None:
+            continue
+        # compressed files cannot be split on byte offsets, they are always parsed whole
+        if (ingest_options.split_large_files and not is_compressed_voucher_file(cur_xml_file_path)
+                and cur_xml_file_path.stat().st_size >= ingest_options.split_file_min_bytes):
+            parsed_files[file_index] = parse_voucher_file_in_chunks(cur_xml_file_path, ingest_options)
+            if checkpoint is not None:
+                checkpoint.save_completed_file(file_index, parsed_files[file_index])
+        else:
+            whole_file_indexes.append(file_index)
+
+    whole_files = [files_to_process[file_index] for file_index in whole_file_indexes]
+    if whole_files and ingest_options.parallel_files:
+        max_workers = ingest_options.max_workers or os.cpu_count() or 1
+        max_workers = min(max_workers, len(whole_files))
+        print(f'\n  Parsing {len(whole_files)} voucher files using {max_workers} worker processes')
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            whole_parsed_files = executor.map(parse_voucher_file, whole_files,
+                                              [ingest_options.mode] * len(whole_files),
+                                              [ingest_options.fixed_point_amounts] * len(whole_files))
+            save_whole_parsed_files(whole_file_indexes, whole_parsed_files, parsed_files, checkpoint)
+    else:
+        whole_parsed_files = (parse_voucher_file(cur_file, ingest_options.mode, ingest_options.fixed_point_amounts)
+                              for cur_file in whole_files)
+        save_whole_parsed_files(whole_file_indexes, whole_parsed_files, parsed_files, checkpoint)
+
+    if voucher_cache is not None:
+        for file_index, cur_parsed_file in enumerate(parsed_files):
+            if not cur_parsed_file.from_cache:
+                voucher_cache.put(cache_keys[file_index], cur_parsed_file)
+        voucher_cache.evict_and_save_index()
+    wall_seconds = time.perf_counter() - start_time
+
+    print_parallel_parse_timings_to_console(parsed_files, wall_seconds)
+
+    return parsed_files
+
+
+# ==============================================================================
+def save_whole_parsed_files(whole_file_indexes: list[int],
+                            whole_parsed_files: Iterable[ParsedVoucherFile],
+                            parsed_files: list[ParsedVoucherFile | None],
+                            checkpoint: VoucherRunCheckpoint | None) -> None:
+    # whole_parsed_files is consumed lazily so every file reaches the checkpoint as soon as it has been parsed
+
+    for file_index, cur_parsed_file in zip(whole_file_indexes, whole_parsed_files):
+        parsed_files[file_index] = cur_parsed_file
+        if checkpoint is not None:
+            checkpoint.save_completed_file(file_index, cur_parsed_file)
+
+    return None
+
+
+# ==============================================================================
+def merge_parsed_voucher_files(parsed_files: list[ParsedVoucherFile],
+                               file_info: VoucherFileInfo,
+                               accounting_entries: list[AccountEntry]) -> None:
+    # Merges in file order so the result matches parsing the files one after another: entries are appended
+    # file by file and a header field found in a later file replaces the value from an earlier one.
+
+    for cur_parsed_file in parsed_files:
+        accounting_entries.extend(cur_parsed_file.entries)
+        merge_voucher_file_info(cur_parsed_file.file_info, file_info)
+
+    return None
+
+
+# ==============================================================================
+def merge_voucher_file_info(cur_file_info: VoucherFileInfo, file_info: VoucherFileInfo) -> None:
+    # a header field found in cur_file_info replaces the value in file_info, fields it does not have are left as is
+
+    default_file_info = VoucherFileInfo()
+    for cur_field in ('cycle_date', 'file_count', 'total_credit_amount', 'total_debit_amount', 'number_of_records'):
+        cur_value = getattr(cur_file_info, cur_field)
+        if cur_value != getattr(default_file_info, cur_field):
+            setattr(file_info, cur_field, cur_value)
+
+    return None
+
+
+# ==============================================================================
+def print_parallel_parse_timings_to_console(parsed_files: list[ParsedVoucherFile], wall_seconds: float) -> None:
+
+    print('\n  Voucher file parse timings')
+    total_parse_seconds = 0.0
+    for cur_parsed_file in parsed_files:
+        total_parse_seconds += cur_parsed_file.parse_seconds
+        cache_note = ' (from cache)' if cur_parsed_file.from_cache else ''
+        if cur_parsed_file.from_checkpoint:
+            cache_note = ' (from checkpoint)'
+        print(f'    {cur_parsed_file.file_path.name} => {len(cur_parsed_file.entries)} entries '
+              f'in {cur_parsed_file.parse_seconds:.2f} sec{cache_note}')
+
+    print(f'  Sum of file parse times => {total_parse_seconds:.2f} sec')
+    print(f'  Elapsed parse time ======> {wall_seconds:.2f} sec')
+    if wall_seconds > 0.0:
+        print(f'  Speedup =================> {total_parse_seconds / wall_seconds:.2f}x')
+
+    return None
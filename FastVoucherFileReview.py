@@ -8,10 +8,15 @@
 # ******************************************************************************
 
 # Standard library imports
+import bisect
+import heapq
+import math
+import time
+from array import array
 from dataclasses import dataclass, field
 from pathlib import Path
 from lxml import etree
-from decimal import Decimal, getcontext
+from decimal import Decimal
 
 
 # Third party imports
@@ -19,6 +24,23 @@ import xlsxwriter
 
 
 # local file imports
+from FastVoucherFileParser import (AccountEntry, VoucherFileInfo, VoucherIngestOptions, get_files_to_process,
+                                   read_and_parse_xml_in_file, process_file_info_element, process_cur_extract_rpt,
+                                   stream_accounting_entries_from_xml_file, parse_voucher_files,
+                                   merge_parsed_voucher_files, uses_parsed_voucher_files, quick_scan_voucher_file,
+                                   merge_voucher_file_info)
+from FastVoucherEntryStore import AccountEntryStore, AccountEntryRow
+from FastVoucherDataClasses import cents_to_decimal
+from FastVoucherDuplicates import GLEntryIDDuplicateIndex
+from FastVoucherCheckpoint import VoucherRunCheckpoint
+from FastVoucherAccountIndex import EFT_ACCOUNT, AccountEntryIndex, get_account_sheet_name
+from FastVoucherAggregates import ControlTotalCheck, VoucherAggregates, print_control_total_checks_to_console
+from FastVoucherOffsets import OffsettingHdrGroups, find_offsetting_hdr_groups
+from FastVoucherReversals import NettedReversal, find_netted_reversals
+from FastVoucherPolicyIndex import PolicyIndex, PolicySummary
+from FastVoucherEntryDataset import save_voucher_entry_dataset_partition
+from FastVoucherPlanner import GROUPING_BYTES_PER_ENTRY, get_planned_ingest_options
+from FastVoucherSpillFiles import HdrIDSpillPartitions, read_spill_records, write_spill_records
 
 
 # SGM Shared Module imports
@@ -31,32 +53,12 @@ import xlsxwriter
 # ******************************************************************************
 
 
-@dataclass
-class AccountEntry:
-    policy_num: str = ''
-    gl_entry_id: str = ''
-    gl_entry_hdr_id: str = ''
-    disbursement: str = ''
-    account: str = ''
-    amount: Decimal = Decimal('0.00')
-    reversal: str = ''
-    trans_type_desc: str = ''
-
-
 @dataclass
 class GLEntryHdrIDGroup:
     hdr_id: str = ''
     hdr_amount: Decimal = Decimal('0.00')
     entries: list[AccountEntry] = field(default_factory=list)
-
-
-@dataclass
-class VoucherFileInfo:
-    cycle_date: str = ''
-    file_count: int = 0
-    total_credit_amount: Decimal = Decimal('0.00')
-    total_debit_amount: Decimal = Decimal('0.00')
-    number_of_records: int = 0
+    hdr_amount_cents: int = 0
 
 
 @dataclass
@@ -64,6 +66,16 @@ class InputData:
     file_info: VoucherFileInfo()
     files_to_process: list = field(default_factory=list)
     unmatched_accounting_entries: list = field(default_factory=list)
+    # number of accounting entries read from each of files_to_process, in the same order
+    file_entry_counts: list = field(default_factory=list)
+    # entries by GL account, see get_account_index()
+    account_index: AccountEntryIndex | None = None
+    # per file / per cycle control totals and pivots, see get_voucher_aggregates()
+    aggregates: VoucherAggregates | None = None
+    # entry count and net amount by policy number, see get_policy_index()
+    policy_index: PolicyIndex | None = None
+    # Bloom filter check of the GLEntryIDs read so far, see get_duplicate_index()
+    duplicate_index: GLEntryIDDuplicateIndex | None = None
 
 
 @dataclass
@@ -71,6 +83,152 @@ class OutputData:
     balanced_hdr_groups: list = field(default_factory=list)
     unbalanced_hdr_groups: list = field(default_factory=list)
     eft_transactions: list = field(default_factory=list)
+    duplicate_entries: list = field(default_factory=list)
+    # watch account => its entries, in ingest_options.watch_accounts order
+    watch_account_entries: dict = field(default_factory=dict)
+    # unbalanced header groups that net to zero with each other, see add_offsetting_hdr_groups_to_output_data()
+    offsetting_hdr_groups: list = field(default_factory=list)
+    # reversing entries netted against the entries they reverse, see get_netted_reversals()
+    netted_reversals: list = field(default_factory=list)
+
+
+@dataclass
+class DuplicateEntry:
+    entry: AccountEntry
+    file_name: str
+    first_entry: AccountEntry
+    first_file_name: str
+    excluded: bool
+    entry_index: int = -1
+
+
+# estimated memory of one buffered (entry index, hdr_id, amount) spill record
+SPILL_RECORD_BYTES = 250
+# upper limit on the spill partitions open at the same time
+MAX_SPILL_PARTITIONS = 512
+# longest text an Excel cell can hold
+MAX_CELL_CHARACTERS = 32767
+# names of the sheets written after the watch account sheets, which the watch account sheet names must not take
+DUPLICATES_SHEET_NAME = 'Duplicate GLEntryIDs'
+OFFSETTING_SHEET_NAME = 'Offsetting Header Groups'
+NETTED_REVERSALS_SHEET_NAME = 'Netted Reversals'
+POLICY_SUMMARY_SHEET_NAME = 'Policy Summary'
+SUMMARY_SHEET_NAME = 'Summary'
+LATER_SHEET_NAMES = (DUPLICATES_SHEET_NAME, OFFSETTING_SHEET_NAME, NETTED_REVERSALS_SHEET_NAME,
+                     POLICY_SUMMARY_SHEET_NAME, SUMMARY_SHEET_NAME)
+
+
+class SpilledHdrGroupList:
+    # Read-only, list-like stand in for balanced_hdr_groups / unbalanced_hdr_groups when the grouping was done out
+    # of core.  Each partition's result file holds (first_entry_index, hdr_id, amount, entry_indexes) records
+    # sorted newest group first, and iterating merges the files back into the order the in-memory grouping
+    # produces.  The entries themselves are looked up in the accounting entries by index, so only one group is
+    # built at a time.
+
+    def __init__(self, accounting_entries, result_file_paths: list[Path], num_groups: int,
+                 fixed_point_amounts: bool, spill_partitions: HdrIDSpillPartitions):
+        self.accounting_entries = accounting_entries
+        self.result_file_paths = result_file_paths
+        self.num_groups = num_groups
+        self.fixed_point_amounts = fixed_point_amounts
+        # keeps the spill directory alive for as long as the list is in use
+        self.spill_partitions = spill_partitions
+
+    def __len__(self) -> int:
+        return self.num_groups
+
+    def __iter__(self):
+        spilled_groups = heapq.merge(*[read_spill_records(cur_path) for cur_path in self.result_file_paths],
+                                     key=lambda cur_record: -cur_record[0])
+        for _, hdr_id, amount, entry_indexes in spilled_groups:
+            entries = [self.accounting_entries[cur_index] for cur_index in entry_indexes]
+            if self.fixed_point_amounts:
+                yield GLEntryHdrIDGroup(hdr_id, cents_to_decimal(amount), entries, amount)
+            else:
+                yield GLEntryHdrIDGroup(hdr_id, amount, entries)
+
+
+class GLEntryHdrIDGroupIndex:
+    # Header groups kept in a dict keyed by GLEntryHdrID, so entries can be added a batch at a time (e.g. one
+    # voucher file at a time as the files arrive) and each entry finds its group with one dict lookup.  The dict
+    # keeps the groups in the order they were created, get_hdr_groups() hands them back newest group first, the
+    # same order process_unmatched_accounting_entries builds.  With fixed_point_amounts the totals are kept in
+    # hdr_amount_cents and hdr_amount is only filled in when the groups are handed back.  num_balanced is only
+    # kept up to date by add_entries_counting_balanced().
+
+    def __init__(self, fixed_point_amounts: bool = False):
+        self.fixed_point_amounts = fixed_point_amounts
+        self.groups_by_hdr_id: dict[str, GLEntryHdrIDGroup] = {}
+        self.num_balanced = 0
+
+    def add_entries(self, accounting_entries) -> None:
+        groups_by_hdr_id = self.groups_by_hdr_id
+        if isinstance(accounting_entries, AccountEntryStore):
+            self.add_entry_store(accounting_entries)
+        elif self.fixed_point_amounts:
+            for cur_entry in accounting_entries:
+                cur_hdr_group = groups_by_hdr_id.get(cur_entry.gl_entry_hdr_id)
+                if cur_hdr_group is None:
+                    groups_by_hdr_id[cur_entry.gl_entry_hdr_id] = GLEntryHdrIDGroup(
+                        cur_entry.gl_entry_hdr_id, entries=[cur_entry], hdr_amount_cents=cur_entry.amount_cents)
+                else:
+                    cur_hdr_group.hdr_amount_cents += cur_entry.amount_cents
+                    cur_hdr_group.entries.append(cur_entry)
+        else:
+            for cur_entry in accounting_entries:
+                cur_hdr_group = groups_by_hdr_id.get(cur_entry.gl_entry_hdr_id)
+                if cur_hdr_group is None:
+                    groups_by_hdr_id[cur_entry.gl_entry_hdr_id] = GLEntryHdrIDGroup(
+                        cur_entry.gl_entry_hdr_id, cur_entry.amount, [cur_entry])
+                else:
+                    cur_hdr_group.hdr_amount = cur_hdr_group.hdr_amount + cur_entry.amount
+                    cur_hdr_group.entries.append(cur_entry)
+
+    def add_entry_store(self, entry_store: AccountEntryStore) -> None:
+        # reads the GLEntryHdrID and amount columns directly, only the row view kept in the group is created
+        groups_by_hdr_id = self.groups_by_hdr_id
+        fixed_point_amounts = self.fixed_point_amounts
+        for row, (hdr_id, amount_cents) in enumerate(zip(entry_store.gl_entry_hdr_id.iter_values(),
+                                                         entry_store.amount_cents)):
+            cur_hdr_group = groups_by_hdr_id.get(hdr_id)
+            if cur_hdr_group is None:
+                cur_hdr_group = GLEntryHdrIDGroup(hdr_id, Decimal('0.00'), [])
+                groups_by_hdr_id[hdr_id] = cur_hdr_group
+            if fixed_point_amounts:
+                cur_hdr_group.hdr_amount_cents += amount_cents
+            else:
+                cur_hdr_group.hdr_amount = cur_hdr_group.hdr_amount + cents_to_decimal(amount_cents)
+            cur_hdr_group.entries.append(AccountEntryRow(entry_store, row))
+
+    def add_entries_counting_balanced(self, accounting_entries) -> None:
+        # add_entries plus a running count of the balanced groups, so a status can be shown while entries are
+        # still arriving without splitting every group.  Only the groups the new entries go into are looked at,
+        # once before and once after adding them.
+        touched_hdr_ids = {cur_entry.gl_entry_hdr_id for cur_entry in accounting_entries}
+        self.num_balanced -= self.count_balanced_groups(touched_hdr_ids)
+        self.add_entries(accounting_entries)
+        self.num_balanced += self.count_balanced_groups(touched_hdr_ids)
+
+    def count_balanced_groups(self, hdr_ids) -> int:
+        num_balanced = 0
+        for cur_hdr_id in hdr_ids:
+            cur_hdr_group = self.groups_by_hdr_id.get(cur_hdr_id)
+            if cur_hdr_group is not None:
+                if self.fixed_point_amounts:
+                    num_balanced += cur_hdr_group.hdr_amount_cents == 0
+                else:
+                    num_balanced += cur_hdr_group.hdr_amount == 0
+        return num_balanced
+
+    def get_hdr_groups(self) -> list[GLEntryHdrIDGroup]:
+        hdr_groups = list(reversed(self.groups_by_hdr_id.values()))
+        if self.fixed_point_amounts:
+            for cur_hdr_group in hdr_groups:
+                cur_hdr_group.hdr_amount = cents_to_decimal(cur_hdr_group.hdr_amount_cents)
+        return hdr_groups
+
+    def __len__(self) -> int:
+        return len(self.groups_by_hdr_id)
 
 
 @dataclass
@@ -80,6 +238,11 @@ class VoucherFileReviewSS:
     balanced_ws = None
     detail_ws = None
     eft_ws = None
+    duplicates_ws = None
+    offsetting_ws = None
+    netted_reversals_ws = None
+    policy_summary_ws = None
+    summary_ws = None
     left_fmt = None
     left_bold_fmt = None
     left_lv2_fmt = None
@@ -105,63 +268,223 @@ class VoucherFileReviewSS:
 # === Main
 # ==============================================================================
 
-def create_fast_voucher_review_spreadsheet() -> None:
+def create_fast_voucher_review_spreadsheet(ingest_options: VoucherIngestOptions | None = None) -> None:
     print('\n\nStart Create FAST Voucher Review Spreadsheet')
 
-    input_data = get_input_data()
-    if input_data.unmatched_accounting_entries:
-        hdr_id_groups = process_unmatched_accounting_entries(input_data.unmatched_accounting_entries)
-        output_data = process_header_groups(hdr_id_groups)
-        output_data.eft_transactions = create_list_of_eft_transactions(input_data.unmatched_accounting_entries)
+    if ingest_options is None:
+        ingest_options = VoucherIngestOptions()
+    ingest_options = get_planned_ingest_options(ingest_options)
+
+    checkpoint = get_voucher_run_checkpoint(ingest_options)
+    input_data, output_data = get_grouped_voucher_data(ingest_options, checkpoint)
+    if output_data is not None:
         create_voucher_file_review_spreadsheet(output_data, input_data)
+        save_entry_dataset_partition(input_data, ingest_options)
+    # the run finished, so there is nothing left to resume
+    if checkpoint is not None:
+        checkpoint.clear()
     print('\nEnd Create FAST Voucher Review Spreadsheet')
 
     return None
 
 
 # ==============================================================================
-def get_input_data() -> InputData:
+def show_voucher_file_summary() -> None:
+    # Quick check that the right voucher files are in place: prints the control fields of each file and of the
+    # whole set from a quick scan, without parsing the accounting entries.
+    print('\n\nStart Show FAST Voucher File Summary')
+
+    start_time = time.perf_counter()
+    summary_file_info = VoucherFileInfo()
+    for cur_xml_file_path in get_files_to_process():
+        cur_file_info = quick_scan_voucher_file(cur_xml_file_path)
+        print_voucher_file_info_to_console(cur_file_info)
+        # same rule as merging parsed files, a control field found in a later file replaces the earlier value
+        merge_voucher_file_info(cur_file_info, summary_file_info)
+
+    print('\n  All voucher files')
+    print_voucher_file_info_to_console(summary_file_info)
+    print(f'\n  Quick scan time => {time.perf_counter() - start_time:.3f} sec')
+    print('\nEnd Show FAST Voucher File Summary')
+
+    return None
+
+
+# ==============================================================================
+def get_voucher_run_checkpoint(ingest_options: VoucherIngestOptions) -> VoucherRunCheckpoint | None:
+    # The options that change what the parse and grouping produce are part of the checkpoint key, a checkpoint
+    # saved with different options is started over rather than resumed.  A new option that changes the entries or
+    # anything in OutputData has to be added to run_options here, bumping VOUCHER_CHECKPOINT_FORMAT_VERSION alone
+    # would still resume a grouping saved with a different value of it.
+
+    if not ingest_options.use_checkpoint:
+        return None
+    files_to_process = get_files_to_process()
+    if not files_to_process:
+        return None
+    run_options = {'mode': ingest_options.mode,
+                   'use_entry_store': ingest_options.use_entry_store,
+                   'fixed_point_amounts': ingest_options.fixed_point_amounts,
+                   'detect_duplicate_entries': ingest_options.detect_duplicate_entries,
+                   'exclude_duplicate_entries': ingest_options.exclude_duplicate_entries,
+                   'watch_accounts': list(ingest_options.watch_accounts),
+                   'detect_offsetting_groups': ingest_options.detect_offsetting_groups,
+                   'offsetting_max_set_size': ingest_options.offsetting_max_set_size,
+                   'offsetting_max_bucket_groups': ingest_options.offsetting_max_bucket_groups,
+                   'net_reversals': ingest_options.net_reversals,
+                   'net_reversals_by_fields': ingest_options.net_reversals_by_fields}
+
+    return VoucherRunCheckpoint(ingest_options.checkpoint_dir, files_to_process, run_options)
+
+
+# ==============================================================================
+def get_grouped_voucher_data(ingest_options: VoucherIngestOptions,
+                             checkpoint: VoucherRunCheckpoint | None) -> tuple[InputData, OutputData | None]:
+    # Parses and groups the voucher files, output data is None when there are no accounting entries.  When the
+    # checkpoint already holds the grouping it is loaded instead, otherwise with checkpoint_grouping the grouping
+    # is saved for the next run.  Out-of-core groups only live in temporary spill files, so they are not saved.
+
+    grouping_state = None
+    if checkpoint is not None and ingest_options.checkpoint_grouping:
+        grouping_state = checkpoint.get_grouping_state()
+    if grouping_state is not None:
+        print('\n  Accounting entries and header groups loaded from checkpoint')
+        return grouping_state
+
+    input_data = get_input_data(ingest_options, checkpoint)
+    output_data = None
+    if input_data.unmatched_accounting_entries:
+        output_data = process_accounting_entries(input_data, ingest_options)
+        if (checkpoint is not None and ingest_options.checkpoint_grouping
+                and not isinstance(output_data.balanced_hdr_groups, SpilledHdrGroupList)):
+            checkpoint.save_grouping_state((input_data, output_data))
+
+    return input_data, output_data
+
+
+# ==============================================================================
+def get_input_data(ingest_options: VoucherIngestOptions, checkpoint: VoucherRunCheckpoint | None = None,
+                   files_to_process: list[Path] | None = None) -> InputData:
+    # reads the voucher files of the current cycle, or files_to_process when given
 
     file_info = VoucherFileInfo()
     input_data = InputData(file_info)
-
-    input_data.files_to_process = get_files_to_process()
-    if input_data.files_to_process:
+    if ingest_options.use_entry_store or ingest_options.fixed_point_amounts:
+        input_data.unmatched_accounting_entries = AccountEntryStore()
+
+    input_data.files_to_process = get_files_to_process() if files_to_process is None else files_to_process
+    if input_data.files_to_process and uses_parsed_voucher_files(ingest_options):
+        parsed_files = parse_voucher_files(input_data.files_to_process, ingest_options, checkpoint)
+        aggregates = get_voucher_aggregates(input_data)
+        for cur_parsed_file in parsed_files:
+            merge_parsed_voucher_files([cur_parsed_file], input_data.file_info, input_data.unmatched_accounting_entries)
+            input_data.file_entry_counts.append(len(cur_parsed_file.entries))
+            index_new_accounting_entries(input_data, ingest_options)
+            aggregates.add_new_entries()
+            aggregates.end_file(cur_parsed_file.file_path.name, cur_parsed_file.file_info)
+        print_transactions_info_to_console(input_data, len(input_data.unmatched_accounting_entries))
+    elif input_data.files_to_process:
         for cur_xml_file_path in input_data.files_to_process:
-            root = read_and_parse_xml_in_file(cur_xml_file_path)
-            if root is not None:
-                get_accounting_entries_from_parsed_xml_data(root, input_data)
+            num_entries_before_file = len(input_data.unmatched_accounting_entries)
+            cur_file_info = VoucherFileInfo()
+            if ingest_options.mode == 'stream':
+                get_accounting_entries_from_streamed_xml_file(cur_xml_file_path, input_data, cur_file_info)
+            else:
+                root = read_and_parse_xml_in_file(cur_xml_file_path)
+                if root is not None:
+                    get_accounting_entries_from_parsed_xml_data(root, input_data, cur_file_info)
+            input_data.file_entry_counts.append(len(input_data.unmatched_accounting_entries) - num_entries_before_file)
+            index_new_accounting_entries(input_data, ingest_options)
+            aggregates = get_voucher_aggregates(input_data)
+            aggregates.add_new_entries()
+            aggregates.end_file(cur_xml_file_path.name, cur_file_info)
+
+    if input_data.unmatched_accounting_entries:
+        print_control_total_checks_to_console(get_voucher_aggregates(input_data))
+
+    if isinstance(input_data.unmatched_accounting_entries, AccountEntryStore):
+        store_megabytes = input_data.unmatched_accounting_entries.get_memory_size() / (1024 * 1024)
+        print(f'  Accounting entry store size => {store_megabytes:.1f} MB')
 
     return input_data
 
 
 # ==============================================================================
-def get_files_to_process() -> list[Path]:
+def index_new_accounting_entries(input_data: InputData, ingest_options: VoucherIngestOptions) -> None:
+    # Brings the account and policy indexes up to date with the entries appended since the last call, and with
+    # detect_duplicate_entries or exclude_duplicate_entries runs the new GLEntryIDs through the duplicate check.
+    # Every review calls this after each batch it appends, so none of them takes a pass of its own afterwards.
+
+    get_account_index(input_data).index_new_entries()
+    get_policy_index(input_data).index_new_entries()
+    if ingest_options.detect_duplicate_entries or ingest_options.exclude_duplicate_entries:
+        get_duplicate_index(input_data).index_new_entries()
+
+    return None
+
+
+# ==============================================================================
+def save_entry_dataset_partition(input_data: InputData, ingest_options: VoucherIngestOptions) -> None:
+    # saves the accounting entries read to the entry dataset when save_entry_dataset is on
+
+    if ingest_options.save_entry_dataset and input_data.unmatched_accounting_entries:
+        save_voucher_entry_dataset_partition(ingest_options.entry_dataset_dir, input_data.file_info.cycle_date,
+                                             input_data.unmatched_accounting_entries,
+                                             [cur_file.name for cur_file in input_data.files_to_process])
+
+    return None
+
+
+# ==============================================================================
+def get_account_index(input_data: InputData) -> AccountEntryIndex:
+    # the account index of the input data, started when first asked for and again if the entries were replaced
 
-    input_files: list[Path] = []
-    input_files_path = Path(Path.cwd() / 'Input files' / 'Voucher files')
-    for cur_file in Path(input_files_path).iterdir():
-        input_files.append(cur_file)
+    if (input_data.account_index is None
+            or input_data.account_index.accounting_entries is not input_data.unmatched_accounting_entries):
+        input_data.account_index = AccountEntryIndex(input_data.unmatched_accounting_entries)
 
-    return input_files
+    return input_data.account_index
 
 
 # ==============================================================================
-def read_and_parse_xml_in_file(xml_file_path: Path) -> etree.Element:
+def get_policy_index(input_data: InputData) -> PolicyIndex:
+    # the policy index of the input data, started when first asked for and again if the entries were replaced
 
-    print('\n  Parsing XML File data')
-    root = None
-    if xml_file_path.exists():
-        with open(xml_file_path) as f:
-            tree = etree.parse(f)
-        root = tree.getroot()
+    if (input_data.policy_index is None
+            or input_data.policy_index.accounting_entries is not input_data.unmatched_accounting_entries):
+        input_data.policy_index = PolicyIndex(input_data.unmatched_accounting_entries)
 
-    return root
+    return input_data.policy_index
+
+
+# ==============================================================================
+def get_duplicate_index(input_data: InputData) -> GLEntryIDDuplicateIndex:
+    # the duplicate GLEntryID check of the input data, started when first asked for and again if the entries were
+    # replaced
+
+    if (input_data.duplicate_index is None
+            or input_data.duplicate_index.accounting_entries is not input_data.unmatched_accounting_entries):
+        input_data.duplicate_index = GLEntryIDDuplicateIndex(input_data.unmatched_accounting_entries)
+
+    return input_data.duplicate_index
+
+
+# ==============================================================================
+def get_voucher_aggregates(input_data: InputData) -> VoucherAggregates:
+    # the control totals and pivots of the input data, started when first asked for and again if the entries
+    # were replaced
+
+    if (input_data.aggregates is None
+            or input_data.aggregates.accounting_entries is not input_data.unmatched_accounting_entries):
+        input_data.aggregates = VoucherAggregates(input_data.unmatched_accounting_entries)
+
+    return input_data.aggregates
 
 
 # ==============================================================================
 def get_accounting_entries_from_parsed_xml_data(root: etree.Element,
-                                                input_data: InputData) -> None:
+                                                input_data: InputData, file_info: VoucherFileInfo) -> None:
+    # file_info gets the header of this file only, it is merged into input_data.file_info once the file is read
 
     num_acct_entries = 0
     if root is not None:
@@ -172,28 +495,33 @@ def get_accounting_entries_from_parsed_xml_data(root: etree.Element,
                 input_data.unmatched_accounting_entries.append(new_acct_entry)
                 num_acct_entries += 1
             else:
-                match cur_xtract_rpt.tag:
-                    case 'CycleDate':
-                        input_data.file_info.cycle_date = cur_xtract_rpt.text[0:10]
-                    case 'FileCount':
-                        input_data.file_info.file_count = int(cur_xtract_rpt.text)
-                    case 'TotalCreditAmount':
-                        input_data.file_info.total_credit_amount = Decimal(cur_xtract_rpt.text).quantize(Decimal('.01'))
-                    case 'TotalDebitAmount':
-                        input_data.file_info.total_debit_amount = Decimal(cur_xtract_rpt.text).quantize(Decimal('.01'))
-                    case 'NumberOfRecords':
-                        input_data.file_info.number_of_records = int(cur_xtract_rpt.text)
-                    case _:
-                        pass
-    print(f'\n  Cycle Date => {input_data.file_info.cycle_date}')
-    print(f'  File Count => {input_data.file_info.file_count}')
-    print(f'  Number of Records => {input_data.file_info.number_of_records}')
-    print(f'  Total Credit Amount => {input_data.file_info.total_credit_amount}')
-    print(f'  Total Debit Amount => {input_data.file_info.total_debit_amount}')
-
-    difference = input_data.file_info.total_credit_amount + input_data.file_info.total_debit_amount
-    if difference != 0.0:
-        print(f'  Credit/Debit Difference => {round(difference, 2)}')
+                process_file_info_element(cur_xtract_rpt, file_info)
+    merge_voucher_file_info(file_info, input_data.file_info)
+    print_transactions_info_to_console(input_data, num_acct_entries)
+
+    return None
+
+
+# ==============================================================================
+def get_accounting_entries_from_streamed_xml_file(xml_file_path: Path, input_data: InputData,
+                                                  file_info: VoucherFileInfo) -> None:
+    # file_info gets the header of this file only, it is merged into input_data.file_info once the file is read
+
+    num_acct_entries = 0
+    print('\n  Getting Accounting Entries from XML')
+    for new_acct_entry in stream_accounting_entries_from_xml_file(xml_file_path, file_info):
+        input_data.unmatched_accounting_entries.append(new_acct_entry)
+        num_acct_entries += 1
+    merge_voucher_file_info(file_info, input_data.file_info)
+    print_transactions_info_to_console(input_data, num_acct_entries)
+
+    return None
+
+
+# ==============================================================================
+def print_transactions_info_to_console(input_data: InputData, num_acct_entries: int) -> None:
+
+    print_voucher_file_info_to_console(input_data.file_info)
 
     print(f'\n\n  Number of accounting entries found => {num_acct_entries}')
     print(f'')
@@ -202,91 +530,260 @@ def get_accounting_entries_from_parsed_xml_data(root: etree.Element,
 
 
 # ==============================================================================
-def process_cur_extract_rpt(cur_xtract_rpt: etree.Element) -> AccountEntry:
-    acct_entry = AccountEntry()
-    num_fields_found = 0
-    for cur_elem in cur_xtract_rpt:
-        match cur_elem.tag:
-            case 'AccountNumber':
-                acct_entry.account = cur_elem.text
-                num_fields_found += 1
-            case 'ConvertedAmount':
-                acct_entry.amount = Decimal(cur_elem.text).quantize(Decimal('.01'))
-                num_fields_found += 1
-            case 'GLEntryID':
-                acct_entry.gl_entry_id = cur_elem.text
-                num_fields_found += 1
-            case 'IsReversal':
-                acct_entry.reversal = cur_elem.text
-                num_fields_found += 1
-            case 'GLEntryHdrID':
-                acct_entry.gl_entry_hdr_id = cur_elem.text
-                num_fields_found += 1
-            case 'IsDisbursmentTxnRelated':
-                acct_entry.disbursement = cur_elem.text
-                num_fields_found += 1
-            case 'PolicyNumber':
-                acct_entry.policy_num = cur_elem.text
-                num_fields_found += 1
-            case 'TransactionTypeDescription':
-                acct_entry.trans_type_desc = cur_elem.text
-                num_fields_found += 1
-            case _:
-                pass
-        if num_fields_found == 8:
-            break
-
-    return acct_entry
-
-
-# ==============================================================================
-def process_unmatched_accounting_entries(unmatched_accounting_entries: list[AccountEntry]) -> list[GLEntryHdrIDGroup]:
-
-    hdr_ids: list[GLEntryHdrIDGroup] = []
-    for cur_entry in unmatched_accounting_entries:
-        add_cur_entry_to_matching_hdr_group(cur_entry, hdr_ids)
-
-    return hdr_ids
-
-
-# ==============================================================================
-def add_cur_entry_to_matching_hdr_group(gl_entry: AccountEntry, hdr_ids: list[GLEntryHdrIDGroup]) -> None:
-    found = False
-    for cur_hdr_group in hdr_ids:
-        if gl_entry.gl_entry_hdr_id == cur_hdr_group.hdr_id:
-            found = True
-            cur_hdr_group.hdr_amount = cur_hdr_group.hdr_amount + gl_entry.amount
-            cur_hdr_group.entries.append(gl_entry)
-            break
-    if not found:
-        new_hdr_group = GLEntryHdrIDGroup(gl_entry.gl_entry_hdr_id, gl_entry.amount, [gl_entry])
-        # insert new_hdr_group at front of list because if the next entry to add has the same header id
-        # it will match the group id at the front of the list.  Minimizing the amount of compares to find
-        # a match.  If it does not match then it is likely a new header id and we will search the entire
-        # list to be sure, before we add the new_hdr_group to the front of the list.
-        hdr_ids.insert(0, new_hdr_group)
+def print_voucher_file_info_to_console(file_info: VoucherFileInfo) -> None:
+
+    print(f'\n  Cycle Date => {file_info.cycle_date}')
+    print(f'  File Count => {file_info.file_count}')
+    print(f'  Number of Records => {file_info.number_of_records}')
+    print(f'  Total Credit Amount => {file_info.total_credit_amount}')
+    print(f'  Total Debit Amount => {file_info.total_debit_amount}')
+
+    difference = file_info.total_credit_amount + file_info.total_debit_amount
+    if difference != 0.0:
+        print(f'  Credit/Debit Difference => {round(difference, 2)}')
 
     return None
 
 
 # ==============================================================================
-def create_list_of_eft_transactions(unmatched_accounting_entries: list[AccountEntry]) -> list[AccountEntry]:
-    eft_transactions_list = []
+def process_accounting_entries(input_data: InputData, ingest_options: VoucherIngestOptions) -> OutputData:
+    # Duplicate check, header grouping / balancing and the EFT and watch account lists for the parsed accounting
+    # entries.  With exclude_duplicate_entries the repeated GLEntryIDs are left out of the balancing and the
+    # account lists, the Accounting Entry Detail sheet still shows every entry that was read.
+
+    duplicate_entries: list[DuplicateEntry] = []
+    if ingest_options.detect_duplicate_entries or ingest_options.exclude_duplicate_entries:
+        duplicate_entries = get_duplicate_entries(input_data, ingest_options.exclude_duplicate_entries)
+
+    excluded_rows = {cur_duplicate.entry_index for cur_duplicate in duplicate_entries if cur_duplicate.excluded}
+    output_data = net_group_and_balance_accounting_entries(input_data, ingest_options, excluded_rows)
+    output_data.duplicate_entries = duplicate_entries
+
+    return output_data
+
+
+# ==============================================================================
+def net_group_and_balance_accounting_entries(input_data: InputData, ingest_options: VoucherIngestOptions,
+                                             excluded_rows: set[int]) -> OutputData:
+    # Reversal netting, header grouping / balancing and the EFT, watch account and offsetting lists for the
+    # entries that are not in excluded_rows.  With net_reversals the netted pairs are left out the same way as
+    # excluded rows.
+
+    netted_reversals: list[NettedReversal] = []
+    if ingest_options.net_reversals:
+        netted_reversals = get_netted_reversals(input_data, ingest_options, excluded_rows)
+        excluded_rows = excluded_rows | {cur_row for cur_netted_reversal in netted_reversals
+                                         for cur_row in (cur_netted_reversal.reversal_row,
+                                                         cur_netted_reversal.original_row)}
+
+    entries_to_balance = input_data.unmatched_accounting_entries
+    if excluded_rows:
+        entries_to_balance = remove_excluded_entries(entries_to_balance, excluded_rows)
+
+    output_data = group_and_balance_accounting_entries(entries_to_balance, ingest_options)
+    add_account_entries_to_output_data(get_account_index(input_data), ingest_options, output_data, excluded_rows)
+    add_offsetting_hdr_groups_to_output_data(ingest_options, output_data)
+    output_data.netted_reversals = netted_reversals
 
-    for cur_entry in unmatched_accounting_entries:
-        if cur_entry.account == '10020 - KCL_UnitMissEFT_9982':
-            eft_transactions_list.append(cur_entry)
+    return output_data
 
-    return eft_transactions_list
+
+# ==============================================================================
+def get_netted_reversals(input_data: InputData, ingest_options: VoucherIngestOptions,
+                         excluded_rows: set[int]) -> list[NettedReversal]:
+
+    start_time = time.perf_counter()
+    netting_results = find_netted_reversals(input_data.unmatched_accounting_entries, excluded_rows,
+                                            ingest_options.net_reversals_by_fields)
+    print(f'\n  Netted reversals => {len(netting_results.netted_reversals)} of {netting_results.num_reversals} '
+          f'reversing entries ({time.perf_counter() - start_time:.2f} sec)')
+
+    return netting_results.netted_reversals
 
 
 # ==============================================================================
-def process_header_groups(hdr_group_list: list[GLEntryHdrIDGroup]) -> OutputData:
+def get_duplicate_entries(input_data: InputData, excluded: bool) -> list[DuplicateEntry]:
+
+    accounting_entries = input_data.unmatched_accounting_entries
+    duplicate_index = get_duplicate_index(input_data)
+    # normally a no-op, the entries were checked batch by batch as they were read
+    duplicate_index.index_new_entries()
+    duplicates = duplicate_index.get_duplicates()
+    print(f'\n  Duplicate GLEntryIDs => {len(duplicates.duplicate_rows)} '
+          f'({duplicates.num_candidates} Bloom filter candidates, '
+          f'{duplicates.bloom_filter_bytes / (1024 * 1024):.1f} MB filter)')
+
+    # running totals of file_entry_counts, bisect finds the file an entry index was read from
+    file_entry_ends = []
+    for cur_count in input_data.file_entry_counts:
+        file_entry_ends.append(cur_count + (file_entry_ends[-1] if file_entry_ends else 0))
+
+    def get_file_name(entry_index: int) -> str:
+        file_index = bisect.bisect_right(file_entry_ends, entry_index)
+        if file_index < len(input_data.files_to_process):
+            return input_data.files_to_process[file_index].name
+        return ''
+
+    return [DuplicateEntry(accounting_entries[duplicate_index], get_file_name(duplicate_index),
+                           accounting_entries[first_index], get_file_name(first_index), excluded, duplicate_index)
+            for duplicate_index, first_index in duplicates.duplicate_rows]
+
+
+# ==============================================================================
+def add_account_entries_to_output_data(account_index: AccountEntryIndex, ingest_options: VoucherIngestOptions,
+                                       output_data: OutputData, excluded_rows: set[int] | None = None) -> None:
+    # the EFT transactions and the entries of each watch account, straight from the account index
+
+    output_data.eft_transactions = account_index.get_entries(EFT_ACCOUNT, excluded_rows)
+    output_data.watch_account_entries = {cur_account: account_index.get_entries(cur_account, excluded_rows)
+                                         for cur_account in ingest_options.watch_accounts}
+
+    return None
+
+
+# ==============================================================================
+def add_offsetting_hdr_groups_to_output_data(ingest_options: VoucherIngestOptions, output_data: OutputData) -> None:
+
+    if not ingest_options.detect_offsetting_groups:
+        return None
+
+    start_time = time.perf_counter()
+    search_results = find_offsetting_hdr_groups(output_data.unbalanced_hdr_groups,
+                                                ingest_options.fixed_point_amounts,
+                                                ingest_options.offsetting_max_set_size,
+                                                ingest_options.offsetting_max_bucket_groups)
+    output_data.offsetting_hdr_groups = search_results.offsetting_sets
+    num_offsetting_groups = sum(len(cur_set.hdr_groups) for cur_set in search_results.offsetting_sets)
+    print(f'\n  Offsetting header groups => {num_offsetting_groups} of {search_results.num_candidates} unbalanced '
+          f'groups in {len(search_results.offsetting_sets)} sets ({time.perf_counter() - start_time:.2f} sec)')
+    if search_results.num_buckets_skipped:
+        print(f'  Policies with too many unbalanced groups to search for sets => '
+              f'{search_results.num_buckets_skipped}')
+
+    return None
+
+
+# ==============================================================================
+def remove_excluded_entries(accounting_entries: list[AccountEntry], excluded_rows: set[int]) -> list[AccountEntry]:
+
+    if isinstance(accounting_entries, AccountEntryStore):
+        return accounting_entries.select_rows(row for row in range(len(accounting_entries))
+                                              if row not in excluded_rows)
+
+    return [cur_entry for row, cur_entry in enumerate(accounting_entries) if row not in excluded_rows]
+
+
+# ==============================================================================
+def group_and_balance_accounting_entries(unmatched_accounting_entries: list[AccountEntry],
+                                         ingest_options: VoucherIngestOptions) -> OutputData:
+    # Groups the entries by GLEntryHdrID and splits the groups into balanced and unbalanced.  The grouping is done
+    # in memory unless it is estimated to go over grouping_memory_budget_bytes, then it is done out of core.
+
+    memory_budget = ingest_options.grouping_memory_budget_bytes
+    estimated_bytes = len(unmatched_accounting_entries) * GROUPING_BYTES_PER_ENTRY
+    if memory_budget and estimated_bytes > memory_budget:
+        num_partitions = min(MAX_SPILL_PARTITIONS, max(2, math.ceil(estimated_bytes / memory_budget)))
+        output_data = process_unmatched_accounting_entries_out_of_core(unmatched_accounting_entries, num_partitions,
+                                                                       ingest_options)
+    else:
+        hdr_id_groups = process_unmatched_accounting_entries(unmatched_accounting_entries,
+                                                             ingest_options.fixed_point_amounts)
+        output_data = process_header_groups(hdr_id_groups, ingest_options.fixed_point_amounts)
+
+    return output_data
+
+
+# ==============================================================================
+def process_unmatched_accounting_entries_out_of_core(unmatched_accounting_entries: list[AccountEntry],
+                                                     num_partitions: int,
+                                                     ingest_options: VoucherIngestOptions) -> OutputData:
+    # Out-of-core version of process_unmatched_accounting_entries + process_header_groups.  Every entry is written
+    # as (entry index, hdr_id, amount) to the spill partition for its hdr_id, then the partitions are grouped and
+    # balanced one at a time, so only one partition's groups are in memory at once.  Each partition's balanced
+    # and unbalanced groups are spilled again newest first, and SpilledHdrGroupList merges them back into the
+    # same order, with the same amounts and entries, as the in-memory grouping.
+
+    fixed_point_amounts = ingest_options.fixed_point_amounts
+    print(f'\n  Grouping {len(unmatched_accounting_entries)} accounting entries out of core '
+          f'in {num_partitions} spill partitions')
+    # the write buffers of all the partitions together get at most a quarter of the memory budget
+    batch_records = max(100, ingest_options.grouping_memory_budget_bytes // (4 * num_partitions * SPILL_RECORD_BYTES))
+    spill_partitions = HdrIDSpillPartitions(num_partitions, ingest_options.spill_dir, batch_records)
+    if isinstance(unmatched_accounting_entries, AccountEntryStore):
+        # read the two columns directly rather than building a row view per entry
+        hdr_id_column = unmatched_accounting_entries.gl_entry_hdr_id
+        for entry_index, amount_cents in enumerate(unmatched_accounting_entries.amount_cents):
+            spill_partitions.add((entry_index, hdr_id_column[entry_index],
+                                  amount_cents if fixed_point_amounts else cents_to_decimal(amount_cents)))
+    else:
+        for entry_index, cur_entry in enumerate(unmatched_accounting_entries):
+            spill_partitions.add((entry_index, cur_entry.gl_entry_hdr_id,
+                                  int(cur_entry.amount.scaleb(2)) if fixed_point_amounts else cur_entry.amount))
+    spill_partitions.close_partition_files()
+
+    balanced_file_paths: list[Path] = []
+    unbalanced_file_paths: list[Path] = []
+    num_balanced = num_unbalanced = 0
+    for cur_partition in range(num_partitions):
+        # hdr_id => [first entry index, amount, entry indexes]
+        partition_groups: dict[str, list] = {}
+        for entry_index, hdr_id, amount in spill_partitions.read_partition(cur_partition):
+            hdr_group = partition_groups.get(hdr_id)
+            if hdr_group is None:
+                partition_groups[hdr_id] = [entry_index, amount, array('Q', [entry_index])]
+            else:
+                hdr_group[1] += amount
+                hdr_group[2].append(entry_index)
+        spill_partitions.partition_paths[cur_partition].unlink()
+
+        # groups were created in entry order, so reversed gives the newest first order of the in-memory grouping
+        balanced_groups = []
+        unbalanced_groups = []
+        for hdr_id, (first_index, amount, entry_indexes) in reversed(partition_groups.items()):
+            if amount == 0:
+                balanced_groups.append((first_index, hdr_id, amount, entry_indexes))
+            else:
+                unbalanced_groups.append((first_index, hdr_id, amount, entry_indexes))
+        del partition_groups
+        balanced_file_paths.append(spill_partitions.spill_path / f'balanced_{cur_partition:04d}.pkl')
+        write_spill_records(balanced_file_paths[-1], balanced_groups, batch_records)
+        unbalanced_file_paths.append(spill_partitions.spill_path / f'unbalanced_{cur_partition:04d}.pkl')
+        write_spill_records(unbalanced_file_paths[-1], unbalanced_groups, batch_records)
+        num_balanced += len(balanced_groups)
+        num_unbalanced += len(unbalanced_groups)
+
+    print(f'  Spilled group results => {spill_partitions.get_spill_bytes() / (1024 * 1024):.1f} MB')
+    output_data = OutputData()
+    output_data.balanced_hdr_groups = SpilledHdrGroupList(unmatched_accounting_entries, balanced_file_paths,
+                                                          num_balanced, fixed_point_amounts, spill_partitions)
+    output_data.unbalanced_hdr_groups = SpilledHdrGroupList(unmatched_accounting_entries, unbalanced_file_paths,
+                                                            num_unbalanced, fixed_point_amounts, spill_partitions)
+
+    return output_data
+
+
+# ==============================================================================
+def process_unmatched_accounting_entries(unmatched_accounting_entries: list[AccountEntry],
+                                         fixed_point_amounts: bool = False) -> list[GLEntryHdrIDGroup]:
+    # one dict lookup per entry through GLEntryHdrIDGroupIndex, the groups come back newest group first
+
+    hdr_group_index = GLEntryHdrIDGroupIndex(fixed_point_amounts)
+    hdr_group_index.add_entries(unmatched_accounting_entries)
+
+    return hdr_group_index.get_hdr_groups()
+
+
+# ==============================================================================
+def process_header_groups(hdr_group_list: list[GLEntryHdrIDGroup], fixed_point_amounts: bool = False) -> OutputData:
 
     output_data = OutputData([], [], [])
 
     for cur_hdr_group in hdr_group_list:
-        if cur_hdr_group.hdr_amount == 0.0:
+        if fixed_point_amounts:
+            balanced = cur_hdr_group.hdr_amount_cents == 0
+        else:
+            balanced = cur_hdr_group.hdr_amount == 0.0
+        if balanced:
             output_data.balanced_hdr_groups.append(cur_hdr_group)
         else:
             output_data.unbalanced_hdr_groups.append(cur_hdr_group)
@@ -302,6 +799,17 @@ def create_voucher_file_review_spreadsheet(output_data: OutputData, input_data:
         write_balanced_header_groups_to_spreadsheet(voucher_ss, output_data.balanced_hdr_groups)
         write_eft_transactions_to_spreadsheet(voucher_ss, output_data.eft_transactions)
         write_account_entry_details_to_spreadsheet(voucher_ss, input_data.unmatched_accounting_entries)
+        write_watch_account_entries_to_spreadsheet(voucher_ss, output_data.watch_account_entries)
+        if output_data.duplicate_entries:
+            write_duplicate_entries_to_spreadsheet(voucher_ss, output_data.duplicate_entries)
+        if output_data.offsetting_hdr_groups:
+            write_offsetting_hdr_groups_to_spreadsheet(voucher_ss, output_data.offsetting_hdr_groups)
+        if output_data.netted_reversals:
+            write_netted_reversals_to_spreadsheet(voucher_ss, output_data.netted_reversals,
+                                                  input_data.unmatched_accounting_entries)
+        write_policy_summary_to_spreadsheet(
+            voucher_ss, get_policy_index(input_data).get_policy_summaries(output_data.unbalanced_hdr_groups))
+        write_summary_to_spreadsheet(voucher_ss, get_voucher_aggregates(input_data))
         voucher_ss.workbook.close()
 
     return None
@@ -349,11 +857,11 @@ def create_spreadsheet(cycle_date: str) -> VoucherFileReviewSS:
 
 
 # ==============================================================================
-def create_ss_workbook_and_formats(cycle_date: str) -> VoucherFileReviewSS:
+def create_ss_workbook_and_formats(cycle_date: str, report_name: str = 'Voucher File Review') -> VoucherFileReviewSS:
     # create the IPM Planning spreadsheet data structure and then create spreadsheet workbook
     voucher_ss = VoucherFileReviewSS()
 
-    voucher_ss.workbook = xlsxwriter.Workbook('Output files/' + cycle_date + ' Voucher File Review.xlsx')
+    voucher_ss.workbook = xlsxwriter.Workbook('Output files/' + cycle_date + ' ' + report_name + '.xlsx')
 
     font_size = 14
     # add predefined formats to be used for formatting cells in the spreadsheet
@@ -441,28 +949,14 @@ def create_ss_workbook_and_formats(cycle_date: str) -> VoucherFileReviewSS:
 # ==============================================================================
 def write_unbalanced_header_groups_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
                                                   unbalanced_hdr_groups: list[GLEntryHdrIDGroup]) -> None:
-    header_row = 1
 
-    # Write the Assignee Totals Header
-    voucher_ss.unbalanced_ws.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
-    voucher_ss.unbalanced_ws.write(f'B{header_row}', 'Account', voucher_ss.header_fmt)
-    voucher_ss.unbalanced_ws.write(f'C{header_row}', 'Amount', voucher_ss.header_fmt)
-    voucher_ss.unbalanced_ws.write(f'D{header_row}', 'Reversal', voucher_ss.header_fmt)
-    voucher_ss.unbalanced_ws.write(f'E{header_row}', 'Transaction Type', voucher_ss.header_fmt)
-    voucher_ss.unbalanced_ws.write(f'F{header_row}', 'GLEntryID', voucher_ss.header_fmt)
-    voucher_ss.unbalanced_ws.write(f'G{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    write_hdr_group_header_to_worksheet(voucher_ss, voucher_ss.unbalanced_ws)
 
     # Write the Unmatched Accounting Entries to Unmatched Entries worksheet
     ws_row = 1
     for cur_hdr_group in unbalanced_hdr_groups:
         for cur_entry in cur_hdr_group.entries:
-            voucher_ss.unbalanced_ws.write(ws_row, 0, cur_entry.policy_num, voucher_ss.left_fmt)
-            voucher_ss.unbalanced_ws.write(ws_row, 1, cur_entry.account, voucher_ss.left_fmt)
-            voucher_ss.unbalanced_ws.write(ws_row, 2, cur_entry.amount, voucher_ss.right_fmt)
-            voucher_ss.unbalanced_ws.write(ws_row, 3, cur_entry.reversal, voucher_ss.center_fmt)
-            voucher_ss.unbalanced_ws.write(ws_row, 4, cur_entry.trans_type_desc, voucher_ss.left_fmt)
-            voucher_ss.unbalanced_ws.write(ws_row, 5, cur_entry.gl_entry_id, voucher_ss.left_fmt)
-            voucher_ss.unbalanced_ws.write(ws_row, 6, cur_entry.gl_entry_hdr_id, voucher_ss.left_fmt)
+            write_hdr_group_entry_to_worksheet(voucher_ss, voucher_ss.unbalanced_ws, ws_row, cur_entry)
             ws_row += 1
         ws_row += 1
 
@@ -472,103 +966,394 @@ def write_unbalanced_header_groups_to_spreadsheet(voucher_ss: VoucherFileReviewS
 # ==============================================================================
 def write_balanced_header_groups_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
                                                 balanced_hdr_groups: list[GLEntryHdrIDGroup]) -> None:
-    header_row = 1
 
-    # Write the Assignee Totals Header
-    voucher_ss.balanced_ws.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
-    voucher_ss.balanced_ws.write(f'B{header_row}', 'Account', voucher_ss.header_fmt)
-    voucher_ss.balanced_ws.write(f'C{header_row}', 'Amount', voucher_ss.header_fmt)
-    voucher_ss.balanced_ws.write(f'D{header_row}', 'Reversal', voucher_ss.header_fmt)
-    voucher_ss.balanced_ws.write(f'E{header_row}', 'Transaction Type', voucher_ss.header_fmt)
-    voucher_ss.balanced_ws.write(f'F{header_row}', 'GLEntryID', voucher_ss.header_fmt)
-    voucher_ss.balanced_ws.write(f'G{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    write_hdr_group_header_to_worksheet(voucher_ss, voucher_ss.balanced_ws)
 
     # Write the Unmatched Accounting Entries to Unmatched Entries worksheet
     ws_row = 1
     for cur_hdr_group in balanced_hdr_groups:
         for cur_entry in cur_hdr_group.entries:
-            voucher_ss.balanced_ws.write(ws_row, 0, cur_entry.policy_num, voucher_ss.left_fmt)
-            voucher_ss.balanced_ws.write(ws_row, 1, cur_entry.account, voucher_ss.left_fmt)
-            voucher_ss.balanced_ws.write(ws_row, 2, cur_entry.amount, voucher_ss.right_fmt)
-            voucher_ss.balanced_ws.write(ws_row, 3, cur_entry.reversal, voucher_ss.center_fmt)
-            voucher_ss.balanced_ws.write(ws_row, 4, cur_entry.trans_type_desc, voucher_ss.left_fmt)
-            voucher_ss.balanced_ws.write(ws_row, 5, cur_entry.gl_entry_id, voucher_ss.left_fmt)
-            voucher_ss.balanced_ws.write(ws_row, 6, cur_entry.gl_entry_hdr_id, voucher_ss.left_fmt)
+            write_hdr_group_entry_to_worksheet(voucher_ss, voucher_ss.balanced_ws, ws_row, cur_entry)
             ws_row += 1
         ws_row += 1
     return None
 
 
 # ==============================================================================
-def write_eft_transactions_to_spreadsheet(voucher_ss: VoucherFileReviewSS, eft_transactions_detail: list[AccountEntry]) -> None:
+def write_hdr_group_header_to_worksheet(voucher_ss: VoucherFileReviewSS, worksheet) -> None:
     header_row = 1
 
     # Write the Assignee Totals Header
-    voucher_ss.eft_ws.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'B{header_row}', 'Entry Type', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'C{header_row}', 'Account', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'D{header_row}', 'Amount', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'E{header_row}', 'Reversal', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'F{header_row}', 'Disbursement Txn Related', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'G{header_row}', 'Transaction Type', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'H{header_row}', 'GLEntryID', voucher_ss.header_fmt)
-    voucher_ss.eft_ws.write(f'I{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    worksheet.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
+    worksheet.write(f'B{header_row}', 'Account', voucher_ss.header_fmt)
+    worksheet.write(f'C{header_row}', 'Amount', voucher_ss.header_fmt)
+    worksheet.write(f'D{header_row}', 'Reversal', voucher_ss.header_fmt)
+    worksheet.write(f'E{header_row}', 'Transaction Type', voucher_ss.header_fmt)
+    worksheet.write(f'F{header_row}', 'GLEntryID', voucher_ss.header_fmt)
+    worksheet.write(f'G{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+
+    return None
+
+
+# ==============================================================================
+def write_hdr_group_entry_to_worksheet(voucher_ss: VoucherFileReviewSS, worksheet, ws_row: int,
+                                       cur_entry: AccountEntry) -> None:
+
+    worksheet.write(ws_row, 0, cur_entry.policy_num, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 1, cur_entry.account, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 2, cur_entry.amount, voucher_ss.right_fmt)
+    worksheet.write(ws_row, 3, cur_entry.reversal, voucher_ss.center_fmt)
+    worksheet.write(ws_row, 4, cur_entry.trans_type_desc, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 5, cur_entry.gl_entry_id, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 6, cur_entry.gl_entry_hdr_id, voucher_ss.left_fmt)
+
+    return None
+
+
+# ==============================================================================
+def write_eft_transactions_to_spreadsheet(voucher_ss: VoucherFileReviewSS, eft_transactions_detail: list[AccountEntry]) -> None:
+
+    write_account_entry_header_to_worksheet(voucher_ss, voucher_ss.eft_ws)
 
     # Write the Unmatched Accounting Entries to Unmatched Entries worksheet
     ws_row = 1
     for cur_entry in eft_transactions_detail:
-        voucher_ss.eft_ws.write(ws_row, 0, cur_entry.policy_num, voucher_ss.left_fmt)
-        if cur_entry.amount > 0.0:
-            voucher_ss.eft_ws.write(ws_row, 1, 'Debit', voucher_ss.left_fmt)
-        else:
-            voucher_ss.eft_ws.write(ws_row, 1, 'Credit', voucher_ss.left_fmt)
-        voucher_ss.eft_ws.write(ws_row, 2, cur_entry.account, voucher_ss.left_fmt)
-        voucher_ss.eft_ws.write(ws_row, 3, cur_entry.amount, voucher_ss.right_fmt)
-        voucher_ss.eft_ws.write(ws_row, 4, cur_entry.reversal, voucher_ss.center_fmt)
-        voucher_ss.eft_ws.write(ws_row, 5, cur_entry.disbursement, voucher_ss.center_fmt)
-        voucher_ss.eft_ws.write(ws_row, 6, cur_entry.trans_type_desc, voucher_ss.left_fmt)
-        voucher_ss.eft_ws.write(ws_row, 7, cur_entry.gl_entry_id, voucher_ss.left_fmt)
-        voucher_ss.eft_ws.write(ws_row, 8, cur_entry.gl_entry_hdr_id, voucher_ss.left_fmt)
+        write_account_entry_to_worksheet(voucher_ss, voucher_ss.eft_ws, ws_row, cur_entry)
         ws_row += 1
 
     return None
 
 
+# ==============================================================================
+def write_watch_account_entries_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
+                                               watch_account_entries: dict[str, list[AccountEntry]]) -> None:
+
+    used_sheet_names = {cur_ws.get_name().lower() for cur_ws in voucher_ss.workbook.worksheets()}
+    used_sheet_names.update(cur_sheet_name.lower() for cur_sheet_name in LATER_SHEET_NAMES)
+    for cur_account, cur_entries in watch_account_entries.items():
+        # Set up a worksheet tab for each watch account, laid out like the EFT Transactions tab
+        account_ws = voucher_ss.workbook.add_worksheet(get_account_sheet_name(cur_account, used_sheet_names))
+        account_ws.set_column('A:B', 20)  # Policy Number, Entry Type
+        account_ws.set_column('C:C', 40)  # Account
+        account_ws.set_column('D:F', 18)  # Amount, Reversal, Disbursement
+        account_ws.set_column('G:G', 28)  # Transaction Type
+        account_ws.set_column('H:I', 55)  # GLEntryID, GLEntryHdrID
+
+        write_account_entry_header_to_worksheet(voucher_ss, account_ws)
+        ws_row = 1
+        for cur_entry in cur_entries:
+            write_account_entry_to_worksheet(voucher_ss, account_ws, ws_row, cur_entry)
+            ws_row += 1
+
+    return None
+
+
 # ==============================================================================
 def write_account_entry_details_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
                                                acct_entry_detail: list[AccountEntry]) -> None:
-    header_row = 1
 
-    # Write the Assignee Totals Header
-    voucher_ss.detail_ws.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'B{header_row}', 'Entry Type', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'C{header_row}', 'Account', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'D{header_row}', 'Amount', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'E{header_row}', 'Reversal', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'F{header_row}', 'Disbursement Txn Related', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'G{header_row}', 'Transaction Type', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'H{header_row}', 'GLEntryID', voucher_ss.header_fmt)
-    voucher_ss.detail_ws.write(f'I{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    write_account_entry_header_to_worksheet(voucher_ss, voucher_ss.detail_ws)
 
     # Write the Unmatched Accounting Entries to Unmatched Entries worksheet
     ws_row = 1
     for cur_entry in acct_entry_detail:
-        voucher_ss.detail_ws.write(ws_row, 0, cur_entry.policy_num, voucher_ss.left_fmt)
-        if cur_entry.amount > 0.0:
-            voucher_ss.detail_ws.write(ws_row, 1, 'Debit', voucher_ss.left_fmt)
-        else:
-            voucher_ss.detail_ws.write(ws_row, 1, 'Credit', voucher_ss.left_fmt)
-        voucher_ss.detail_ws.write(ws_row, 2, cur_entry.account, voucher_ss.left_fmt)
-        voucher_ss.detail_ws.write(ws_row, 3, cur_entry.amount, voucher_ss.right_fmt)
-        voucher_ss.detail_ws.write(ws_row, 4, cur_entry.reversal, voucher_ss.center_fmt)
-        voucher_ss.detail_ws.write(ws_row, 5, cur_entry.disbursement, voucher_ss.center_fmt)
-        voucher_ss.detail_ws.write(ws_row, 6, cur_entry.trans_type_desc, voucher_ss.left_fmt)
-        voucher_ss.detail_ws.write(ws_row, 7, cur_entry.gl_entry_id, voucher_ss.left_fmt)
-        voucher_ss.detail_ws.write(ws_row, 8, cur_entry.gl_entry_hdr_id, voucher_ss.left_fmt)
+        write_account_entry_to_worksheet(voucher_ss, voucher_ss.detail_ws, ws_row, cur_entry)
+        ws_row += 1
+
+    return None
+
+
+# ==============================================================================
+def write_account_entry_header_to_worksheet(voucher_ss: VoucherFileReviewSS, worksheet) -> None:
+    header_row = 1
+
+    # Write the Assignee Totals Header
+    worksheet.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
+    worksheet.write(f'B{header_row}', 'Entry Type', voucher_ss.header_fmt)
+    worksheet.write(f'C{header_row}', 'Account', voucher_ss.header_fmt)
+    worksheet.write(f'D{header_row}', 'Amount', voucher_ss.header_fmt)
+    worksheet.write(f'E{header_row}', 'Reversal', voucher_ss.header_fmt)
+    worksheet.write(f'F{header_row}', 'Disbursement Txn Related', voucher_ss.header_fmt)
+    worksheet.write(f'G{header_row}', 'Transaction Type', voucher_ss.header_fmt)
+    worksheet.write(f'H{header_row}', 'GLEntryID', voucher_ss.header_fmt)
+    worksheet.write(f'I{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+
+    return None
+
+
+# ==============================================================================
+def write_account_entry_to_worksheet(voucher_ss: VoucherFileReviewSS, worksheet, ws_row: int,
+                                     cur_entry: AccountEntry) -> None:
+
+    worksheet.write(ws_row, 0, cur_entry.policy_num, voucher_ss.left_fmt)
+    if cur_entry.amount > 0.0:
+        worksheet.write(ws_row, 1, 'Debit', voucher_ss.left_fmt)
+    else:
+        worksheet.write(ws_row, 1, 'Credit', voucher_ss.left_fmt)
+    worksheet.write(ws_row, 2, cur_entry.account, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 3, cur_entry.amount, voucher_ss.right_fmt)
+    worksheet.write(ws_row, 4, cur_entry.reversal, voucher_ss.center_fmt)
+    worksheet.write(ws_row, 5, cur_entry.disbursement, voucher_ss.center_fmt)
+    worksheet.write(ws_row, 6, cur_entry.trans_type_desc, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 7, cur_entry.gl_entry_id, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 8, cur_entry.gl_entry_hdr_id, voucher_ss.left_fmt)
+
+    return None
+
+
+# ==============================================================================
+def write_duplicate_entries_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
+                                           duplicate_entries: list[DuplicateEntry]) -> None:
+    header_row = 1
+
+    # Set up the Duplicate GLEntryIDs worksheet tab to hold the entries whose GLEntryID was already read
+    voucher_ss.duplicates_ws = voucher_ss.workbook.add_worksheet(DUPLICATES_SHEET_NAME)
+    voucher_ss.duplicates_ws.set_column('A:A', 55)  # GLEntryID
+    voucher_ss.duplicates_ws.set_column('B:C', 40)  # File, First Seen In File
+    voucher_ss.duplicates_ws.set_column('D:D', 20)  # Policy Number
+    voucher_ss.duplicates_ws.set_column('E:E', 40)  # Account
+    voucher_ss.duplicates_ws.set_column('F:H', 18)  # Amount, First Amount, Reversal
+    voucher_ss.duplicates_ws.set_column('I:I', 28)  # Transaction Type
+    voucher_ss.duplicates_ws.set_column('J:J', 55)  # GLEntryHdrID
+    voucher_ss.duplicates_ws.set_column('K:K', 16)  # Excluded
+
+    voucher_ss.duplicates_ws.write(f'A{header_row}', 'GLEntryID', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'B{header_row}', 'File', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'C{header_row}', 'First Seen In File', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'D{header_row}', 'Policy Number', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'E{header_row}', 'Account', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'F{header_row}', 'Amount', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'G{header_row}', 'First Amount', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'H{header_row}', 'Reversal', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'I{header_row}', 'Transaction Type', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'J{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    voucher_ss.duplicates_ws.write(f'K{header_row}', 'Excluded', voucher_ss.header_fmt)
+
+    ws_row = 1
+    for cur_duplicate in duplicate_entries:
+        cur_entry = cur_duplicate.entry
+        voucher_ss.duplicates_ws.write(ws_row, 0, cur_entry.gl_entry_id, voucher_ss.left_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 1, cur_duplicate.file_name, voucher_ss.left_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 2, cur_duplicate.first_file_name, voucher_ss.left_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 3, cur_entry.policy_num, voucher_ss.left_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 4, cur_entry.account, voucher_ss.left_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 5, cur_entry.amount, voucher_ss.right_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 6, cur_duplicate.first_entry.amount, voucher_ss.right_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 7, cur_entry.reversal, voucher_ss.center_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 8, cur_entry.trans_type_desc, voucher_ss.left_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 9, cur_entry.gl_entry_hdr_id, voucher_ss.left_fmt)
+        voucher_ss.duplicates_ws.write(ws_row, 10, 'Yes' if cur_duplicate.excluded else 'No', voucher_ss.center_fmt)
         ws_row += 1
 
     return None
 
 
+# ==============================================================================
+def write_offsetting_hdr_groups_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
+                                               offsetting_hdr_groups: list[OffsettingHdrGroups]) -> None:
+    header_row = 1
+
+    # Set up the Offsetting Hdr Groups worksheet tab to hold the unbalanced header groups that net to zero together
+    voucher_ss.offsetting_ws = voucher_ss.workbook.add_worksheet(OFFSETTING_SHEET_NAME)
+    voucher_ss.offsetting_ws.set_column('A:A', 14)  # Offset Set
+    voucher_ss.offsetting_ws.set_column('B:B', 24)  # Match
+    voucher_ss.offsetting_ws.set_column('C:C', 55)  # GLEntryHdrID
+    voucher_ss.offsetting_ws.set_column('D:D', 18)  # Header Amount
+    voucher_ss.offsetting_ws.set_column('E:F', 20)  # Policy Number, Entries
+
+    voucher_ss.offsetting_ws.write(f'A{header_row}', 'Offset Set', voucher_ss.header_fmt)
+    voucher_ss.offsetting_ws.write(f'B{header_row}', 'Match', voucher_ss.header_fmt)
+    voucher_ss.offsetting_ws.write(f'C{header_row}', 'GLEntryHdrID', voucher_ss.header_fmt)
+    voucher_ss.offsetting_ws.write(f'D{header_row}', 'Header Amount', voucher_ss.header_fmt)
+    voucher_ss.offsetting_ws.write(f'E{header_row}', 'Policy Number', voucher_ss.header_fmt)
+    voucher_ss.offsetting_ws.write(f'F{header_row}', 'Entries', voucher_ss.header_fmt)
+
+    ws_row = 1
+    for set_num, cur_set in enumerate(offsetting_hdr_groups, start=1):
+        for cur_hdr_group in cur_set.hdr_groups:
+            policy_num = cur_hdr_group.entries[0].policy_num if cur_hdr_group.entries else ''
+            voucher_ss.offsetting_ws.write(ws_row, 0, set_num, voucher_ss.center_fmt)
+            voucher_ss.offsetting_ws.write(ws_row, 1, cur_set.match_type, voucher_ss.left_fmt)
+            voucher_ss.offsetting_ws.write(ws_row, 2, cur_hdr_group.hdr_id, voucher_ss.left_fmt)
+            voucher_ss.offsetting_ws.write(ws_row, 3, cur_hdr_group.hdr_amount, voucher_ss.right_fmt)
+            voucher_ss.offsetting_ws.write(ws_row, 4, policy_num, voucher_ss.left_fmt)
+            voucher_ss.offsetting_ws.write(ws_row, 5, len(cur_hdr_group.entries), voucher_ss.center_fmt)
+            ws_row += 1
+        ws_row += 1
+
+    return None
+
+
+# ==============================================================================
+def write_netted_reversals_to_spreadsheet(voucher_ss: VoucherFileReviewSS, netted_reversals: list[NettedReversal],
+                                          accounting_entries: list[AccountEntry]) -> None:
+
+    # Set up the Netted Reversals worksheet tab to hold each reversing entry under the entry it reverses
+    voucher_ss.netted_reversals_ws = voucher_ss.workbook.add_worksheet(NETTED_REVERSALS_SHEET_NAME)
+    voucher_ss.netted_reversals_ws.set_column('A:B', 20)  # Policy Number, Entry Type
+    voucher_ss.netted_reversals_ws.set_column('C:C', 40)  # Account
+    voucher_ss.netted_reversals_ws.set_column('D:F', 18)  # Amount, Reversal, Disbursement
+    voucher_ss.netted_reversals_ws.set_column('G:G', 28)  # Transaction Type
+    voucher_ss.netted_reversals_ws.set_column('H:I', 55)  # GLEntryID, GLEntryHdrID
+    voucher_ss.netted_reversals_ws.set_column('J:J', 32)  # Netted On
+
+    write_account_entry_header_to_worksheet(voucher_ss, voucher_ss.netted_reversals_ws)
+    voucher_ss.netted_reversals_ws.write('J1', 'Netted On', voucher_ss.header_fmt)
+
+    ws_row = 1
+    for cur_netted_reversal in netted_reversals:
+        for cur_row in (cur_netted_reversal.original_row, cur_netted_reversal.reversal_row):
+            write_account_entry_to_worksheet(voucher_ss, voucher_ss.netted_reversals_ws, ws_row,
+                                             accounting_entries[cur_row])
+            voucher_ss.netted_reversals_ws.write(ws_row, 9, cur_netted_reversal.match_type, voucher_ss.left_fmt)
+            ws_row += 1
+        ws_row += 1
+
+    return None
+
+
+# ==============================================================================
+def write_policy_summary_to_spreadsheet(voucher_ss: VoucherFileReviewSS,
+                                        policy_summaries: list[PolicySummary]) -> None:
+    header_row = 1
+
+    # Set up the Policy Summary worksheet tab to hold one row per policy number, in policy number order
+    voucher_ss.policy_summary_ws = voucher_ss.workbook.add_worksheet(POLICY_SUMMARY_SHEET_NAME)
+    voucher_ss.policy_summary_ws.set_column('A:A', 20)  # Policy Number
+    voucher_ss.policy_summary_ws.set_column('B:B', 14)  # Entries
+    voucher_ss.policy_summary_ws.set_column('C:C', 18)  # Net Amount
+    voucher_ss.policy_summary_ws.set_column('D:D', 20)  # Unbalanced Headers
+    voucher_ss.policy_summary_ws.set_column('E:E', 80)  # Unbalanced GLEntryHdrIDs
+
+    voucher_ss.policy_summary_ws.write(f'A{header_row}', 'Policy Number', voucher_ss.header_fmt)
+    voucher_ss.policy_summary_ws.write(f'B{header_row}', 'Entries', voucher_ss.header_fmt)
+    voucher_ss.policy_summary_ws.write(f'C{header_row}', 'Net Amount', voucher_ss.header_fmt)
+    voucher_ss.policy_summary_ws.write(f'D{header_row}', 'Unbalanced Headers', voucher_ss.header_fmt)
+    voucher_ss.policy_summary_ws.write(f'E{header_row}', 'Unbalanced GLEntryHdrIDs', voucher_ss.header_fmt)
+    voucher_ss.policy_summary_ws.freeze_panes(1, 0)
+
+    ws_row = 1
+    for cur_summary in policy_summaries:
+        hdr_ids_text = ', '.join(cur_summary.unbalanced_hdr_ids)
+        if len(hdr_ids_text) > MAX_CELL_CHARACTERS:
+            hdr_ids_text = hdr_ids_text[:MAX_CELL_CHARACTERS - 3] + '...'
+        voucher_ss.policy_summary_ws.write(ws_row, 0, cur_summary.policy_num, voucher_ss.left_fmt)
+        voucher_ss.policy_summary_ws.write(ws_row, 1, cur_summary.num_entries, voucher_ss.center_fmt)
+        voucher_ss.policy_summary_ws.write(ws_row, 2, cur_summary.net_amount, voucher_ss.right_fmt)
+        voucher_ss.policy_summary_ws.write(ws_row, 3, len(cur_summary.unbalanced_hdr_ids), voucher_ss.center_fmt)
+        voucher_ss.policy_summary_ws.write(ws_row, 4, hdr_ids_text, voucher_ss.left_fmt)
+        ws_row += 1
+
+    return None
+
+
+# ==============================================================================
+def write_summary_to_spreadsheet(voucher_ss: VoucherFileReviewSS, aggregates: VoucherAggregates) -> None:
+    # The control totals of each file and cycle against the entries read, then the account x transaction type
+    # and reversal x disbursement pivots, one table under the other
+
+    # Set up the Summary worksheet tab to hold the totals gathered while the entries were read
+    voucher_ss.summary_ws = voucher_ss.workbook.add_worksheet(SUMMARY_SHEET_NAME)
+    voucher_ss.summary_ws.set_column('A:A', 40)  # File, Cycle, Account, Reversal
+    voucher_ss.summary_ws.set_column('B:B', 28)  # Cycle Date, Files, Transaction Type, Disbursement
+    voucher_ss.summary_ws.set_column('C:I', 22)  # Entries, Records, Debits, Credits, Net
+    voucher_ss.summary_ws.set_column('J:J', 28)  # Control Totals
+
+    ws_row = 0
+    write_summary_header_to_worksheet(voucher_ss, ws_row, ['File', 'Cycle Date', 'Entries Read', 'NumberOfRecords',
+                                                           'Debits Read', 'TotalDebitAmount', 'Credits Read',
+                                                           'TotalCreditAmount', 'Net Read', 'Control Totals'])
+    ws_row += 1
+    for cur_check in aggregates.file_checks:
+        write_control_total_check_to_worksheet(voucher_ss, ws_row, aggregates, cur_check, cur_check.cycle_date)
+        ws_row += 1
+
+    ws_row += 1
+    write_summary_header_to_worksheet(voucher_ss, ws_row, ['Cycle', 'Files', 'Entries Read', 'NumberOfRecords',
+                                                           'Debits Read', 'TotalDebitAmount', 'Credits Read',
+                                                           'TotalCreditAmount', 'Net Read', 'Control Totals'])
+    ws_row += 1
+    for cur_check in aggregates.cycle_checks.values():
+        write_control_total_check_to_worksheet(voucher_ss, ws_row, aggregates, cur_check, cur_check.num_files)
+        ws_row += 1
+
+    ws_row += 1
+    write_summary_header_to_worksheet(voucher_ss, ws_row, ['Account', 'Transaction Type', 'Entries', 'Debits',
+                                                           'Credits', 'Net'])
+    ws_row = write_entry_totals_pivot_to_worksheet(voucher_ss, ws_row + 1, aggregates,
+                                                   aggregates.account_trans_type_totals)
+
+    ws_row += 1
+    write_summary_header_to_worksheet(voucher_ss, ws_row, ['Reversal', 'Disbursement Txn Related', 'Entries',
+                                                           'Debits', 'Credits', 'Net'])
+    write_entry_totals_pivot_to_worksheet(voucher_ss, ws_row + 1, aggregates, aggregates.reversal_disbursement_totals)
+
+    return None
+
+
+# ==============================================================================
+def write_summary_header_to_worksheet(voucher_ss: VoucherFileReviewSS, ws_row: int, column_names: list[str]) -> None:
+
+    for ws_col, cur_column_name in enumerate(column_names):
+        voucher_ss.summary_ws.write(ws_row, ws_col, cur_column_name, voucher_ss.header_fmt)
+
+    return None
+
+
+# ==============================================================================
+def write_control_total_check_to_worksheet(voucher_ss: VoucherFileReviewSS, ws_row: int,
+                                           aggregates: VoucherAggregates, control_check: ControlTotalCheck,
+                                           second_column) -> None:
+
+    worksheet = voucher_ss.summary_ws
+    worksheet.write(ws_row, 0, control_check.name, voucher_ss.left_fmt)
+    worksheet.write(ws_row, 1, second_column, voucher_ss.center_fmt)
+    worksheet.write(ws_row, 2, control_check.totals.num_entries, voucher_ss.right_fmt)
+    worksheet.write(ws_row, 3, control_check.number_of_records, voucher_ss.right_fmt)
+    worksheet.write(ws_row, 4, aggregates.get_amount(control_check.totals.debit_total), voucher_ss.right_fmt)
+    worksheet.write(ws_row, 5, control_check.total_debit_amount, voucher_ss.right_fmt)
+    worksheet.write(ws_row, 6, aggregates.get_amount(control_check.totals.credit_total), voucher_ss.right_fmt)
+    worksheet.write(ws_row, 7, control_check.total_credit_amount, voucher_ss.right_fmt)
+    worksheet.write(ws_row, 8, aggregates.get_amount(control_check.totals.net_total), voucher_ss.right_fmt)
+    differences = aggregates.get_control_total_differences(control_check)
+    if differences:
+        worksheet.write(ws_row, 9, 'Mismatch: ' + ', '.join(differences), voucher_ss.center_red_fmt)
+    else:
+        worksheet.write(ws_row, 9, 'OK', voucher_ss.center_green_fmt)
+
+    return None
+
+
+# ==============================================================================
+def write_entry_totals_pivot_to_worksheet(voucher_ss: VoucherFileReviewSS, ws_row: int,
+                                          aggregates: VoucherAggregates, totals_by_key: dict) -> int:
+    # one row per (row label, column label) pair in sorted order with a totals row under them, returns the row
+    # after the totals row
+
+    worksheet = voucher_ss.summary_ws
+    num_entries = 0
+    debit_total = 0
+    credit_total = 0
+    for (cur_row_label, cur_column_label), cur_totals in sorted(totals_by_key.items()):
+        worksheet.write(ws_row, 0, cur_row_label, voucher_ss.left_fmt)
+        worksheet.write(ws_row, 1, cur_column_label, voucher_ss.left_fmt)
+        worksheet.write(ws_row, 2, cur_totals.num_entries, voucher_ss.right_fmt)
+        worksheet.write(ws_row, 3, aggregates.get_amount(cur_totals.debit_total), voucher_ss.right_fmt)
+        worksheet.write(ws_row, 4, aggregates.get_amount(cur_totals.credit_total), voucher_ss.right_fmt)
+        worksheet.write(ws_row, 5, aggregates.get_amount(cur_totals.net_total), voucher_ss.right_fmt)
+        num_entries += cur_totals.num_entries
+        debit_total += cur_totals.debit_total
+        credit_total += cur_totals.credit_total
+        ws_row += 1
+
+    worksheet.write(ws_row, 0, 'Totals', voucher_ss.left_bold_fmt)
+    worksheet.write(ws_row, 2, num_entries, voucher_ss.totals_fmt)
+    worksheet.write(ws_row, 3, aggregates.get_amount(debit_total), voucher_ss.totals_fmt)
+    worksheet.write(ws_row, 4, aggregates.get_amount(credit_total), voucher_ss.totals_fmt)
+    worksheet.write(ws_row, 5, aggregates.get_amount(debit_total + credit_total), voucher_ss.totals_fmt)
+
+    return ws_row + 1
+
+
 if __name__ == "__main__":
     create_fast_voucher_review_spreadsheet()
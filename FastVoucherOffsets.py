@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import itertools
+from dataclasses import dataclass, field
+
+
+# Third party imports
+
+
+# local file imports
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+OFFSET_PAIR_SAME_POLICY = 'Pair, same policy'
+OFFSET_PAIR_AMOUNT_ONLY = 'Pair, amount only'
+OFFSET_SET_SAME_POLICY = 'Set, same policy'
+
+
+@dataclass
+class OffsettingHdrGroups:
+    # unbalanced header groups whose hdr_amounts net to zero, and how they were matched
+    match_type: str
+    hdr_groups: list = field(default_factory=list)
+
+
+@dataclass
+class OffsetSearchResults:
+    offsetting_sets: list[OffsettingHdrGroups] = field(default_factory=list)
+    num_candidates: int = 0
+    # policies with more unmatched groups than max_bucket_groups, left out of the set search
+    num_buckets_skipped: int = 0
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def find_offsetting_hdr_groups(unbalanced_hdr_groups, fixed_point_amounts: bool, max_set_size: int,
+                               max_bucket_groups: int) -> OffsetSearchResults:
+    # Finds unbalanced header groups that offset each other, e.g. an entry and its correction under another
+    # GLEntryHdrID.  Each group is used in at most one match, in three passes over what is left unmatched:
+    #   pairs, same policy - hashed two-sum keyed by (policy number, amount), one dict lookup per group
+    #   sets of 3 to max_set_size groups of the same policy - meet-in-the-middle subset-sum within each policy,
+    #                        policies with more than max_bucket_groups groups left are skipped to bound the search
+    #   pairs, any policy  - hashed two-sum keyed by amount alone, these can be coincidences and are marked so
+    # Every same policy match is tried before the amount only pairs, so a coincidence across policies never takes
+    # a group that a set within its own policy needed.  The pair passes are linear in the number of groups, the
+    # set search is bounded per policy.  The policy of a group is the policy number of its first entry.
+
+    search_results = OffsetSearchResults()
+    candidates = []
+    for cur_hdr_group in unbalanced_hdr_groups:
+        amount_cents = get_hdr_group_amount_cents(cur_hdr_group, fixed_point_amounts)
+        if amount_cents is not None:
+            policy_num = cur_hdr_group.entries[0].policy_num if cur_hdr_group.entries else ''
+            candidates.append((cur_hdr_group, amount_cents, policy_num))
+    search_results.num_candidates = len(candidates)
+
+    unmatched = match_offsetting_pairs(candidates, lambda cur_amount, cur_policy: (cur_policy, cur_amount),
+                                       OFFSET_PAIR_SAME_POLICY, search_results)
+
+    if max_set_size >= 3:
+        # policy number => indexes into unmatched
+        indexes_by_policy: dict[str, list[int]] = {}
+        for cur_index, cur_candidate in enumerate(unmatched):
+            if cur_candidate[2]:
+                indexes_by_policy.setdefault(cur_candidate[2], []).append(cur_index)
+        set_matched_indexes = set()
+        for cur_indexes in indexes_by_policy.values():
+            if len(cur_indexes) < 3:
+                continue
+            if len(cur_indexes) > max_bucket_groups:
+                search_results.num_buckets_skipped += 1
+                continue
+            matched_positions = match_offsetting_sets([unmatched[cur_index] for cur_index in cur_indexes],
+                                                      max_set_size, search_results)
+            set_matched_indexes.update(cur_indexes[cur_position] for cur_position in matched_positions)
+        unmatched = [cur_candidate for cur_index, cur_candidate in enumerate(unmatched)
+                     if cur_index not in set_matched_indexes]
+
+    match_offsetting_pairs(unmatched, lambda cur_amount, cur_policy: cur_amount, OFFSET_PAIR_AMOUNT_ONLY,
+                           search_results)
+
+    return search_results
+
+
+# ==============================================================================
+def get_hdr_group_amount_cents(hdr_group, fixed_point_amounts: bool) -> int | None:
+    # the group amount in integer cents, None when a Decimal amount has fractions of a cent
+
+    if fixed_point_amounts:
+        return hdr_group.hdr_amount_cents
+    amount_cents = hdr_group.hdr_amount.scaleb(2)
+    if amount_cents != amount_cents.to_integral_value():
+        return None
+
+    return int(amount_cents)
+
+
+# ==============================================================================
+def match_offsetting_pairs(candidates: list, get_key, match_type: str, search_results: OffsetSearchResults) -> list:
+    # Hashed two-sum: each group looks for an earlier unmatched group with the key of the opposite amount, and
+    # waits under its own key when there is none.  Returns the groups left unmatched, in their original order.
+
+    waiting: dict = {}
+    matched_indexes = set()
+    for cur_index, (cur_hdr_group, amount_cents, policy_num) in enumerate(candidates):
+        waiting_indexes = waiting.get(get_key(-amount_cents, policy_num))
+        if waiting_indexes:
+            offset_index = waiting_indexes.pop()
+            search_results.offsetting_sets.append(OffsettingHdrGroups(match_type,
+                                                                      [candidates[offset_index][0], cur_hdr_group]))
+            matched_indexes.add(offset_index)
+            matched_indexes.add(cur_index)
+        else:
+            waiting.setdefault(get_key(amount_cents, policy_num), []).append(cur_index)
+
+    return [cur_candidate for cur_index, cur_candidate in enumerate(candidates) if cur_index not in matched_indexes]
+
+
+# ==============================================================================
+def match_offsetting_sets(candidates: list, max_set_size: int, search_results: OffsetSearchResults) -> set[int]:
+    # takes the smallest zero sum set out of the candidates until there is none left, returns the positions in
+    # candidates of the groups that were matched
+
+    left_positions = list(range(len(candidates)))
+    while len(left_positions) >= 3:
+        zero_sum_indexes = find_zero_sum_subset([candidates[cur_position][1] for cur_position in left_positions],
+                                                max_set_size)
+        if not zero_sum_indexes:
+            break
+        search_results.offsetting_sets.append(OffsettingHdrGroups(
+            OFFSET_SET_SAME_POLICY, [candidates[left_positions[cur_index]][0] for cur_index in zero_sum_indexes]))
+        left_positions = [cur_position for cur_index, cur_position in enumerate(left_positions)
+                          if cur_index not in zero_sum_indexes]
+
+    return set(range(len(candidates))) - set(left_positions)
+
+
+# ==============================================================================
+def find_zero_sum_subset(amounts: list[int], max_set_size: int) -> list[int]:
+    # Meet-in-the-middle subset-sum: the subsets of up to max_set_size amounts of each half are summed, keeping
+    # the smallest subset per sum, and a subset of the first half is joined to a subset of the second half with
+    # the opposite sum through a dict lookup.  A zero sum subset can also lie within one half.  Returns the
+    # indexes of the smallest zero sum subset of 2 or more amounts, or an empty list.
+
+    half = len(amounts) // 2
+    first_half_sums = get_subset_sums(amounts[:half], 0, max_set_size)
+    second_half_sums = get_subset_sums(amounts[half:], half, max_set_size)
+
+    zero_sum_subsets = [first_half_sums.get(0, ()), second_half_sums.get(0, ())]
+    for cur_sum, cur_subset in first_half_sums.items():
+        other_subset = second_half_sums.get(-cur_sum)
+        if other_subset is not None and len(cur_subset) + len(other_subset) <= max_set_size:
+            zero_sum_subsets.append(cur_subset + other_subset)
+    zero_sum_subsets = [cur_subset for cur_subset in zero_sum_subsets if len(cur_subset) >= 2]
+
+    return list(min(zero_sum_subsets, key=len)) if zero_sum_subsets else []
+
+
+# ==============================================================================
+def get_subset_sums(amounts: list[int], first_index: int, max_set_size: int) -> dict[int, tuple]:
+    # sum => the smallest non-empty subset (indexes offset by first_index) with that sum
+
+    subset_sums: dict[int, tuple] = {}
+    for subset_size in range(1, min(max_set_size, len(amounts)) + 1):
+        for cur_subset in itertools.combinations(range(len(amounts)), subset_size):
+            cur_sum = sum(amounts[cur_index] for cur_index in cur_subset)
+            if cur_sum not in subset_sums:
+                subset_sums[cur_sum] = tuple(cur_index + first_index for cur_index in cur_subset)
+
+    return subset_sums
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+import FastVoucherFileReview
+from FastVoucherDataClasses import VoucherFileInfo
+from FastVoucherEntryStore import AccountEntryRow, AccountEntryStore
+from FastVoucherPlanner import get_planned_ingest_options
+from FastVoucherAggregates import print_control_total_checks_to_console
+from FastVoucherFileParser import (ParsedVoucherFile, VoucherIngestOptions, get_files_to_process,
+                                   merge_parsed_voucher_files, merge_voucher_file_info,
+                                   parse_accounting_entries_from_xml_file, process_cur_extract_rpt,
+                                   process_cur_extract_rpt_fields, quick_scan_voucher_file,
+                                   stream_accounting_entries_from_xml_file)
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# put on a pipeline queue by a stage when it has nothing more to send
+END_OF_STREAM = None
+
+
+@dataclass
+class PipelineFileEnd:
+    # put on the parse => group queue after the last batch of each voucher file, with the header of that file
+    xml_file_path: Path
+    file_info: VoucherFileInfo
+
+
+class PipelineQueue:
+    # Bounded queue between two pipeline stages.  A producer that gets ahead blocks in put() until the consumer
+    # has caught up, which is the backpressure that keeps memory flat.  Along the way it records the deepest the
+    # queue got, the average depth seen by each put, how long the producer was stalled on a full queue and how long
+    # the consumer was starved on an empty one.
+
+    def __init__(self, name: str, max_batches: int):
+        self.name = name
+        self.max_batches = max_batches
+        self.queue = queue.Queue(maxsize=max_batches)
+        self.num_puts = 0
+        self.max_depth = 0
+        self.total_depth = 0
+        self.producer_stall_seconds = 0.0
+        self.consumer_stall_seconds = 0.0
+
+    def put(self, item) -> None:
+        start_time = time.perf_counter()
+        self.queue.put(item)
+        self.producer_stall_seconds += time.perf_counter() - start_time
+        depth = self.queue.qsize()
+        self.num_puts += 1
+        self.total_depth += depth
+        self.max_depth = max(self.max_depth, depth)
+
+    def get(self):
+        start_time = time.perf_counter()
+        item = self.queue.get()
+        self.consumer_stall_seconds += time.perf_counter() - start_time
+        return item
+
+    def drain(self) -> None:
+        # throws away everything up to END_OF_STREAM, used after a failure so the producer is never left blocked
+        while self.get() is not END_OF_STREAM:
+            pass
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+# === Main
+# ==============================================================================
+def create_fast_voucher_review_spreadsheet_pipelined(ingest_options: VoucherIngestOptions | None = None) -> None:
+    # Same Voucher File Review as create_fast_voucher_review_spreadsheet, run as three concurrent stages joined by
+    # bounded queues:
+    #   parse - reads the voucher files (dom or stream, per ingest_options.mode) into batches of accounting entries
+    #   group - adds each batch to the entry list and the GLEntryHdrID groups
+    #   write - writes the detail and EFT rows of each batch as it arrives, then the balanced and unbalanced sheets
+    #           once the grouping is complete
+    # File reads, grouping and workbook writes overlap instead of running one after another.
+    print('\n\nStart Create FAST Voucher Review Spreadsheet (pipelined)')
+
+    if ingest_options is None:
+        ingest_options = VoucherIngestOptions()
+    ingest_options = get_planned_ingest_options(ingest_options)
+
+    files_to_process = get_files_to_process()
+    if files_to_process:
+        run_voucher_review_pipeline(files_to_process, ingest_options)
+    print('\nEnd Create FAST Voucher Review Spreadsheet (pipelined)')
+
+    return None
+
+
+# ==============================================================================
+def run_voucher_review_pipeline(files_to_process: list, ingest_options: VoucherIngestOptions) -> list[PipelineQueue]:
+    # Runs the parse and group stages in worker threads and the write stage in this thread.  Returns the pipeline
+    # queues so their depth and stall numbers can be looked at after the run.
+
+    start_time = time.perf_counter()
+    # the workbook is named after the cycle date, which the quick scan gets without waiting for the parse
+    scan_file_info = VoucherFileInfo()
+    merge_parsed_voucher_files([ParsedVoucherFile(cur_file, quick_scan_voucher_file(cur_file))
+                                for cur_file in files_to_process], scan_file_info, [])
+
+    input_data = FastVoucherFileReview.InputData(VoucherFileInfo())
+    input_data.files_to_process = files_to_process
+    if ingest_options.use_entry_store or ingest_options.fixed_point_amounts:
+        input_data.unmatched_accounting_entries = AccountEntryStore()
+
+    parsed_queue = PipelineQueue('parse => group', ingest_options.pipeline_queue_batches)
+    grouped_queue = PipelineQueue('group => write', ingest_options.pipeline_queue_batches)
+    stage_seconds: dict[str, float] = {}
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='voucher_pipeline') as executor:
+        parse_future = executor.submit(run_parse_stage, input_data, ingest_options, parsed_queue, stage_seconds)
+        group_future = executor.submit(run_group_stage, input_data, ingest_options, parsed_queue, grouped_queue,
+                                       stage_seconds)
+        output_data = run_write_stage(scan_file_info.cycle_date, input_data, grouped_queue, parse_future,
+                                      group_future, stage_seconds)
+
+    FastVoucherFileReview.print_transactions_info_to_console(input_data, len(input_data.unmatched_accounting_entries))
+    print_control_total_checks_to_console(FastVoucherFileReview.get_voucher_aggregates(input_data))
+    print(f'  Balanced header groups => {len(output_data.balanced_hdr_groups)}')
+    print(f'  Unbalanced header groups => {len(output_data.unbalanced_hdr_groups)}')
+    print_pipeline_metrics_to_console(stage_seconds, [parsed_queue, grouped_queue], time.perf_counter() - start_time)
+    FastVoucherFileReview.save_entry_dataset_partition(input_data, ingest_options)
+
+    return [parsed_queue, grouped_queue]
+
+
+# ==============================================================================
+def run_parse_stage(input_data: FastVoucherFileReview.InputData, ingest_options: VoucherIngestOptions,
+                    parsed_queue: PipelineQueue, stage_seconds: dict[str, float]) -> None:
+    # Reads every voucher file, streamed or parsed whole as ingest_options.mode says, and sends the parsed
+    # reports on in batches of pipeline_batch_entries.  With fixed point amounts the batches hold the field lists
+    # for AccountEntryStore.append_fields, else AccountEntry objects.  A batch never runs past the end of a file,
+    # the file is closed off with a PipelineFileEnd.
+
+    start_time = time.perf_counter()
+    extract_rpt_processor = (process_cur_extract_rpt_fields if ingest_options.fixed_point_amounts
+                             else process_cur_extract_rpt)
+    read_accounting_entries = (stream_accounting_entries_from_xml_file if ingest_options.mode == 'stream'
+                               else parse_accounting_entries_from_xml_file)
+    try:
+        for cur_xml_file_path in input_data.files_to_process:
+            entry_batch = []
+            cur_file_info = VoucherFileInfo()
+            for cur_entry in read_accounting_entries(cur_xml_file_path, cur_file_info, extract_rpt_processor):
+                entry_batch.append(cur_entry)
+                if len(entry_batch) >= ingest_options.pipeline_batch_entries:
+                    parsed_queue.put(entry_batch)
+                    entry_batch = []
+            if entry_batch:
+                parsed_queue.put(entry_batch)
+            parsed_queue.put(PipelineFileEnd(cur_xml_file_path, cur_file_info))
+    finally:
+        parsed_queue.put(END_OF_STREAM)
+        stage_seconds['parse'] = time.perf_counter() - start_time - parsed_queue.producer_stall_seconds
+
+    return None
+
+
+# ==============================================================================
+def run_group_stage(input_data: FastVoucherFileReview.InputData, ingest_options: VoucherIngestOptions,
+                    parsed_queue: PipelineQueue, grouped_queue: PipelineQueue,
+                    stage_seconds: dict[str, float]) -> FastVoucherFileReview.OutputData:
+    # Adds each batch to the accounting entries and to its GLEntryHdrID group, then passes the batch on to be
+    # written.  The balanced / unbalanced split is only known once the last entry is in, so it is returned for
+    # the write stage to pick up.  With a grouping memory budget, reversal netting or exclude_duplicate_entries the
+    # grouping is left to process_accounting_entries at the end, which leaves out the duplicates, nets the
+    # reversals and decides whether to go out of core.  The duplicate check itself runs batch by batch in
+    # index_new_accounting_entries either way.
+
+    start_time = time.perf_counter()
+    accounting_entries = input_data.unmatched_accounting_entries
+    fixed_point_amounts = ingest_options.fixed_point_amounts
+    group_incrementally = (not ingest_options.grouping_memory_budget_bytes and not ingest_options.net_reversals
+                           and not ingest_options.exclude_duplicate_entries)
+    hdr_group_index = FastVoucherFileReview.GLEntryHdrIDGroupIndex(fixed_point_amounts)
+    file_start_row = 0
+    try:
+        while (entry_batch := parsed_queue.get()) is not END_OF_STREAM:
+            if isinstance(entry_batch, PipelineFileEnd):
+                input_data.file_entry_counts.append(len(accounting_entries) - file_start_row)
+                file_start_row = len(accounting_entries)
+                merge_voucher_file_info(entry_batch.file_info, input_data.file_info)
+                FastVoucherFileReview.get_voucher_aggregates(input_data).end_file(entry_batch.xml_file_path.name,
+                                                                                  entry_batch.file_info)
+                continue
+            if isinstance(accounting_entries, AccountEntryStore):
+                first_row = len(accounting_entries)
+                for cur_entry in entry_batch:
+                    if fixed_point_amounts:
+                        accounting_entries.append_fields(*cur_entry)
+                    else:
+                        accounting_entries.append(cur_entry)
+                entry_batch = [AccountEntryRow(accounting_entries, cur_row)
+                               for cur_row in range(first_row, len(accounting_entries))]
+            else:
+                accounting_entries.extend(entry_batch)
+            FastVoucherFileReview.index_new_accounting_entries(input_data, ingest_options)
+            FastVoucherFileReview.get_voucher_aggregates(input_data).add_new_entries()
+            if group_incrementally:
+                hdr_group_index.add_entries(entry_batch)
+            grouped_queue.put(entry_batch)
+    except BaseException:
+        parsed_queue.drain()
+        raise
+    finally:
+        grouped_queue.put(END_OF_STREAM)
+
+    if group_incrementally:
+        output_data = FastVoucherFileReview.process_header_groups(hdr_group_index.get_hdr_groups(),
+                                                                  fixed_point_amounts)
+        FastVoucherFileReview.add_account_entries_to_output_data(
+            FastVoucherFileReview.get_account_index(input_data), ingest_options, output_data)
+        FastVoucherFileReview.add_offsetting_hdr_groups_to_output_data(ingest_options, output_data)
+        if ingest_options.detect_duplicate_entries:
+            output_data.duplicate_entries = FastVoucherFileReview.get_duplicate_entries(input_data, False)
+    else:
+        output_data = FastVoucherFileReview.process_accounting_entries(input_data, ingest_options)
+    stage_seconds['group'] = (time.perf_counter() - start_time - parsed_queue.consumer_stall_seconds
+                              - grouped_queue.producer_stall_seconds)
+
+    return output_data
+
+
+# ==============================================================================
+def run_write_stage(cycle_date: str, input_data: FastVoucherFileReview.InputData, grouped_queue: PipelineQueue,
+                    parse_future: Future, group_future: Future,
+                    stage_seconds: dict[str, float]) -> FastVoucherFileReview.OutputData:
+    # Writes the Accounting Entry Detail rows batch by batch while the files are still being parsed, then waits
+    # for the grouping to finish and writes the EFT Transactions, Unbalanced and Balanced Entries sheets and the
+    # Summary.  The EFT list comes from the account index once the group stage knows which entries are left out
+    # as duplicates or netted reversals.  A failure in the parse or group stage is raised here before the
+    # workbook is closed.
+
+    start_time = time.perf_counter()
+    voucher_ss = FastVoucherFileReview.create_spreadsheet(cycle_date)
+    FastVoucherFileReview.write_account_entry_header_to_worksheet(voucher_ss, voucher_ss.detail_ws)
+    detail_ws_row = 1
+    try:
+        while (entry_batch := grouped_queue.get()) is not END_OF_STREAM:
+            for cur_entry in entry_batch:
+                FastVoucherFileReview.write_account_entry_to_worksheet(voucher_ss, voucher_ss.detail_ws,
+                                                                       detail_ws_row, cur_entry)
+                detail_ws_row += 1
+    except BaseException:
+        grouped_queue.drain()
+        raise
+
+    wait_start_time = time.perf_counter()
+    parse_future.result()
+    output_data = group_future.result()
+    wait_seconds = time.perf_counter() - wait_start_time
+    FastVoucherFileReview.write_eft_transactions_to_spreadsheet(voucher_ss, output_data.eft_transactions)
+    FastVoucherFileReview.write_unbalanced_header_groups_to_spreadsheet(voucher_ss, output_data.unbalanced_hdr_groups)
+    FastVoucherFileReview.write_balanced_header_groups_to_spreadsheet(voucher_ss, output_data.balanced_hdr_groups)
+    FastVoucherFileReview.write_watch_account_entries_to_spreadsheet(voucher_ss, output_data.watch_account_entries)
+    if output_data.duplicate_entries:
+        FastVoucherFileReview.write_duplicate_entries_to_spreadsheet(voucher_ss, output_data.duplicate_entries)
+    if output_data.offsetting_hdr_groups:
+        FastVoucherFileReview.write_offsetting_hdr_groups_to_spreadsheet(voucher_ss, output_data.offsetting_hdr_groups)
+    if output_data.netted_reversals:
+        FastVoucherFileReview.write_netted_reversals_to_spreadsheet(voucher_ss, output_data.netted_reversals,
+                                                                    input_data.unmatched_accounting_entries)
+    FastVoucherFileReview.write_policy_summary_to_spreadsheet(
+        voucher_ss, FastVoucherFileReview.get_policy_index(input_data).get_policy_summaries(
+            output_data.unbalanced_hdr_groups))
+    FastVoucherFileReview.write_summary_to_spreadsheet(voucher_ss,
+                                                       FastVoucherFileReview.get_voucher_aggregates(input_data))
+    voucher_ss.workbook.close()
+    stage_seconds['write'] = time.perf_counter() - start_time - grouped_queue.consumer_stall_seconds - wait_seconds
+
+    return output_data
+
+
+# ==============================================================================
+def print_pipeline_metrics_to_console(stage_seconds: dict[str, float], pipeline_queues: list[PipelineQueue],
+                                      wall_seconds: float) -> None:
+
+    print('\n  Voucher pipeline stage timings (busy time, excluding queue waits)')
+    for stage_name, busy_seconds in stage_seconds.items():
+        print(f'    {stage_name:<6} => {busy_seconds:.2f} sec')
+    print('  Voucher pipeline queues')
+    for cur_queue in pipeline_queues:
+        average_depth = cur_queue.total_depth / cur_queue.num_puts if cur_queue.num_puts else 0.0
+        print(f'    {cur_queue.name:<15} => max depth {cur_queue.max_depth}/{cur_queue.max_batches}, '
+              f'avg depth {average_depth:.1f}, '
+              f'producer stalled {cur_queue.producer_stall_seconds:.2f} sec, '
+              f'consumer starved {cur_queue.consumer_stall_seconds:.2f} sec')
+    print(f'  Elapsed pipeline time ===> {wall_seconds:.2f} sec')
+
+    return None
+
+
+if __name__ == "__main__":
+    create_fast_voucher_review_spreadsheet_pipelined()
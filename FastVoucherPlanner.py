@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import ctypes
+import dataclasses
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherFileParser import (VoucherIngestOptions, get_files_to_process, is_compressed_voucher_file,
+                                   quick_scan_voucher_file)
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# Memory estimates the plan is built from, measured on GL extracts shaped like the real voucher files
+# size of one GLExtractReport in the XML
+XML_BYTES_PER_RECORD = 400
+# compressed extracts are assumed to inflate by this much, their size is not known without decompressing them
+COMPRESSED_XML_RATIO = 10
+# lxml element tree built by a dom parse, per byte of XML
+DOM_BYTES_PER_XML_BYTE = 6
+# one AccountEntry object with its strings and Decimal, and one row of an AccountEntryStore
+ENTRY_OBJECT_BYTES = 700
+ENTRY_STORE_BYTES = 100
+# estimated memory the in-memory header grouping needs per accounting entry (group share, entry list slot and,
+# for an AccountEntryStore, the row view), measured at 80 to 190 bytes
+GROUPING_BYTES_PER_ENTRY = 200
+# memory budget used when the physical memory of the machine can not be read
+DEFAULT_MEMORY_BUDGET_BYTES = 4 * 1024 * 1024 * 1024
+# below this much XML, starting worker processes costs more than parsing the files one after another
+PARALLEL_MIN_XML_BYTES = 16 * 1024 * 1024
+# smallest grouping budget handed to out-of-core grouping when the entries take up the whole memory budget
+MIN_GROUPING_BUDGET_BYTES = 1024 * 1024
+
+
+class MemoryStatusEx(ctypes.Structure):
+    # the MEMORYSTATUSEX structure filled in by GlobalMemoryStatusEx on Windows
+    _fields_ = [('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+
+@dataclass
+class VoucherIngestPlan:
+    # the ingest options chosen for the input, with the estimates they were chosen from and the reason for each
+    # choice, in the order the choices were made
+    ingest_options: VoucherIngestOptions
+    memory_budget_bytes: int = 0
+    num_files: int = 0
+    xml_bytes: int = 0
+    largest_file_xml_bytes: int = 0
+    num_entries: int = 0
+    reasons: list[str] = field(default_factory=list)
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def get_planned_ingest_options(ingest_options: VoucherIngestOptions,
+                               files_to_process: list[Path] | None = None) -> VoucherIngestOptions:
+    # the ingest options to run with: unchanged unless auto_plan is set, then the options of the plan for
+    # files_to_process, or the voucher files waiting to be processed when not given
+
+    if not ingest_options.auto_plan:
+        return ingest_options
+    if files_to_process is None:
+        files_to_process = get_files_to_process()
+    if not files_to_process:
+        return ingest_options
+    ingest_plan = plan_voucher_ingest(files_to_process, ingest_options)
+    print_voucher_ingest_plan_to_console(ingest_plan)
+
+    return ingest_plan.ingest_options
+
+
+# ==============================================================================
+def plan_voucher_ingest(files_to_process: list[Path], ingest_options: VoucherIngestOptions) -> VoucherIngestPlan:
+    # Chooses how the voucher files are read and grouped from their size and entry count, so that the estimated
+    # peak memory stays within the memory budget:
+    #   entries  - AccountEntry objects while they fit in half the budget, otherwise the compact fixed point
+    #              AccountEntryStore
+    #   parse    - dom while the element tree of the largest file fits next to the entries, otherwise stream
+    #   parallel - one worker per file when there is enough XML to be worth it and enough memory for the workers
+    #   split    - large plain files are split and parsed in pieces when there is more than one CPU
+    #   grouping - in memory while the groups fit in the memory left after the entries, otherwise out of core
+    #              with that memory as the grouping budget
+    # Options that are not part of the plan (cache, checkpoint, duplicates, ...) are passed on unchanged.
+
+    memory_budget = ingest_options.memory_budget_bytes or get_default_memory_budget()
+    ingest_plan = VoucherIngestPlan(dataclasses.replace(ingest_options), memory_budget, len(files_to_process))
+    planned_options = ingest_plan.ingest_options
+    for cur_file in files_to_process:
+        cur_xml_bytes, cur_num_entries = estimate_voucher_file_size(cur_file)
+        ingest_plan.xml_bytes += cur_xml_bytes
+        ingest_plan.largest_file_xml_bytes = max(ingest_plan.largest_file_xml_bytes, cur_xml_bytes)
+        ingest_plan.num_entries += cur_num_entries
+    num_cpus = os.cpu_count() or 1
+
+    if ingest_plan.num_entries * ENTRY_OBJECT_BYTES <= memory_budget // 2 and not planned_options.fixed_point_amounts:
+        entry_bytes = ingest_plan.num_entries * (ENTRY_STORE_BYTES if planned_options.use_entry_store
+                                                 else ENTRY_OBJECT_BYTES)
+        ingest_plan.reasons.append(f'entries => {"entry store" if planned_options.use_entry_store else "objects"}, '
+                                   f'{format_megabytes(entry_bytes)} fits in half the budget')
+    else:
+        planned_options.fixed_point_amounts = True
+        entry_bytes = ingest_plan.num_entries * ENTRY_STORE_BYTES
+        ingest_plan.reasons.append(f'entries => fixed point entry store, {format_megabytes(entry_bytes)} instead of '
+                                   f'{format_megabytes(ingest_plan.num_entries * ENTRY_OBJECT_BYTES)} as objects')
+
+    dom_bytes = ingest_plan.largest_file_xml_bytes * DOM_BYTES_PER_XML_BYTE
+    if dom_bytes + entry_bytes <= memory_budget:
+        planned_options.mode = 'dom'
+        ingest_plan.reasons.append(f'parse => dom, the largest file tree ({format_megabytes(dom_bytes)}) fits '
+                                   f'next to the entries')
+        parse_bytes = dom_bytes
+    else:
+        planned_options.mode = 'stream'
+        ingest_plan.reasons.append(f'parse => stream, the largest file tree ({format_megabytes(dom_bytes)}) would '
+                                   f'not fit next to the entries')
+        parse_bytes = ingest_plan.largest_file_xml_bytes // XML_BYTES_PER_RECORD * ENTRY_STORE_BYTES
+
+    # every worker holds the tree or entries of its own file, and the parsed files are pickled back to this
+    # process, so the entries are briefly held twice
+    max_workers = min(num_cpus, ingest_plan.num_files,
+                      max(0, memory_budget - 2 * entry_bytes) // max(1, parse_bytes))
+    if ingest_plan.xml_bytes < PARALLEL_MIN_XML_BYTES or max_workers < 2:
+        planned_options.parallel_files = False
+        why_not = (f'only {format_megabytes(ingest_plan.xml_bytes)} of XML'
+                   if ingest_plan.xml_bytes < PARALLEL_MIN_XML_BYTES
+                   else f'{ingest_plan.num_files} files, {num_cpus} CPUs and the memory allow only one worker')
+        ingest_plan.reasons.append(f'parallel => no, {why_not}')
+    else:
+        planned_options.parallel_files = True
+        planned_options.max_workers = max_workers
+        ingest_plan.reasons.append(f'parallel => {max_workers} worker processes, {num_cpus} CPUs, memory for '
+                                   f'{max_workers} files at a time')
+
+    large_plain_files = [cur_file for cur_file in files_to_process if not is_compressed_voucher_file(cur_file)
+                         and cur_file.stat().st_size >= planned_options.split_file_min_bytes]
+    planned_options.split_large_files = bool(large_plain_files) and num_cpus > 1
+    if planned_options.split_large_files:
+        ingest_plan.reasons.append(f'split => {len(large_plain_files)} files of at least '
+                                   f'{format_megabytes(planned_options.split_file_min_bytes)} parsed in pieces')
+    else:
+        ingest_plan.reasons.append('split => no, no plain file is large enough or there is only one CPU')
+
+    grouping_bytes = ingest_plan.num_entries * GROUPING_BYTES_PER_ENTRY
+    grouping_budget = max(MIN_GROUPING_BUDGET_BYTES, memory_budget - entry_bytes)
+    # a budget is only handed on when the groups need more, any budget makes the pipeline and watch folder
+    # group at the end instead of as the entries arrive
+    if grouping_bytes > grouping_budget:
+        planned_options.grouping_memory_budget_bytes = grouping_budget
+        ingest_plan.reasons.append(f'grouping => out of core, {format_megabytes(grouping_bytes)} of groups over '
+                                   f'the {format_megabytes(grouping_budget)} left after the entries')
+    else:
+        ingest_plan.reasons.append(f'grouping => in memory, {format_megabytes(grouping_bytes)} of groups within '
+                                   f'the {format_megabytes(grouping_budget)} left after the entries')
+
+    return ingest_plan
+
+
+# ==============================================================================
+def estimate_voucher_file_size(xml_file_path: Path) -> tuple[int, int]:
+    # (XML bytes, accounting entries) of a voucher file.  A plain file is quick scanned for NumberOfRecords, a
+    # compressed file would have to be decompressed to find it, so its entries are estimated from its size.
+
+    file_bytes = xml_file_path.stat().st_size
+    if is_compressed_voucher_file(xml_file_path):
+        xml_bytes = file_bytes * COMPRESSED_XML_RATIO
+        return xml_bytes, xml_bytes // XML_BYTES_PER_RECORD
+
+    num_entries = quick_scan_voucher_file(xml_file_path).number_of_records
+    if num_entries <= 0:
+        num_entries = file_bytes // XML_BYTES_PER_RECORD
+
+    return file_bytes, num_entries
+
+
+# ==============================================================================
+def get_default_memory_budget() -> int:
+    # half the physical memory, leaving the rest for the workbook writer and everything else on the machine
+
+    physical_bytes = get_physical_memory_bytes()
+
+    return physical_bytes // 2 if physical_bytes > 0 else DEFAULT_MEMORY_BUDGET_BYTES
+
+
+# ==============================================================================
+def get_physical_memory_bytes() -> int:
+    # Physical memory of the machine, 0 when it can not be read.  os.sysconf only exists on Unix, Windows is
+    # asked through GlobalMemoryStatusEx instead.
+
+    if sys.platform == 'win32':
+        memory_status = MemoryStatusEx()
+        memory_status.dwLength = ctypes.sizeof(MemoryStatusEx)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(memory_status)):
+            return 0
+        return memory_status.ullTotalPhys
+
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return 0
+
+
+# ==============================================================================
+def format_megabytes(num_bytes: int) -> str:
+
+    return f'{num_bytes / (1024 * 1024):,.0f} MB'
+
+
+# ==============================================================================
+def print_voucher_ingest_plan_to_console(ingest_plan: VoucherIngestPlan) -> None:
+
+    print('\n  Voucher ingest plan')
+    print(f'    Memory budget => {format_megabytes(ingest_plan.memory_budget_bytes)}')
+    print(f'    Input ========> {ingest_plan.num_files} files, {format_megabytes(ingest_plan.xml_bytes)} of XML, '
+          f'about {ingest_plan.num_entries:,} entries')
+    for cur_reason in ingest_plan.reasons:
+        print(f'    {cur_reason}')
+
+    return None
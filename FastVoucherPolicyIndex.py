@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherDataClasses import cents_to_decimal
+from FastVoucherEntryStore import AccountEntryStore
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+
+@dataclass
+class PolicySummary:
+    policy_num: str
+    num_entries: int = 0
+    net_amount: Decimal = Decimal('0.00')
+    unbalanced_hdr_ids: list[str] = field(default_factory=list)
+
+
+class PolicyIndex:
+    # Entry count and net amount of every policy number, kept up to date as the entries are read.  Call
+    # index_new_entries() after entries have been appended and only those new entries are looked at, the same as
+    # AccountEntryIndex, so the totals are done when ingestion is done.  For an AccountEntryStore the policy
+    # numbers are read straight from the string column and the amounts are summed in cents.
+
+    def __init__(self, accounting_entries):
+        self.accounting_entries = accounting_entries
+        self.amounts_in_cents = isinstance(accounting_entries, AccountEntryStore)
+        # policy number => [entries, net amount]
+        self.totals_by_policy: dict[str, list] = {}
+        self.num_indexed = 0
+
+    # ==========================================================================
+    def index_new_entries(self) -> None:
+
+        accounting_entries = self.accounting_entries
+        num_entries = len(accounting_entries)
+        if self.num_indexed >= num_entries:
+            return None
+
+        totals_by_policy = self.totals_by_policy
+        if self.amounts_in_cents:
+            new_policies_and_amounts = zip(accounting_entries.policy_num.iter_values(self.num_indexed, num_entries),
+                                           accounting_entries.amount_cents[self.num_indexed:num_entries])
+        else:
+            new_policies_and_amounts = ((accounting_entries[row].policy_num, accounting_entries[row].amount)
+                                        for row in range(self.num_indexed, num_entries))
+        for cur_policy_num, cur_amount in new_policies_and_amounts:
+            cur_totals = totals_by_policy.get(cur_policy_num)
+            if cur_totals is None:
+                cur_totals = totals_by_policy[cur_policy_num] = [0, 0]
+            cur_totals[0] += 1
+            cur_totals[1] += cur_amount
+        self.num_indexed = num_entries
+
+        return None
+
+    # ==========================================================================
+    def get_policy_summaries(self, unbalanced_hdr_groups) -> list[PolicySummary]:
+        # one summary per policy number in policy number order, with the GLEntryHdrIDs of the unbalanced header
+        # groups that have an entry for the policy
+
+        self.index_new_entries()
+        policy_summaries = {cur_policy_num: PolicySummary(cur_policy_num, cur_totals[0],
+                                                          cents_to_decimal(cur_totals[1]) if self.amounts_in_cents
+                                                          else Decimal(cur_totals[1]))
+                            for cur_policy_num, cur_totals in self.totals_by_policy.items()}
+        for cur_hdr_group in unbalanced_hdr_groups:
+            group_policy_nums = dict.fromkeys(cur_entry.policy_num for cur_entry in cur_hdr_group.entries)
+            for cur_policy_num in group_policy_nums:
+                cur_summary = policy_summaries.get(cur_policy_num)
+                if cur_summary is not None:
+                    cur_summary.unbalanced_hdr_ids.append(cur_hdr_group.hdr_id)
+
+        return [policy_summaries[cur_policy_num]
+                for cur_policy_num in sorted(policy_summaries, key=lambda cur_policy_num: cur_policy_num or '')]
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+
+
+# Third party imports
+
+
+# local file imports
+import ACH_EFT_Compare
+import FastVoucherFileReview
+from FastVoucherFileParser import VoucherIngestOptions
+from FastVoucherPlanner import get_planned_ingest_options
+
+
+# SGM Shared Module imports
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+# === Main
+# ==============================================================================
+def create_voucher_review_and_ach_compare_spreadsheets(ingest_options: VoucherIngestOptions | None = None) -> None:
+    # Reconciliation day run: the voucher files are parsed once and the same accounting entries feed both the
+    # header group balancing of the Voucher File Review and the EFT vs ACH matching of the ACH File Review.
+    print('\n\nStart Create FAST Voucher Review and ACH-EFT Compare Spreadsheets')
+
+    if ingest_options is None:
+        ingest_options = VoucherIngestOptions()
+    ingest_options = get_planned_ingest_options(ingest_options)
+
+    checkpoint = FastVoucherFileReview.get_voucher_run_checkpoint(ingest_options)
+    voucher_input_data, voucher_output_data = FastVoucherFileReview.get_grouped_voucher_data(ingest_options,
+                                                                                              checkpoint)
+    if voucher_output_data is not None:
+        print('\n  Creating Voucher File Review Spreadsheet')
+        FastVoucherFileReview.create_voucher_file_review_spreadsheet(voucher_output_data, voucher_input_data)
+        create_ach_compare_from_input_data(voucher_input_data, voucher_output_data.eft_transactions, ingest_options)
+        FastVoucherFileReview.save_entry_dataset_partition(voucher_input_data, ingest_options)
+    if checkpoint is not None:
+        checkpoint.clear()
+    print('\nEnd Create FAST Voucher Review and ACH-EFT Compare Spreadsheets')
+
+    return None
+
+
+# ==============================================================================
+def create_ach_compare_from_input_data(voucher_input_data: FastVoucherFileReview.InputData,
+                                       eft_transactions: list,
+                                       ingest_options: VoucherIngestOptions) -> None:
+
+    print('\n  Creating ACH-EFT Compare Spreadsheet')
+    ach_input_data = ACH_EFT_Compare.InputData(voucher_input_data.file_info,
+                                               voucher_input_data.unmatched_accounting_entries,
+                                               eft_transactions)
+    ach_input_data.ach_transactions = ACH_EFT_Compare.get_data_from_ach_file()
+
+    ach_output_data = ACH_EFT_Compare.OutputData([])
+    ACH_EFT_Compare.add_match_results_to_output_data(
+        ACH_EFT_Compare.compare_eft_transactions_to_ach_transactions(ach_input_data,
+                                                                    ingest_options.ach_match_policy_first),
+        ach_output_data)
+    ACH_EFT_Compare.print_totals_for_eft_and_ach_transactions_to_console(ach_input_data,
+                                                                       ingest_options.fixed_point_amounts)
+    ACH_EFT_Compare.create_ach_transaction_review_spreadsheet(ach_output_data, ach_input_data)
+
+    return None
+
+
+if __name__ == "__main__":
+    create_voucher_review_and_ach_compare_spreadsheets()
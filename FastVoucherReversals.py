@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+from collections import deque
+from dataclasses import dataclass, field
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherEntryStore import AccountEntryStore
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# IsReversal value of a reversing entry
+REVERSAL_TRUE = 'true'
+REVERSAL_MATCH_GL_ENTRY_ID = 'GLEntryID'
+REVERSAL_MATCH_ENTRY_FIELDS = 'Policy, account, type, amount'
+
+
+@dataclass
+class NettedReversal:
+    # entry indexes of a reversing entry and the entry it reverses, and which join matched them
+    reversal_row: int
+    original_row: int
+    match_type: str
+
+
+@dataclass
+class ReversalNettingResults:
+    netted_reversals: list[NettedReversal] = field(default_factory=list)
+    num_reversals: int = 0
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def find_netted_reversals(accounting_entries, excluded_rows: set[int] | None = None,
+                          match_by_fields: bool = False) -> ReversalNettingResults:
+    # Hash joins every reversing entry (IsReversal true) to an entry it reverses, one that is not a reversal and
+    # has the opposite amount.  The extract has no field pointing a reversal at its original, so the join is
+    # tried on up to two keys in turn:
+    #   GLEntryID                                      - the reversal carries the GLEntryID of the original
+    #   policy, account, transaction type, disbursement - only with match_by_fields, the original posting with the
+    #                                                    amount turned around
+    # The fields join is looser, any posting of the same policy, account and type with the opposite amount is
+    # taken as the original, so it is only tried when asked for.  The hash tables are built on the reversals, the
+    # small side of the join, and the other entries probe them, one pass for each key, so the netting is linear
+    # in the number of entries and its memory grows only with the number of reversals.  Each entry is netted at
+    # most once and excluded_rows take no part.
+
+    excluded_rows = excluded_rows or set()
+    reversals_by_gl_entry_id: dict = {}
+    reversal_fields_keys: dict[int, tuple] = {}
+    for row, cur_gl_entry_id, cur_fields_key, cur_amount, is_reversal in iter_reversal_join_keys(accounting_entries):
+        if is_reversal and row not in excluded_rows:
+            reversals_by_gl_entry_id.setdefault((cur_gl_entry_id, -cur_amount), deque()).append(row)
+            reversal_fields_keys[row] = (cur_fields_key, -cur_amount)
+
+    netting_results = ReversalNettingResults(num_reversals=len(reversal_fields_keys))
+    netted_original_rows = set()
+    if reversal_fields_keys:
+        join_reversals_to_originals(accounting_entries, excluded_rows, reversals_by_gl_entry_id, False,
+                                    REVERSAL_MATCH_GL_ENTRY_ID, netted_original_rows, netting_results)
+    if not match_by_fields:
+        return netting_results
+
+    netted_reversal_rows = {cur_netted_reversal.reversal_row
+                            for cur_netted_reversal in netting_results.netted_reversals}
+    reversals_by_fields: dict = {}
+    for row, cur_key in reversal_fields_keys.items():
+        if row not in netted_reversal_rows:
+            reversals_by_fields.setdefault(cur_key, deque()).append(row)
+    if reversals_by_fields:
+        join_reversals_to_originals(accounting_entries, excluded_rows | netted_original_rows, reversals_by_fields,
+                                    True, REVERSAL_MATCH_ENTRY_FIELDS, netted_original_rows, netting_results)
+
+    return netting_results
+
+
+# ==============================================================================
+def join_reversals_to_originals(accounting_entries, excluded_rows: set[int], reversals_by_key: dict,
+                                use_fields_key: bool, match_type: str, netted_original_rows: set[int],
+                                netting_results: ReversalNettingResults) -> None:
+    # probes the reversals waiting under each key with every entry that is not a reversal, an entry that finds
+    # one is netted against the first of them
+
+    for row, cur_gl_entry_id, cur_fields_key, cur_amount, is_reversal in iter_reversal_join_keys(accounting_entries):
+        if is_reversal or row in excluded_rows:
+            continue
+        waiting_reversals = reversals_by_key.get((cur_fields_key if use_fields_key else cur_gl_entry_id, cur_amount))
+        if waiting_reversals:
+            reversal_row = waiting_reversals.popleft()
+            netted_original_rows.add(row)
+            netting_results.netted_reversals.append(NettedReversal(reversal_row, row, match_type))
+
+    return None
+
+
+# ==============================================================================
+def iter_reversal_join_keys(accounting_entries):
+    # (row, GLEntryID, (policy, account, transaction type, disbursement), amount, is reversal) for every entry.
+    # For an AccountEntryStore the categorical columns are keyed by their dictionary codes and the amount is in
+    # cents, no entry views are built.
+
+    if isinstance(accounting_entries, AccountEntryStore):
+        reversal_true_codes = {cur_code for cur_value, cur_code in accounting_entries.reversal.codes_by_value.items()
+                               if (cur_value or '').lower() == REVERSAL_TRUE}
+        yield from ((row, cur_gl_entry_id, (cur_policy_num, cur_account, cur_trans_type, cur_disbursement),
+                     cur_amount, cur_reversal in reversal_true_codes)
+                    for row, (cur_gl_entry_id, cur_policy_num, cur_account, cur_trans_type, cur_disbursement,
+                              cur_amount, cur_reversal)
+                    in enumerate(zip(accounting_entries.gl_entry_id.iter_values(),
+                                     accounting_entries.policy_num.iter_values(),
+                                     accounting_entries.account.codes,
+                                     accounting_entries.trans_type_desc.codes,
+                                     accounting_entries.disbursement.codes,
+                                     accounting_entries.amount_cents,
+                                     accounting_entries.reversal.codes)))
+    else:
+        for row, cur_entry in enumerate(accounting_entries):
+            yield (row, cur_entry.gl_entry_id,
+                   (cur_entry.policy_num, cur_entry.account, cur_entry.trans_type_desc, cur_entry.disbursement),
+                   cur_entry.amount, (cur_entry.reversal or '').lower() == REVERSAL_TRUE)
+
+    return None
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import pickle
+import tempfile
+import zlib
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# default number of records pickled together, large enough that the pickle overhead per record does not matter
+SPILL_BATCH_RECORDS = 10_000
+
+
+class HdrIDSpillPartitions:
+    # Temporary spill files for out-of-core grouping.  Records are tuples whose second item is a GLEntryHdrID, each
+    # record goes to partition crc32(hdr_id) % num_partitions so every record of a header id lands in the same
+    # file and a partition can be grouped on its own.  crc32 is used instead of hash() so the partitioning is the
+    # same in every run.  Each partition buffers up to batch_records records before writing them.  The files live
+    # in a temporary directory that is removed by cleanup(), or when this object is garbage collected.
+
+    def __init__(self, num_partitions: int, spill_dir: Path | None = None, batch_records: int = SPILL_BATCH_RECORDS):
+        if spill_dir is not None:
+            spill_dir.mkdir(parents=True, exist_ok=True)
+        self.temp_dir = tempfile.TemporaryDirectory(prefix='voucher_spill_', dir=spill_dir)
+        self.spill_path = Path(self.temp_dir.name)
+        self.num_partitions = num_partitions
+        self.batch_records = batch_records
+        self.partition_paths = [self.spill_path / f'partition_{cur_partition:04d}.pkl'
+                                for cur_partition in range(num_partitions)]
+        self.partition_files = [open(cur_path, 'wb') for cur_path in self.partition_paths]
+        self.partition_buffers: list[list[tuple]] = [[] for _ in range(num_partitions)]
+
+    # ==========================================================================
+    def add(self, record: tuple) -> None:
+        # an empty GLEntryHdrID element parses as None, it goes to the same partition as '' but is still grouped
+        # on its own within the partition, the same as the in-memory grouping keys it
+
+        partition = zlib.crc32((record[1] or '').encode('utf-8')) % self.num_partitions
+        partition_buffer = self.partition_buffers[partition]
+        partition_buffer.append(record)
+        if len(partition_buffer) >= self.batch_records:
+            pickle.dump(partition_buffer, self.partition_files[partition], protocol=pickle.HIGHEST_PROTOCOL)
+            partition_buffer.clear()
+
+        return None
+
+    # ==========================================================================
+    def close_partition_files(self) -> None:
+        # flushes what is left in the buffers, call once every record has been added
+
+        for partition_buffer, partition_file in zip(self.partition_buffers, self.partition_files):
+            if partition_buffer:
+                pickle.dump(partition_buffer, partition_file, protocol=pickle.HIGHEST_PROTOCOL)
+                partition_buffer.clear()
+            partition_file.close()
+
+        return None
+
+    # ==========================================================================
+    def read_partition(self, partition: int) -> Iterator[tuple]:
+
+        return read_spill_records(self.partition_paths[partition])
+
+    # ==========================================================================
+    def get_spill_bytes(self) -> int:
+
+        return sum(cur_file.stat().st_size for cur_file in self.spill_path.iterdir())
+
+    # ==========================================================================
+    def cleanup(self) -> None:
+
+        self.temp_dir.cleanup()
+
+        return None
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def write_spill_records(spill_file_path: Path, records: Iterable[tuple],
+                        batch_records: int = SPILL_BATCH_RECORDS) -> None:
+
+    with open(spill_file_path, 'wb') as f:
+        record_batch = []
+        for cur_record in records:
+            record_batch.append(cur_record)
+            if len(record_batch) >= batch_records:
+                pickle.dump(record_batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                record_batch = []
+        if record_batch:
+            pickle.dump(record_batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return None
+
+
+# ==============================================================================
+def read_spill_records(spill_file_path: Path) -> Iterator[tuple]:
+    # yields the records of a spill file in the order they were written, one batch in memory at a time
+
+    with open(spill_file_path, 'rb') as f:
+        while True:
+            try:
+                record_batch = pickle.load(f)
+            except EOFError:
+                break
+            yield from record_batch
+
+    return None
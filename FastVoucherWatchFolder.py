@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# Third party imports
+
+
+# local file imports
+from FastVoucherFileParser import (VoucherFileInfo, VoucherIngestOptions, get_files_to_process, parse_voucher_file,
+                                   merge_parsed_voucher_files)
+from FastVoucherEntryStore import AccountEntryStore
+from FastVoucherAccountIndex import EFT_ACCOUNT
+from FastVoucherPlanner import get_planned_ingest_options
+from FastVoucherFileReview import (GLEntryHdrIDGroupIndex, InputData, OutputData, add_account_entries_to_output_data,
+                                   add_offsetting_hdr_groups_to_output_data, create_voucher_file_review_spreadsheet,
+                                   get_account_index, get_duplicate_entries, get_voucher_aggregates,
+                                   index_new_accounting_entries, print_transactions_info_to_console,
+                                   process_accounting_entries, process_header_groups, save_entry_dataset_partition)
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+
+@dataclass
+class VoucherWatchState:
+    # everything read so far: the accounting entries, file info and account index, the header groups built from
+    # them, and the (size, mtime) of each file read, or only seen once and not yet read
+    input_data: InputData
+    hdr_groups: GLEntryHdrIDGroupIndex
+    ingested_files: dict[Path, tuple[int, int]] = field(default_factory=dict)
+    pending_files: dict[Path, tuple[int, int]] = field(default_factory=dict)
+    workbook_current: bool = False
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+# === Main
+# ==============================================================================
+def watch_voucher_folder(ingest_options: VoucherIngestOptions | None = None) -> None:
+    # Long running watch of the voucher folder.  Each new voucher file is parsed as soon as it has finished
+    # arriving and its entries are added to the header groups and EFT list, so the workbook can be written
+    # straight from the running totals at any time rather than re-reading every file.  With auto_plan the ingest
+    # plan is made from the first voucher files to arrive, before any of their entries are read.
+    print('\n\nStart Watch FAST Voucher Folder')
+
+    if ingest_options is None:
+        ingest_options = VoucherIngestOptions()
+
+    print('\n  Watching for voucher files, enter  w - write the workbook now,  s - status,  q - write and stop')
+    console_commands = start_console_command_reader()
+    watch_state = create_voucher_watch_state(ingest_options)
+    plan_pending = ingest_options.auto_plan
+    done = False
+    while not done:
+        if plan_pending and watch_state.pending_files:
+            # nothing has been read yet, files are only read once they were already pending at the last look
+            ingest_options = get_planned_ingest_options(ingest_options, list(watch_state.pending_files))
+            planned_watch_state = create_voucher_watch_state(ingest_options)
+            planned_watch_state.pending_files = watch_state.pending_files
+            watch_state = planned_watch_state
+            plan_pending = False
+
+        if ingest_new_voucher_files(watch_state, ingest_options):
+            print_voucher_watch_status_to_console(watch_state, ingest_options)
+            if 0 < ingest_options.watch_expected_files <= len(watch_state.ingested_files):
+                print(f'\n  All {ingest_options.watch_expected_files} expected voucher files have been read')
+                write_voucher_watch_workbook(watch_state, ingest_options)
+                done = True
+                continue
+
+        try:
+            console_command = console_commands.get(timeout=ingest_options.watch_poll_seconds)
+        except queue.Empty:
+            console_command = ''
+        match console_command:
+            case 'w':
+                write_voucher_watch_workbook(watch_state, ingest_options)
+            case 's':
+                print_voucher_watch_status_to_console(watch_state, ingest_options)
+            case 'q':
+                if not watch_state.workbook_current:
+                    write_voucher_watch_workbook(watch_state, ingest_options)
+                done = True
+            case _:
+                pass
+
+    save_entry_dataset_partition(watch_state.input_data, ingest_options)
+    print('\nEnd Watch FAST Voucher Folder')
+
+    return None
+
+
+# ==============================================================================
+def start_console_command_reader() -> queue.Queue:
+    # input() blocks, so the console is read on a daemon thread and each command is handed over on a queue that
+    # the watch loop can wait on with a timeout
+
+    console_commands: queue.Queue = queue.Queue()
+
+    def read_console_commands() -> None:
+        while True:
+            try:
+                console_commands.put(input().strip().lower())
+            except EOFError:
+                break
+
+    threading.Thread(target=read_console_commands, name='voucher_watch_console', daemon=True).start()
+
+    return console_commands
+
+
+# ==============================================================================
+def create_voucher_watch_state(ingest_options: VoucherIngestOptions) -> VoucherWatchState:
+
+    input_data = InputData(VoucherFileInfo())
+    if ingest_options.use_entry_store or ingest_options.fixed_point_amounts:
+        input_data.unmatched_accounting_entries = AccountEntryStore()
+
+    return VoucherWatchState(input_data, GLEntryHdrIDGroupIndex(ingest_options.fixed_point_amounts))
+
+
+# ==============================================================================
+def ingest_new_voucher_files(watch_state: VoucherWatchState, ingest_options: VoucherIngestOptions) -> int:
+    # Reads every voucher file that has stopped changing since the last look and returns how many were read.  A
+    # file that was already read and has since changed or gone means the running totals are wrong, so the watch
+    # state is started over and every file is read again.
+
+    current_files = {}
+    for cur_file in get_files_to_process():
+        cur_file_stat = cur_file.stat()
+        current_files[cur_file] = (cur_file_stat.st_size, cur_file_stat.st_mtime_ns)
+
+    if any(current_files.get(cur_file) != cur_signature
+           for cur_file, cur_signature in watch_state.ingested_files.items()):
+        print('\n  A voucher file that was already read has changed or been removed, reading all files again')
+        new_watch_state = create_voucher_watch_state(ingest_options)
+        watch_state.input_data = new_watch_state.input_data
+        watch_state.hdr_groups = new_watch_state.hdr_groups
+        # files that are unchanged are read again straight away, changed files once they stop changing
+        watch_state.pending_files = watch_state.ingested_files
+        watch_state.ingested_files = {}
+        watch_state.workbook_current = False
+
+    num_files_read = 0
+    for cur_file, cur_signature in current_files.items():
+        if cur_file in watch_state.ingested_files:
+            continue
+        if watch_state.pending_files.get(cur_file) == cur_signature:
+            add_voucher_file_to_watch_state(cur_file, watch_state, ingest_options)
+            watch_state.ingested_files[cur_file] = cur_signature
+            num_files_read += 1
+    watch_state.pending_files = {cur_file: cur_signature for cur_file, cur_signature in current_files.items()
+                                 if cur_file not in watch_state.ingested_files}
+
+    return num_files_read
+
+
+# ==============================================================================
+def add_voucher_file_to_watch_state(xml_file_path: Path, watch_state: VoucherWatchState,
+                                    ingest_options: VoucherIngestOptions) -> None:
+
+    input_data = watch_state.input_data
+    accounting_entries = input_data.unmatched_accounting_entries
+    parsed_file = parse_voucher_file(xml_file_path, ingest_options.mode, ingest_options.fixed_point_amounts)
+    first_new_entry = len(accounting_entries)
+    merge_parsed_voucher_files([parsed_file], input_data.file_info, accounting_entries)
+    input_data.files_to_process.append(xml_file_path)
+    input_data.file_entry_counts.append(len(parsed_file.entries))
+    print_transactions_info_to_console(input_data, len(parsed_file.entries))
+
+    new_entries = [accounting_entries[cur_index] for cur_index in range(first_new_entry, len(accounting_entries))]
+    # with a grouping memory budget the entries are only grouped when the workbook is written
+    if not ingest_options.grouping_memory_budget_bytes:
+        watch_state.hdr_groups.add_entries_counting_balanced(new_entries)
+    index_new_accounting_entries(input_data, ingest_options)
+    aggregates = get_voucher_aggregates(input_data)
+    aggregates.add_new_entries()
+    aggregates.end_file(xml_file_path.name, parsed_file.file_info)
+    watch_state.workbook_current = False
+
+    return None
+
+
+# ==============================================================================
+def write_voucher_watch_workbook(watch_state: VoucherWatchState, ingest_options: VoucherIngestOptions) -> None:
+
+    if not watch_state.input_data.unmatched_accounting_entries:
+        print('\n  No accounting entries have been read yet, the workbook was not written')
+        return None
+
+    start_time = time.perf_counter()
+    output_data = get_voucher_watch_output_data(watch_state, ingest_options)
+    create_voucher_file_review_spreadsheet(output_data, watch_state.input_data)
+    watch_state.workbook_current = True
+    print(f'\n  Voucher File Review workbook written in {time.perf_counter() - start_time:.2f} sec')
+
+    return None
+
+
+# ==============================================================================
+def get_voucher_watch_output_data(watch_state: VoucherWatchState, ingest_options: VoucherIngestOptions) -> OutputData:
+    # Balanced / unbalanced split of the running header groups plus the account, offsetting and duplicate lists.
+    # Netting reversals or leaving out duplicates changes which entries are in the groups, so with net_reversals
+    # or exclude_duplicate_entries the entries are grouped again, as they are with a grouping memory budget, which
+    # can take the grouping out of core.
+
+    if (ingest_options.net_reversals or ingest_options.exclude_duplicate_entries
+            or ingest_options.grouping_memory_budget_bytes):
+        return process_accounting_entries(watch_state.input_data, ingest_options)
+
+    output_data = process_header_groups(watch_state.hdr_groups.get_hdr_groups(), ingest_options.fixed_point_amounts)
+    add_account_entries_to_output_data(get_account_index(watch_state.input_data), ingest_options, output_data)
+    add_offsetting_hdr_groups_to_output_data(ingest_options, output_data)
+    if ingest_options.detect_duplicate_entries:
+        output_data.duplicate_entries = get_duplicate_entries(watch_state.input_data, False)
+
+    return output_data
+
+
+# ==============================================================================
+def print_voucher_watch_status_to_console(watch_state: VoucherWatchState,
+                                          ingest_options: VoucherIngestOptions) -> None:
+    # Straight from the running counts, the groups are only split and the lists built when the workbook is
+    # written.  Reversal netting and duplicate exclusion are also only done then, so the counts are of every
+    # entry read.
+
+    hdr_groups = watch_state.hdr_groups
+    expected_files = f' of {ingest_options.watch_expected_files}' if ingest_options.watch_expected_files else ''
+    print(f'\n  Voucher files read => {len(watch_state.ingested_files)}{expected_files}')
+    print(f'  Accounting entries => {len(watch_state.input_data.unmatched_accounting_entries)}')
+    if ingest_options.grouping_memory_budget_bytes:
+        print('  Header groups =====> grouped when the workbook is written, to stay within the memory budget')
+    else:
+        print(f'  Balanced groups ===> {hdr_groups.num_balanced}')
+        print(f'  Unbalanced groups => {len(hdr_groups) - hdr_groups.num_balanced}')
+    print(f'  EFT transactions ==> {get_account_index(watch_state.input_data).get_num_entries(EFT_ACCOUNT)}')
+    if ingest_options.net_reversals or ingest_options.exclude_duplicate_entries:
+        print('  (counts are before reversal netting and duplicate exclusion)')
+    print(f'  Workbook current ==> {"yes" if watch_state.workbook_current else "no"}')
+
+    return None
+
+
+if __name__ == "__main__":
+    watch_voucher_folder()
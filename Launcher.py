@@ -16,13 +16,18 @@ sys.path.append('C:/Users/kap3309/OneDrive - Kansas City Life Insurance/PythonDe
 from Create_FAST_IPM_Planning_Report import create_fast_ipm_planning_spreadsheet
 from Create_FAST_Standup_Assignees_Spreadsheet import create_standup_assignees_spreadsheet
 from Create_FAST_Sprint_Report import create_sprint_report
-from FastVoucherFileReview import create_fast_voucher_review_spreadsheet
+from FastVoucherFileReview import create_fast_voucher_review_spreadsheet, show_voucher_file_summary
 from Create_PI_Metrics import create_pi_planning_metrics
 from Create_FAST_CS_Letter_Report import create_cs_letter_report
 from Create_FAST_Control_Report_Tracking import create_fast_control_report_tracking
 from Plan_Program_Increment import plan_program_increment
 from Sprint_Story_Dependencies import sprint_story_dependencies
 from ACH_EFT_Compare import create_fast_ach_file_review_spreadsheet
+from FastVoucherReconciliation import create_voucher_review_and_ach_compare_spreadsheets
+from FastVoucherPipeline import create_fast_voucher_review_spreadsheet_pipelined
+from FastVoucherWatchFolder import watch_voucher_folder
+from FastVoucherCycleDiff import create_voucher_cycle_diff_spreadsheet
+from FastVoucherEntryQuery import query_voucher_entry_dataset
 
 
 # SGM Shared Module imports
@@ -61,6 +66,12 @@ def get_app_to_launch() -> int:
         print('   **         8 - Create Plan Program Increment Spreadsheet       ***')
         print('   **         9 - Create Sprint Story Dependencies Spreadsheet    ***')
         print('   **        10 - Create ACH File Review Spreadsheet              ***')
+        print('   **        11 - Create Voucher Review & ACH Spreadsheets        ***')
+        print('   **        12 - Show Voucher File Summary (quick scan)          ***')
+        print('   **        13 - Create Voucher Review Spreadsheet (pipelined)   ***')
+        print('   **        14 - Watch Voucher Folder (incremental review)       ***')
+        print('   **        15 - Create Voucher Cycle Diff Spreadsheet           ***')
+        print('   **        16 - Query Voucher Entry Dataset                     ***')
         print('   **         0 - Quit                                            ***')
         print('   **                                                             ***')
         print('   ******************************************************************')
@@ -97,12 +108,30 @@ def get_app_to_launch() -> int:
             case '10':
                 app_to_launch = int(user_input)
                 valid_input = True
+            case '11':
+                app_to_launch = int(user_input)
+                valid_input = True
+            case '12':
+                app_to_launch = int(user_input)
+                valid_input = True
+            case '13':
+                app_to_launch = int(user_input)
+                valid_input = True
+            case '14':
+                app_to_launch = int(user_input)
+                valid_input = True
+            case '15':
+                app_to_launch = int(user_input)
+                valid_input = True
+            case '16':
+                app_to_launch = int(user_input)
+                valid_input = True
             case '0':
                 app_to_launch = int(user_input)
                 valid_input = True
             case _:
                 valid_input = False
-                print('\n\n\n   Invalid App Number, valid App Numbers are between 1 & 10 inclusive')
+                print('\n\n\n   Invalid App Number, valid App Numbers are between 1 & 16 inclusive')
 
     return app_to_launch
 
@@ -137,6 +166,18 @@ def main():
                 sprint_story_dependencies()
             case 10:
                 create_fast_ach_file_review_spreadsheet()
+            case 11:
+                create_voucher_review_and_ach_compare_spreadsheets()
+            case 12:
+                show_voucher_file_summary()
+            case 13:
+                create_fast_voucher_review_spreadsheet_pipelined()
+            case 14:
+                watch_voucher_folder()
+            case 15:
+                create_voucher_cycle_diff_spreadsheet()
+            case 16:
+                query_voucher_entry_dataset()
             case _:
                 pass
 
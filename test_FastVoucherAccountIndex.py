@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import re
+import zipfile
+from decimal import Decimal
+
+
+# Third party imports
+import pytest
+
+
+# local file imports
+from FastVoucherAccountIndex import get_account_sheet_name
+from FastVoucherDataClasses import AccountEntry, VoucherFileInfo
+from FastVoucherFileParser import VoucherIngestOptions
+from FastVoucherFileReview import InputData, create_voucher_file_review_spreadsheet, process_accounting_entries
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# watch accounts whose cleaned up names start or end with an apostrophe or are taken by the fixed sheets
+WATCH_ACCOUNTS = ["'Cash'", "' Cash", 'Summary', 'policy summary', 'Netted Reversals', 'Duplicate GLEntryIDs']
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+@pytest.mark.parametrize('account, sheet_name', [("'Cash'", 'Cash'), ("' Cash ' ", 'Cash'), ("''", 'Account'),
+                                                 ("Cash's", "Cash's"), ('a/b:c', 'a_b_c'), ('x' * 40, 'x' * 31)])
+def test_get_account_sheet_name(account: str, sheet_name: str) -> None:
+
+    assert get_account_sheet_name(account, set()) == sheet_name
+
+
+# ==============================================================================
+def test_watch_account_sheets_do_not_take_later_sheet_names(tmp_path, monkeypatch) -> None:
+    # a workbook with every optional sheet and watch accounts named like them is still written
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'Output files').mkdir()
+    accounting_entries = [AccountEntry(gl_entry_id='G1', gl_entry_hdr_id='H1', account=cur_account,
+                                       amount=Decimal('10.00'), reversal='false')
+                          for cur_account in WATCH_ACCOUNTS]
+    accounting_entries += [AccountEntry(gl_entry_id='G1', gl_entry_hdr_id='H2', account="'Cash'",
+                                        amount=Decimal('-10.00'), reversal='true'),
+                           AccountEntry(gl_entry_id='G3', gl_entry_hdr_id='H3', amount=Decimal('5.00')),
+                           AccountEntry(gl_entry_id='G4', gl_entry_hdr_id='H4', amount=Decimal('-5.00'))]
+    input_data = InputData(VoucherFileInfo(cycle_date='2024-01-31'), unmatched_accounting_entries=accounting_entries)
+    output_data = process_accounting_entries(input_data, VoucherIngestOptions(
+        watch_accounts=WATCH_ACCOUNTS, detect_duplicate_entries=True, detect_offsetting_groups=True,
+        net_reversals=True))
+
+    assert output_data.duplicate_entries and output_data.offsetting_hdr_groups and output_data.netted_reversals
+    create_voucher_file_review_spreadsheet(output_data, input_data)
+
+    with zipfile.ZipFile(tmp_path / 'Output files' / '2024-01-31 Voucher File Review.xlsx') as workbook_zip:
+        workbook_xml = workbook_zip.read('xl/workbook.xml').decode('utf-8')
+    sheet_names = re.findall(r'<sheet name="([^"]*)"', workbook_xml)
+    assert sheet_names[4:10] == ['Cash', 'Cash (2)', 'Summary (2)', 'policy summary (2)', 'Netted Reversals (2)',
+                                 'Duplicate GLEntryIDs (2)']
+    assert sheet_names[10:] == ['Duplicate GLEntryIDs', 'Offsetting Header Groups', 'Netted Reversals',
+                                'Policy Summary', 'Summary']
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+import random
+from decimal import Decimal
+
+
+# Third party imports
+import pytest
+
+
+# local file imports
+from FastVoucherDataClasses import AccountEntry, amount_text_to_cents, amount_text_to_decimal, cents_to_decimal
+from FastVoucherEntryStore import AccountEntryStore
+from FastVoucherFileParser import VoucherIngestOptions
+from FastVoucherFileReview import group_and_balance_accounting_entries
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# ConvertedAmount texts covering signs, missing decimals, exponents, blanks and rounding past two places
+AMOUNT_TEXTS = ['0', '-0', '0.00', '-0.00', '12', '-12', '12.', '12.3', '-12.3', '12.34', '-12.34', '.5', '-.5',
+                '+7.25', '1234567890123.45', '-1234567890123.45', '1e2', '-1E2', '1.5e-1', '12.345E1', '1E-3',
+                ' 12.34 ', '1.005', '1.015', '-1.005', '-1.015', '2.675', '0.125', '-0.125', '0.135', '9.999',
+                '-9.999', '0.004', '-0.004', '0.005', '-0.005', '100.0000', '3.14159']
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+@pytest.mark.parametrize('amount_text', AMOUNT_TEXTS)
+def test_amount_text_to_cents_matches_decimal_quantize(amount_text: str) -> None:
+
+    expected_amount = Decimal(amount_text).quantize(Decimal('.01'))
+    amount_cents = amount_text_to_cents(amount_text)
+
+    assert isinstance(amount_cents, int)
+    assert amount_cents == int(expected_amount.scaleb(2))
+    assert cents_to_decimal(amount_cents) == expected_amount
+    assert cents_to_decimal(amount_cents) == amount_text_to_decimal(amount_text)
+
+
+# ==============================================================================
+@pytest.mark.parametrize('amount_cents', [0, 1, -1, 9, -9, 10, -10, 99, -99, 100, -100, 123456789, -123456789])
+def test_cents_to_decimal_has_two_decimal_places(amount_cents: int) -> None:
+
+    amount = cents_to_decimal(amount_cents)
+
+    assert amount.as_tuple().exponent == -2
+    assert amount == Decimal(amount_cents) / 100
+
+
+# ==============================================================================
+def test_random_amount_texts_match_decimal_quantize() -> None:
+
+    rand = random.Random(6)
+    for _ in range(10_000):
+        num_decimals = rand.randint(1, 4)
+        fraction_text = f'{rand.randrange(10 ** num_decimals):0{num_decimals}d}'
+        amount_text = f'{rand.choice(["", "-"])}{rand.randrange(100_000)}.{fraction_text}'
+        assert amount_text_to_cents(amount_text) == int(Decimal(amount_text).quantize(Decimal('.01')).scaleb(2))
+
+
+# ==============================================================================
+def create_entry_amount_texts(num_entries: int, num_hdr_ids: int, seed: int) -> list[tuple[str, str, str]]:
+    # (GLEntryID, GLEntryHdrID, ConvertedAmount text) with about half of the header groups made to balance,
+    # some of them only once the amounts are rounded to cents
+
+    rand = random.Random(seed)
+    entry_amount_texts = []
+    for hdr_number in range(num_hdr_ids):
+        hdr_id = f'HDR-{hdr_number:05d}'
+        amount_texts = [f'{rand.choice(["", "-"])}{rand.randrange(10_000)}.{rand.randrange(100):02d}'
+                        for _ in range(rand.randint(1, max(1, 2 * num_entries // num_hdr_ids - 1)))]
+        if rand.random() < 0.5:
+            balancing_amount = -sum(Decimal(cur_text) for cur_text in amount_texts)
+            amount_texts.append(f'{balancing_amount}{rand.choice(["", "0", "4", "1e0"])}')
+        entry_amount_texts.extend((f'GL-{hdr_number:05d}-{entry_number}', hdr_id, cur_text)
+                                  for entry_number, cur_text in enumerate(amount_texts))
+    rand.shuffle(entry_amount_texts)
+
+    return entry_amount_texts
+
+
+# ==============================================================================
+def get_group_summaries(hdr_groups, fixed_point_amounts: bool) -> list[tuple]:
+    # (GLEntryHdrID, amount in cents, GLEntryIDs) of each group in order
+
+    return [(cur_hdr_group.hdr_id,
+             cur_hdr_group.hdr_amount_cents if fixed_point_amounts else int(cur_hdr_group.hdr_amount.scaleb(2)),
+             [cur_entry.gl_entry_id for cur_entry in cur_hdr_group.entries])
+            for cur_hdr_group in hdr_groups]
+
+
+# ==============================================================================
+@pytest.mark.parametrize('grouping_memory_budget_bytes', [0, 64 * 1024])
+def test_cents_grouping_matches_decimal_grouping(grouping_memory_budget_bytes: int) -> None:
+    # the same extract grouped with Decimal amounts and with integer cents, in memory and out of core, gives the
+    # same balanced and unbalanced groups in the same order with the same amounts
+
+    entry_amount_texts = create_entry_amount_texts(5_000, 1_500, seed=6)
+    decimal_entries = [AccountEntry(gl_entry_id=gl_entry_id, gl_entry_hdr_id=hdr_id,
+                                    amount=amount_text_to_decimal(amount_text))
+                       for gl_entry_id, hdr_id, amount_text in entry_amount_texts]
+    cents_entries = AccountEntryStore()
+    for gl_entry_id, hdr_id, amount_text in entry_amount_texts:
+        cents_entries.append_fields('', gl_entry_id, hdr_id, '', '', amount_text_to_cents(amount_text), '', '')
+
+    decimal_output = group_and_balance_accounting_entries(
+        decimal_entries, VoucherIngestOptions(grouping_memory_budget_bytes=grouping_memory_budget_bytes))
+    cents_output = group_and_balance_accounting_entries(
+        cents_entries, VoucherIngestOptions(fixed_point_amounts=True,
+                                            grouping_memory_budget_bytes=grouping_memory_budget_bytes))
+
+    assert decimal_output.balanced_hdr_groups
+    assert decimal_output.unbalanced_hdr_groups
+    assert (get_group_summaries(cents_output.balanced_hdr_groups, True)
+            == get_group_summaries(decimal_output.balanced_hdr_groups, False))
+    assert (get_group_summaries(cents_output.unbalanced_hdr_groups, True)
+            == get_group_summaries(decimal_output.unbalanced_hdr_groups, False))
+    for cur_hdr_group in cents_output.balanced_hdr_groups:
+        assert cur_hdr_group.hdr_amount == Decimal('0.00')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Imports
+# ******************************************************************************
+# ******************************************************************************
+
+# Standard library imports
+from decimal import Decimal
+
+
+# Third party imports
+import pytest
+
+
+# local file imports
+from FastVoucherDataClasses import AccountEntry, VoucherFileInfo, amount_text_to_cents
+from FastVoucherDuplicates import GLEntryIDDuplicateIndex
+from FastVoucherEntryStore import AccountEntryStore
+from FastVoucherFileParser import VoucherIngestOptions
+from FastVoucherFileReview import InputData, process_accounting_entries
+from FastVoucherReversals import REVERSAL_MATCH_GL_ENTRY_ID
+
+
+# SGM Shared Module imports
+
+
+# ******************************************************************************
+# ******************************************************************************
+# * Class Declarations
+# ******************************************************************************
+# ******************************************************************************
+
+# (GLEntryID, GLEntryHdrID, ConvertedAmount text, IsReversal): an entry and the reversal carrying its GLEntryID,
+# and an entry read twice from overlapping extracts
+ENTRY_FIELDS = [('G1', 'H1', '10.00', 'false'),
+                ('G1', 'H2', '-10.00', 'true'),
+                ('G2', 'H3', '5.00', 'false'),
+                ('G2', 'H3', '5.00', 'false')]
+
+
+# ==============================================================================
+# ==============================================================================
+# === Functions
+# ==============================================================================
+# ==============================================================================
+
+
+# ==============================================================================
+def create_accounting_entries(fixed_point_amounts: bool):
+
+    if not fixed_point_amounts:
+        return [AccountEntry(gl_entry_id=gl_entry_id, gl_entry_hdr_id=hdr_id, amount=Decimal(amount_text),
+                             reversal=reversal)
+                for gl_entry_id, hdr_id, amount_text, reversal in ENTRY_FIELDS]
+
+    accounting_entries = AccountEntryStore()
+    for gl_entry_id, hdr_id, amount_text, reversal in ENTRY_FIELDS:
+        accounting_entries.append_fields('', gl_entry_id, hdr_id, '', '', amount_text_to_cents(amount_text),
+                                         reversal, '')
+
+    return accounting_entries
+
+
+# ==============================================================================
+@pytest.mark.parametrize('fixed_point_amounts', [False, True])
+def test_reversal_with_original_gl_entry_id_is_not_a_duplicate(fixed_point_amounts: bool) -> None:
+
+    duplicate_index = GLEntryIDDuplicateIndex(create_accounting_entries(fixed_point_amounts))
+    duplicate_index.index_new_entries()
+
+    assert duplicate_index.get_duplicates().duplicate_rows == [(3, 2)]
+
+
+# ==============================================================================
+@pytest.mark.parametrize('fixed_point_amounts', [False, True])
+@pytest.mark.parametrize('exclude_duplicate_entries', [False, True])
+def test_net_reversals_with_duplicate_check(fixed_point_amounts: bool, exclude_duplicate_entries: bool) -> None:
+    # the reversal is netted against its original rather than listed (and left out) as a duplicate of it, the
+    # repeated entry is still a duplicate
+
+    input_data = InputData(VoucherFileInfo(), unmatched_accounting_entries=create_accounting_entries(
+        fixed_point_amounts))
+    ingest_options = VoucherIngestOptions(fixed_point_amounts=fixed_point_amounts, net_reversals=True,
+                                          detect_duplicate_entries=True,
+                                          exclude_duplicate_entries=exclude_duplicate_entries)
+    output_data = process_accounting_entries(input_data, ingest_options)
+
+    assert [(cur_duplicate.entry_index, cur_duplicate.excluded)
+            for cur_duplicate in output_data.duplicate_entries] == [(3, exclude_duplicate_entries)]
+    assert [(cur_netted_reversal.reversal_row, cur_netted_reversal.original_row, cur_netted_reversal.match_type)
+            for cur_netted_reversal in output_data.netted_reversals] == [(1, 0, REVERSAL_MATCH_GL_ENTRY_ID)]
+
+    hdr_groups = output_data.balanced_hdr_groups + output_data.unbalanced_hdr_groups
+    assert [cur_hdr_group.hdr_id for cur_hdr_group in hdr_groups] == ['H3']
+    assert [cur_entry.gl_entry_id for cur_entry in hdr_groups[0].entries] == (
+        ['G2'] if exclude_duplicate_entries else ['G2', 'G2'])